@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager 
 from sqlalchemy import text
@@ -22,8 +24,10 @@ from modules.workflow.workflow_router import router as workflow_router
 from modules.notifications.notif_router import router as notif_router
 from modules.file_storage.file_router import router as file_router
 from modules.reports.report_router import router as report_router
+from modules.reports.export_router import router as export_router
 from modules.workspace_management.workspace_router import router as workspace_router
 from modules.registry.registry_router import router as registry_router
+from modules.file_storage.file_uploads import FileUploadSessionService
 
 # --- IMPORTS: MODELS (For Table Creation) ---
 from modules.access_control.access_models import User
@@ -33,6 +37,21 @@ from modules.workflow.workflow_models import Department, Request
 from modules.notifications.notif_models import Notification
 from modules.file_storage.file_models import FileAttachment
 from modules.registry.registry_models import Company, Client, ClientObject
+from modules.jobs.job_models import BackgroundJob
+
+# --- BACKGROUND SWEEPS ---
+async def sweep_upload_sessions():
+    """ Expired resumable uploads hold disk until removed: sweep now, then periodically """
+    while True:
+        try:
+            removed = await asyncio.to_thread(FileUploadSessionService.sweep_expired)
+            if removed:
+                print(f"🧹 UPLOADS: Removed {removed} expired upload sessions")
+        except Exception as e:
+            print(f"⚠️  UPLOADS: Sweep failed: {e}")
+        if settings.UPLOAD_SWEEP_INTERVAL_SECONDS <= 0:
+            return
+        await asyncio.sleep(settings.UPLOAD_SWEEP_INTERVAL_SECONDS)
 
 # --- LIFESPAN MANAGER (Startup/Shutdown) ---
 @asynccontextmanager
@@ -49,6 +68,9 @@ async def lifespan(app: FastAPI):
         # Create Tables (Dev/Local only)
         if settings.AUTO_CREATE_TABLES:
             print("🔨 MIGRATION: Checking tables...")
+            with engine.begin() as connection:
+                # Registry search indexes use trigram operator classes
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             Base.metadata.create_all(bind=engine)
             print("✅ MIGRATION: Tables synced successfully")
         else:
@@ -56,10 +78,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ CRITICAL FAILURE: {e}")
     print("------------------------------------------------")
+    upload_sweeper = asyncio.create_task(sweep_upload_sessions())
     
     yield
     
     # 2. SHUTDOWN
+    upload_sweeper.cancel()
     print("------------------------------------------------")
     print("🛑 SYSTEM SHUTDOWN")
     print("------------------------------------------------")
@@ -81,6 +105,7 @@ crm_core_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Cursor"],
 )
 
 # --- PROXY / HOST CONTROLS ---
@@ -103,6 +128,7 @@ crm_core_app.include_router(workflow_router)
 crm_core_app.include_router(notif_router)
 crm_core_app.include_router(file_router)
 crm_core_app.include_router(report_router)
+crm_core_app.include_router(export_router)
 crm_core_app.include_router(registry_router)
 
 # --- HEALTH CHECK ---
@@ -25,8 +25,37 @@ class Settings:
     ALLOWED_UPLOAD_MIME: str | None = os.getenv("ALLOWED_UPLOAD_MIME")
     FILE_SCAN_COMMAND: str | None = os.getenv("FILE_SCAN_COMMAND")
     FILE_SCAN_TIMEOUT_SECONDS: int = int(os.getenv("FILE_SCAN_TIMEOUT_SECONDS", 30))
-    MAX_EXPORT_ROWS: int = int(os.getenv("MAX_EXPORT_ROWS", 5000))
-    EXPORT_SPOOL_MAX_MB: int = int(os.getenv("EXPORT_SPOOL_MAX_MB", 10))
+    # Resumable uploads: chunk size handed to clients, idle sessions expire after the TTL
+    # (swept at startup and every UPLOAD_SWEEP_INTERVAL_SECONDS, 0 = startup only);
+    # open sessions per user and disk reserved by open sessions per workspace are capped
+    UPLOAD_CHUNK_KB: int = int(os.getenv("UPLOAD_CHUNK_KB", 1024))
+    UPLOAD_SESSION_TTL_HOURS: int = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+    UPLOAD_MAX_OPEN_SESSIONS: int = int(os.getenv("UPLOAD_MAX_OPEN_SESSIONS", 5))
+    UPLOAD_MAX_RESERVED_MB: int = int(os.getenv("UPLOAD_MAX_RESERVED_MB", 1024))
+    UPLOAD_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("UPLOAD_SWEEP_INTERVAL_SECONDS", 600))
+    # Set (e.g. "/protected-media") to let nginx send downloads via X-Accel-Redirect
+    FILE_ACCEL_REDIRECT_PREFIX: str | None = os.getenv("FILE_ACCEL_REDIRECT_PREFIX")
+    MAX_BATCH_SUBMIT_ROWS: int = int(os.getenv("MAX_BATCH_SUBMIT_ROWS", 5000))
+    MAX_IMPORT_MB: int = int(os.getenv("MAX_IMPORT_MB", 100))
+    IMPORT_COPY_CHUNK_ROWS: int = int(os.getenv("IMPORT_COPY_CHUNK_ROWS", 5000))
+    REGISTRY_IMPORT_CHUNK_ROWS: int = int(os.getenv("REGISTRY_IMPORT_CHUNK_ROWS", 1000))
+    # /registry/changes: deletion tombstones (and cursors) expire after the retention window
+    REGISTRY_TOMBSTONE_RETENTION_DAYS: int = int(os.getenv("REGISTRY_TOMBSTONE_RETENTION_DAYS", 30))
+    # Client dedup: rows per scan batch, largest block compared pairwise, minimum pair score
+    DEDUP_SCAN_BATCH_ROWS: int = int(os.getenv("DEDUP_SCAN_BATCH_ROWS", 10000))
+    DEDUP_MAX_BLOCK_SIZE: int = int(os.getenv("DEDUP_MAX_BLOCK_SIZE", 200))
+    DEDUP_MATCH_THRESHOLD: float = float(os.getenv("DEDUP_MATCH_THRESHOLD", 0.8))
+    # Background jobs: running workers refresh a heartbeat; active jobs silent for the timeout are failed
+    JOB_HEARTBEAT_SECONDS: int = int(os.getenv("JOB_HEARTBEAT_SECONDS", 30))
+    JOB_STALE_TIMEOUT_SECONDS: int = int(os.getenv("JOB_STALE_TIMEOUT_SECONDS", 600))
+    FIELD_BACKFILL_BATCH_ROWS: int = int(os.getenv("FIELD_BACKFILL_BATCH_ROWS", 2000))
+    VERSION_MIGRATION_BATCH_ROWS: int = int(os.getenv("VERSION_MIGRATION_BATCH_ROWS", 2000))
+    # Bulk field rename/drop/default: rows per UPDATE, pause between chunks, max wait for row locks
+    FIELD_OPERATION_BATCH_ROWS: int = int(os.getenv("FIELD_OPERATION_BATCH_ROWS", 5000))
+    FIELD_OPERATION_PAUSE_MS: int = int(os.getenv("FIELD_OPERATION_PAUSE_MS", 100))
+    FIELD_OPERATION_LOCK_TIMEOUT_MS: int = int(os.getenv("FIELD_OPERATION_LOCK_TIMEOUT_MS", 2000))
+    # Exports stream row by row; the cap only bounds download size (XLSX itself stops at 1,048,575 rows)
+    MAX_EXPORT_ROWS: int = int(os.getenv("MAX_EXPORT_ROWS", 1000000))
     DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
     MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 500))
     DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
@@ -34,6 +63,9 @@ class Settings:
     DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
     DB_POOL_PRE_PING: bool = _get_bool("DB_POOL_PRE_PING", True)
+    TEMPLATE_CACHE_SIZE: int = int(os.getenv("TEMPLATE_CACHE_SIZE", 256))
+    AGGREGATE_CACHE_SIZE: int = int(os.getenv("AGGREGATE_CACHE_SIZE", 128))
+    MAX_AGGREGATE_GROUPS: int = int(os.getenv("MAX_AGGREGATE_GROUPS", 1000))
 
 settings = Settings()
 
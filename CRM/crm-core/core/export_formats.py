@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from fastapi import HTTPException
+
+from core.xlsx_stream import XLSX_MEDIA_TYPE, stream_xlsx
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "xlsx": (XLSX_MEDIA_TYPE, "xlsx"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+FLUSH_EVERY_ROWS = 1000
+PARQUET_ROW_GROUP_ROWS = 50000
+
+
+def resolve_export_format(export_format: str | None) -> str:
+    """ Validate `format=` before streaming starts (unknown format or missing optional dependency -> 400) """
+    export_format = (export_format or "xlsx").strip().lower()
+    if export_format not in EXPORT_FORMATS:
+        allowed = ", ".join(EXPORT_FORMATS)
+        raise HTTPException(400, detail=f"Unsupported export format (allowed: {allowed})")
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(400, detail="Parquet export requires the pyarrow package on the server")
+    return export_format
+
+
+def export_media_type(export_format: str) -> str:
+    return EXPORT_FORMATS[export_format][0]
+
+
+def export_filename(base_name: str, export_format: str) -> str:
+    return f"{base_name}.{EXPORT_FORMATS[export_format][1]}"
+
+
+def column_type(field_type: str | None) -> str:
+    """ Template field type -> writer column type (text, number, boolean) """
+    if field_type in ("number", "boolean"):
+        return field_type
+    return "text"
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+    return value
+
+
+def _stream_csv(labels: list, rows: Iterable[Iterable]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(labels)
+    # BOM so spreadsheet tools detect UTF-8
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    pending = 0
+    for values in rows:
+        writer.writerow([_csv_value(value) for value in values])
+        pending += 1
+        if pending >= FLUSH_EVERY_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_ndjson(labels: list, rows: Iterable[Iterable]) -> Iterator[bytes]:
+    pending = []
+    for values in rows:
+        pending.append(json.dumps(dict(zip(labels, values)), ensure_ascii=False, default=_json_default))
+        if len(pending) >= FLUSH_EVERY_ROWS:
+            yield ("\n".join(pending) + "\n").encode("utf-8")
+            pending.clear()
+    if pending:
+        yield ("\n".join(pending) + "\n").encode("utf-8")
+
+
+class _ParquetSink:
+    """ Forward-only sink handed to pyarrow; written bytes are drained after each row group """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_value(value, kind: str):
+    if value is None or value == "":
+        return None
+    if kind == "number":
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float, Decimal)):
+            return float(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == "boolean":
+        return value if isinstance(value, bool) else None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _stream_parquet(columns: list[tuple[str, str]], rows: Iterable[Iterable]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {"number": pa.float64(), "boolean": pa.bool_(), "text": pa.string()}
+    schema = pa.schema([(label, arrow_types[kind]) for label, kind in columns])
+    kinds = [kind for _, kind in columns]
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+
+    def flush(batch: list[list]):
+        arrays = [
+            pa.array([row[index] for row in batch], type=schema.field(index).type)
+            for index in range(len(columns))
+        ]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    try:
+        batch = []
+        for values in rows:
+            batch.append([_parquet_value(value, kind) for value, kind in zip(values, kinds)])
+            if len(batch) >= PARQUET_ROW_GROUP_ROWS:
+                flush(batch)
+                batch = []
+                yield sink.take()
+        if batch:
+            flush(batch)
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def stream_export(export_format: str, title: str, columns: list[tuple[str, str]], rows: Iterable[Iterable]) -> Iterator[bytes]:
+    """
+    Encode (label, column_type) columns and row value lists as the requested format.
+    Every writer consumes `rows` lazily, so all formats stream straight from the cursor.
+    """
+    labels = [label for label, _ in columns]
+    if export_format == "csv":
+        return _stream_csv(labels, rows)
+    if export_format == "ndjson":
+        return _stream_ndjson(labels, rows)
+    if export_format == "parquet":
+        return _stream_parquet(columns, rows)
+    return stream_xlsx(title, labels, rows)
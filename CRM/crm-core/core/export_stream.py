@@ -0,0 +1,59 @@
+from typing import Callable, Iterator
+
+from fastapi import HTTPException
+from sqlalchemy import literal
+from sqlalchemy.orm import Query, Session
+
+from core.config import settings
+from core.database_connector import SessionLocal
+from core.xlsx_stream import MAX_SHEET_ROWS
+
+EXPORT_BATCH_ROWS = 1000
+
+
+def ensure_export_limit(query: Query, limit: int | None = None, export_format: str | None = None) -> None:
+    """
+    413 when the export would exceed the row cap.
+    XLSX is also capped at one sheet (MAX_SHEET_ROWS including the header row).
+    Probes for row `limit + 1` instead of counting the whole result.
+    """
+    limit = settings.MAX_EXPORT_ROWS if limit is None else limit
+    sheet_limit = export_format == "xlsx" and limit >= MAX_SHEET_ROWS
+    if sheet_limit:
+        limit = MAX_SHEET_ROWS - 1
+    over_limit = query.with_entities(literal(1)).order_by(None).offset(limit).limit(1).first()
+    if over_limit is not None:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Export exceeds the XLSX sheet limit ({limit} rows); use csv, ndjson or parquet"
+                if sheet_limit
+                else f"Export exceeds max row limit ({limit})"
+            )
+        )
+
+
+def stream_query(
+    build_query: Callable[[Session], Query],
+    batch_size: int = EXPORT_BATCH_ROWS,
+    progress: Callable[[int], None] | None = None,
+) -> Iterator:
+    """
+    Yield rows from a server-side cursor in a dedicated session.
+    Streaming responses outlive the request-scoped session, so the query is
+    rebuilt here and the session is closed when the generator finishes.
+    `progress(rows_so_far)` is called once per batch (used by export jobs).
+    """
+    db = SessionLocal()
+    count = 0
+    try:
+        query = build_query(db).execution_options(stream_results=True, yield_per=batch_size)
+        for row in query:
+            yield row
+            count += 1
+            if progress and count % batch_size == 0:
+                progress(count)
+        if progress:
+            progress(count)
+    finally:
+        db.close()
@@ -0,0 +1,28 @@
+from urllib.parse import quote
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    return tag
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag (RFC 9110 13.1.2).
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    expected = _strip_weak(etag)
+    return any(_strip_weak(candidate) == expected for candidate in if_none_match.split(","))
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """ Content-Disposition with an RFC 5987 `filename*` for non-ASCII names (as FileResponse builds it) """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
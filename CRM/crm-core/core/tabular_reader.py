@@ -0,0 +1,124 @@
+import csv
+import json
+import os
+import tempfile
+from typing import Iterator
+
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+SUPPORTED_EXTENSIONS = {".csv": "csv", ".xlsx": "xlsx", ".xlsm": "xlsx"}
+# One JSON object per line; only readers built on iter_records accept it
+RECORD_EXTENSIONS = {**SUPPORTED_EXTENSIONS, ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def detect_format(filename: str | None, extensions: dict[str, str] = SUPPORTED_EXTENSIONS) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    file_format = extensions.get(extension)
+    if not file_format:
+        allowed = ", ".join(sorted(extensions))
+        raise HTTPException(status_code=415, detail=f"Unsupported file type (allowed: {allowed})")
+    return file_format
+
+
+def spool_upload(upload_file: UploadFile, max_bytes: int) -> str:
+    """
+    Copy an upload to a private temp file in chunks, aborting at max_bytes.
+    Background jobs read from this path after the request (and its upload) is gone.
+    """
+    extension = os.path.splitext(upload_file.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="crm-import-", suffix=extension)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = upload_file.file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds max size of {max_bytes // (1024 * 1024)} MB"
+                    )
+                target.write(chunk)
+    except Exception:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+def _iter_csv(path: str) -> Iterator[list]:
+    with open(path, "r", newline="", encoding="utf-8-sig") as handle:
+        sample = handle.read(64 * 1024)
+        handle.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(handle, dialect)
+
+
+def _iter_xlsx(path: str) -> Iterator[list]:
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        for row in sheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def iter_rows(path: str, file_format: str) -> Iterator[tuple[int, list]]:
+    """
+    Yield (row_number, cells) for every non-empty row, header included.
+    Row numbers are 1-based as shown by spreadsheet tools.
+    """
+    reader = _iter_csv(path) if file_format == "csv" else _iter_xlsx(path)
+    for row_number, cells in enumerate(reader, start=1):
+        if not any(cell not in (None, "") for cell in cells):
+            continue
+        yield row_number, cells
+
+
+def _iter_ndjson(path: str) -> Iterator[tuple[int, dict | None]]:
+    with open(path, "r", encoding="utf-8-sig") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                value = None
+            # Non-objects are passed on as None so the caller can report the line
+            yield line_number, value if isinstance(value, dict) else None
+
+
+def iter_records(path: str, file_format: str) -> Iterator[tuple[int, dict | None]]:
+    """
+    Yield (row_number, {column: value}) for every data row.
+    Sheet columns are keyed by their trimmed header; NDJSON lines keep their own
+    keys, and a line that is not a JSON object yields None.
+    """
+    if file_format == "ndjson":
+        yield from _iter_ndjson(path)
+        return
+
+    rows = iter_rows(path, file_format)
+    header_row = next(rows, None)
+    if header_row is None:
+        return
+    header = [str(cell).strip() if cell is not None else "" for cell in header_row[1]]
+    for row_number, cells in rows:
+        yield row_number, {
+            name: cells[position] if position < len(cells) else None
+            for position, name in enumerate(header)
+            if name
+        }
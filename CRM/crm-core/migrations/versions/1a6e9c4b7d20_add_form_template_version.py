@@ -0,0 +1,28 @@
+"""add version column to dynamic form templates
+
+Revision ID: 1a6e9c4b7d20
+Revises: e4f7a1c2d9b0
+Create Date: 2026-03-02 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "1a6e9c4b7d20"
+down_revision: Union[str, Sequence[str], None] = "e4f7a1c2d9b0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "dynamic_form_templates",
+        sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("dynamic_form_templates", "version")
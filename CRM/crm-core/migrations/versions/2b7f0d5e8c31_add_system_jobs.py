@@ -0,0 +1,56 @@
+"""add system jobs table
+
+Revision ID: 2b7f0d5e8c31
+Revises: 1a6e9c4b7d20
+Create Date: 2026-03-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "2b7f0d5e8c31"
+down_revision: Union[str, Sequence[str], None] = "1a6e9c4b7d20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "system_jobs",
+        sa.Column("job_type", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("requested_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("total_items", sa.Integer(), nullable=True),
+        sa.Column("processed_items", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("failed_items", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("params", postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("result", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("updated_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("meta_data", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.ForeignKeyConstraint(["requested_by_id"], ["access_users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_system_jobs_workspace_type_created_at",
+        "system_jobs",
+        ["workspace_id", "job_type", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_system_jobs_workspace_type_created_at", table_name="system_jobs")
+    op.drop_table("system_jobs")
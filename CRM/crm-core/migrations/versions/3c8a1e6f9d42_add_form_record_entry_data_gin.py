@@ -0,0 +1,30 @@
+"""add GIN index on dynamic form record entry_data
+
+Revision ID: 3c8a1e6f9d42
+Revises: 2b7f0d5e8c31
+Create Date: 2026-03-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8a1e6f9d42"
+down_revision: Union[str, Sequence[str], None] = "2b7f0d5e8c31"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dynamic_form_records_entry_data_gin "
+            "ON dynamic_form_records USING gin (entry_data jsonb_path_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_dynamic_form_records_entry_data_gin")
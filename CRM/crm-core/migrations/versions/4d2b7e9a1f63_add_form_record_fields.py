@@ -0,0 +1,58 @@
+"""add typed side table for indexed dynamic form fields
+
+Revision ID: 4d2b7e9a1f63
+Revises: 3c8a1e6f9d42
+Create Date: 2026-03-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "4d2b7e9a1f63"
+down_revision: Union[str, Sequence[str], None] = "3c8a1e6f9d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VALUE_INDEXES = {
+    "ix_dynamic_form_record_fields_number": "value_number",
+    "ix_dynamic_form_record_fields_text": "value_text",
+    "ix_dynamic_form_record_fields_date": "value_date",
+    "ix_dynamic_form_record_fields_bool": "value_bool",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dynamic_form_record_fields",
+        sa.Column("record_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("field_key", sa.String(), nullable=False),
+        sa.Column("template_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("value_number", sa.Numeric(), nullable=True),
+        sa.Column("value_text", sa.Text(), nullable=True),
+        sa.Column("value_date", sa.Date(), nullable=True),
+        sa.Column("value_bool", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["record_id"], ["dynamic_form_records.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["template_id"], ["dynamic_form_templates.id"]),
+        sa.PrimaryKeyConstraint("record_id", "field_key"),
+    )
+    for index_name, column in VALUE_INDEXES.items():
+        op.create_index(index_name, "dynamic_form_record_fields", ["template_id", "field_key", column], unique=False)
+
+    # Keyset walk for backfills; built without blocking record writes
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dynamic_form_records_template_id_id "
+            "ON dynamic_form_records (template_id, id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_dynamic_form_records_template_id_id")
+    for index_name in VALUE_INDEXES:
+        op.drop_index(index_name, table_name="dynamic_form_record_fields")
+    op.drop_table("dynamic_form_record_fields")
@@ -0,0 +1,33 @@
+"""add dedupe key to system jobs
+
+Revision ID: 5e3c8f1a2b74
+Revises: 4d2b7e9a1f63
+Create Date: 2026-03-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5e3c8f1a2b74"
+down_revision: Union[str, Sequence[str], None] = "4d2b7e9a1f63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("system_jobs", sa.Column("dedupe_key", sa.String(), nullable=True))
+    op.create_index(
+        "uq_system_jobs_active_dedupe_key",
+        "system_jobs",
+        ["workspace_id", "dedupe_key"],
+        unique=True,
+        postgresql_where=sa.text("dedupe_key IS NOT NULL AND status IN ('pending', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_system_jobs_active_dedupe_key", table_name="system_jobs")
+    op.drop_column("system_jobs", "dedupe_key")
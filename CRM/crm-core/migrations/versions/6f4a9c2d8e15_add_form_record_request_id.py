@@ -0,0 +1,73 @@
+"""add request_id foreign key to dynamic form records
+
+Revision ID: 6f4a9c2d8e15
+Revises: 5e3c8f1a2b74
+Create Date: 2026-03-12 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "6f4a9c2d8e15"
+down_revision: Union[str, Sequence[str], None] = "5e3c8f1a2b74"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "dynamic_form_records",
+        sa.Column("request_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_dynamic_form_records_request_id",
+        "dynamic_form_records",
+        "workflow_requests",
+        ["request_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    # Links used to live in meta_data on both sides; compare as text so malformed
+    # ids are skipped instead of failing the cast, and dangling ids are dropped
+    op.execute(
+        """
+        UPDATE dynamic_form_records AS r
+        SET request_id = w.id
+        FROM workflow_requests AS w
+        WHERE r.meta_data ? 'request_id'
+          AND w.id::text = r.meta_data ->> 'request_id'
+        """
+    )
+    op.execute(
+        """
+        UPDATE dynamic_form_records AS r
+        SET request_id = w.id
+        FROM workflow_requests AS w
+        WHERE r.request_id IS NULL
+          AND w.meta_data ? 'record_id'
+          AND w.meta_data ->> 'record_id' = r.id::text
+        """
+    )
+    op.execute(
+        "UPDATE dynamic_form_records SET meta_data = meta_data - 'request_id' "
+        "WHERE meta_data ? 'request_id'"
+    )
+    op.create_index("ix_dynamic_form_records_request_id", "dynamic_form_records", ["request_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE dynamic_form_records
+        SET meta_data = COALESCE(meta_data, '{}'::jsonb) || jsonb_build_object('request_id', request_id::text)
+        WHERE request_id IS NOT NULL
+        """
+    )
+    op.drop_index("ix_dynamic_form_records_request_id", table_name="dynamic_form_records")
+    op.drop_constraint("fk_dynamic_form_records_request_id", "dynamic_form_records", type_="foreignkey")
+    op.drop_column("dynamic_form_records", "request_id")
@@ -0,0 +1,82 @@
+"""add immutable form template versions
+
+Revision ID: 7a5b1d3e9f26
+Revises: 6f4a9c2d8e15
+Create Date: 2026-03-16 00:00:00.000000
+
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "7a5b1d3e9f26"
+down_revision: Union[str, Sequence[str], None] = "6f4a9c2d8e15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    versions = op.create_table(
+        "dynamic_form_template_versions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("template_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("schema_structure", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(["template_id"], ["dynamic_form_templates.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("template_id", "version", name="uq_dynamic_form_template_versions_template_version"),
+    )
+
+    # Version 1 of every existing template is its current schema
+    bind = op.get_bind()
+    templates = bind.execute(sa.text("SELECT id, schema_structure FROM dynamic_form_templates")).fetchall()
+    if templates:
+        now = datetime.now(timezone.utc)
+        op.bulk_insert(
+            versions,
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "template_id": template_id,
+                    "version": 1,
+                    "schema_structure": schema_structure or [],
+                    "created_at": now,
+                    "created_by_id": None,
+                }
+                for template_id, schema_structure in templates
+            ],
+        )
+
+    # Existing records stay NULL (unversioned) instead of rewriting the whole table;
+    # POST /forms/templates/{id}/versions/migrate pins them after validation
+    op.add_column(
+        "dynamic_form_records",
+        sa.Column("template_version_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_dynamic_form_records_template_version_id",
+        "dynamic_form_records",
+        "dynamic_form_template_versions",
+        ["template_version_id"],
+        ["id"],
+    )
+    op.create_index(
+        "ix_dynamic_form_records_template_version_id",
+        "dynamic_form_records",
+        ["template_id", "template_version_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dynamic_form_records_template_version_id", table_name="dynamic_form_records")
+    op.drop_constraint("fk_dynamic_form_records_template_version_id", "dynamic_form_records", type_="foreignkey")
+    op.drop_column("dynamic_form_records", "template_version_id")
+    op.drop_table("dynamic_form_template_versions")
@@ -0,0 +1,30 @@
+"""add registry company listing index
+
+Revision ID: 8b6c2e4f1a37
+Revises: 7a5b1d3e9f26
+Create Date: 2026-03-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b6c2e4f1a37"
+down_revision: Union[str, Sequence[str], None] = "7a5b1d3e9f26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginated company list is ordered by created_at within a workspace
+    op.create_index(
+        "ix_registry_companies_workspace_created_at",
+        "registry_companies",
+        ["workspace_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_registry_companies_workspace_created_at", table_name="registry_companies")
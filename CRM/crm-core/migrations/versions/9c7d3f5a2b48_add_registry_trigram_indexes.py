@@ -0,0 +1,42 @@
+"""add trigram indexes for registry search
+
+Revision ID: 9c7d3f5a2b48
+Revises: 8b6c2e4f1a37
+Create Date: 2026-03-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c7d3f5a2b48"
+down_revision: Union[str, Sequence[str], None] = "8b6c2e4f1a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_INDEXES = {
+    "ix_registry_companies_name_trgm": ("registry_companies", "name"),
+    "ix_registry_clients_first_name_trgm": ("registry_clients", "first_name"),
+    "ix_registry_clients_last_name_trgm": ("registry_clients", "last_name"),
+    "ix_registry_clients_email_trgm": ("registry_clients", "email"),
+    "ix_registry_clients_phone_trgm": ("registry_clients", "phone"),
+    "ix_registry_client_objects_name_trgm": ("registry_client_objects", "name"),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Built without blocking registry writes
+    with op.get_context().autocommit_block():
+        for index_name, (table, column) in TRIGRAM_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,100 @@
+"""promote registry client status out of meta_data
+
+Revision ID: a1d7c4e8f359
+Revises: 9c7d3f5a2b48
+Create Date: 2026-03-22 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a1d7c4e8f359"
+down_revision: Union[str, Sequence[str], None] = "9c7d3f5a2b48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "registry_clients",
+        sa.Column("status", sa.String(), nullable=False, server_default="new"),
+    )
+    op.add_column(
+        "registry_clients",
+        sa.Column("status_company_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_registry_clients_status_company_id",
+        "registry_clients",
+        "registry_companies",
+        ["status_company_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    # Unknown values read as "new" before, so they become "new" now
+    op.execute(
+        """
+        UPDATE registry_clients
+        SET status = CASE
+            WHEN lower(btrim(meta_data ->> 'status'))
+                IN ('new', 'active', 'reactivated', 'deactivated', 'changed_from', 'changed_to')
+            THEN lower(btrim(meta_data ->> 'status'))
+            ELSE 'new'
+        END
+        WHERE meta_data ? 'status'
+        """
+    )
+    # Text compare skips malformed ids; companies of other workspaces are ignored
+    op.execute(
+        """
+        UPDATE registry_clients AS c
+        SET status_company_id = co.id
+        FROM registry_companies AS co
+        WHERE c.meta_data ? 'status_company_id'
+          AND c.status IN ('changed_from', 'changed_to')
+          AND co.id::text = c.meta_data ->> 'status_company_id'
+          AND co.workspace_id = c.workspace_id
+        """
+    )
+    op.execute(
+        "UPDATE registry_clients SET meta_data = meta_data - 'status' - 'status_company_id' "
+        "WHERE meta_data ?| array['status', 'status_company_id']"
+    )
+
+    op.create_index(
+        "ix_registry_clients_workspace_status",
+        "registry_clients",
+        ["workspace_id", "status"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_registry_clients_status_company_id",
+        "registry_clients",
+        ["status_company_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE registry_clients
+        SET meta_data = COALESCE(meta_data, '{}'::jsonb)
+            || jsonb_build_object('status', status)
+            || CASE
+                WHEN status_company_id IS NOT NULL
+                THEN jsonb_build_object('status_company_id', status_company_id::text)
+                ELSE '{}'::jsonb
+            END
+        """
+    )
+    op.drop_index("ix_registry_clients_status_company_id", table_name="registry_clients")
+    op.drop_index("ix_registry_clients_workspace_status", table_name="registry_clients")
+    op.drop_constraint("fk_registry_clients_status_company_id", "registry_clients", type_="foreignkey")
+    op.drop_column("registry_clients", "status_company_id")
+    op.drop_column("registry_clients", "status")
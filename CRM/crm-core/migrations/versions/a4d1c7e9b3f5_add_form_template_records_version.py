@@ -0,0 +1,28 @@
+"""add records_version to form templates for aggregate cache invalidation
+
+Revision ID: a4d1c7e9b3f5
+Revises: f3c9b6d4e8a1
+Create Date: 2026-04-22 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d1c7e9b3f5"
+down_revision: Union[str, Sequence[str], None] = "f3c9b6d4e8a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "dynamic_form_templates",
+        sa.Column("records_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("dynamic_form_templates", "records_version")
@@ -0,0 +1,41 @@
+"""add content-addressed storage blobs
+
+Revision ID: a7d4c1e9f2b3
+Revises: f6c3b9d4e8a1
+Create Date: 2026-04-10 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d4c1e9f2b3"
+down_revision: Union[str, Sequence[str], None] = "f6c3b9d4e8a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "storage_blobs",
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("physical_path", sa.String(), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("detected_content_type", sa.String(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.PrimaryKeyConstraint("workspace_id", "sha256"),
+    )
+    # Attachments sharing a blob share its path; existing files keep their own paths
+    op.drop_constraint("storage_files_physical_path_key", "storage_files", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("storage_files_physical_path_key", "storage_files", ["physical_path"])
+    op.drop_table("storage_blobs")
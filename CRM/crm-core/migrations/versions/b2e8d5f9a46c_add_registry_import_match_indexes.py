@@ -0,0 +1,45 @@
+"""add registry import match indexes
+
+Revision ID: b2e8d5f9a46c
+Revises: a1d7c4e8f359
+Create Date: 2026-03-25 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b2e8d5f9a46c"
+down_revision: Union[str, Sequence[str], None] = "a1d7c4e8f359"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bulk import matches companies by registration number or email and clients by email
+    op.create_index(
+        "ix_registry_companies_workspace_registration_number",
+        "registry_companies",
+        ["workspace_id", "registration_number"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_registry_companies_workspace_email_lower",
+        "registry_companies",
+        ["workspace_id", sa.text("lower(email)")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_registry_clients_workspace_email_lower",
+        "registry_clients",
+        ["workspace_id", sa.text("lower(email)")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_registry_clients_workspace_email_lower", table_name="registry_clients")
+    op.drop_index("ix_registry_companies_workspace_email_lower", table_name="registry_companies")
+    op.drop_index("ix_registry_companies_workspace_registration_number", table_name="registry_companies")
@@ -0,0 +1,65 @@
+"""add resumable upload sessions
+
+Revision ID: b8e5d2f0a3c4
+Revises: a7d4c1e9f2b3
+Create Date: 2026-04-13 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e5d2f0a3c4"
+down_revision: Union[str, Sequence[str], None] = "a7d4c1e9f2b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "storage_upload_sessions",
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("received_chunks", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("temp_path", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("uploaded_by_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("entity_type", sa.String(), nullable=True),
+        sa.Column("file_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("updated_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("meta_data", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.ForeignKeyConstraint(["uploaded_by_id"], ["access_users.id"]),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.ForeignKeyConstraint(["file_id"], ["storage_files.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_storage_upload_sessions_expires_at",
+        "storage_upload_sessions",
+        ["expires_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_storage_upload_sessions_workspace_uploaded_by",
+        "storage_upload_sessions",
+        ["workspace_id", "uploaded_by_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_storage_upload_sessions_workspace_uploaded_by", table_name="storage_upload_sessions")
+    op.drop_index("ix_storage_upload_sessions_expires_at", table_name="storage_upload_sessions")
+    op.drop_table("storage_upload_sessions")
@@ -0,0 +1,56 @@
+"""add registry client duplicate clusters
+
+Revision ID: c3f9e6a1b57d
+Revises: b2e8d5f9a46c
+Create Date: 2026-03-28 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c3f9e6a1b57d"
+down_revision: Union[str, Sequence[str], None] = "b2e8d5f9a46c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "registry_client_duplicate_clusters",
+        sa.Column("client_ids", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("updated_by_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("meta_data", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["system_jobs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_registry_client_duplicate_clusters_job_score",
+        "registry_client_duplicate_clusters",
+        ["job_id", "score"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_registry_client_duplicate_clusters_workspace_id",
+        "registry_client_duplicate_clusters",
+        ["workspace_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_registry_client_duplicate_clusters_workspace_id", table_name="registry_client_duplicate_clusters")
+    op.drop_index("ix_registry_client_duplicate_clusters_job_score", table_name="registry_client_duplicate_clusters")
+    op.drop_table("registry_client_duplicate_clusters")
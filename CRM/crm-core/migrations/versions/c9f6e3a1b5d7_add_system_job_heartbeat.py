@@ -0,0 +1,25 @@
+"""add heartbeat to system jobs
+
+Revision ID: c9f6e3a1b5d7
+Revises: b8e5d2f0a3c4
+Create Date: 2026-04-14 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c9f6e3a1b5d7"
+down_revision: Union[str, Sequence[str], None] = "b8e5d2f0a3c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("system_jobs", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("system_jobs", "heartbeat_at")
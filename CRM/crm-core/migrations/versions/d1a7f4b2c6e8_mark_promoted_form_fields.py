@@ -0,0 +1,57 @@
+"""mark already backfilled indexed form fields as promoted
+
+Revision ID: d1a7f4b2c6e8
+Revises: c9f6e3a1b5d7
+Create Date: 2026-04-15 00:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d1a7f4b2c6e8"
+down_revision: Union[str, Sequence[str], None] = "c9f6e3a1b5d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filters and sorts now use the typed side table only for fields listed in
+    # meta_data.promoted_fields. Indexed fields whose last backfill completed
+    # (or that never needed one) are complete already.
+    bind = op.get_bind()
+    templates = bind.execute(sa.text(
+        "SELECT id, schema_structure, meta_data FROM dynamic_form_templates"
+    )).mappings().all()
+    for template in templates:
+        indexed = {
+            field["key"]: field.get("type")
+            for field in template["schema_structure"] or []
+            if isinstance(field, dict) and field.get("key") and field.get("indexed")
+        }
+        if not indexed:
+            continue
+        meta = dict(template["meta_data"] or {})
+        job_id = meta.get("field_backfill_job_id")
+        if job_id:
+            status = bind.execute(
+                sa.text("SELECT status FROM system_jobs WHERE id = CAST(:id AS uuid)"),
+                {"id": job_id},
+            ).scalar()
+            if status is not None and status != "completed":
+                continue
+        meta["promoted_fields"] = indexed
+        bind.execute(
+            sa.text(
+                "UPDATE dynamic_form_templates "
+                "SET meta_data = CAST(:meta AS jsonb), version = version + 1 WHERE id = :id"
+            ),
+            {"meta": json.dumps(meta), "id": template["id"]},
+        )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE dynamic_form_templates SET meta_data = meta_data - 'promoted_fields' WHERE meta_data ? 'promoted_fields'")
@@ -0,0 +1,59 @@
+"""add client object attribute index, keyset index and attribute key catalog
+
+Revision ID: d4a1f7b2c68e
+Revises: c3f9e6a1b57d
+Create Date: 2026-04-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a1f7b2c68e"
+down_revision: Union[str, Sequence[str], None] = "c3f9e6a1b57d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "registry_object_attribute_keys",
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("object_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.PrimaryKeyConstraint("workspace_id", "key"),
+    )
+    # Catalog starts from the objects that exist today; writes keep it current afterwards
+    op.execute(
+        """
+        INSERT INTO registry_object_attribute_keys (workspace_id, key, object_count, updated_at)
+        SELECT o.workspace_id, k.key, count(*), now()
+        FROM registry_client_objects AS o
+        CROSS JOIN LATERAL jsonb_object_keys(o.attributes) AS k(key)
+        WHERE jsonb_typeof(o.attributes) = 'object'
+        GROUP BY o.workspace_id, k.key
+        """
+    )
+
+    # Built without blocking registry writes
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_registry_client_objects_attributes "
+            "ON registry_client_objects USING gin (attributes)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_registry_client_objects_workspace_created_at_id "
+            "ON registry_client_objects (workspace_id, created_at, id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_registry_client_objects_workspace_created_at_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_registry_client_objects_attributes")
+    op.drop_table("registry_object_attribute_keys")
@@ -0,0 +1,35 @@
+"""order the company listing index by (created_at, id)
+
+Revision ID: e2b8a5c3d7f9
+Revises: d1a7f4b2c6e8
+Create Date: 2026-04-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b8a5c3d7f9"
+down_revision: Union[str, Sequence[str], None] = "d1a7f4b2c6e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Imported chunks share one created_at; the id breaks ties so offset pages are stable
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_registry_companies_workspace_created_at_id "
+            "ON registry_companies (workspace_id, created_at, id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_registry_companies_workspace_created_at")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_registry_companies_workspace_created_at "
+            "ON registry_companies (workspace_id, created_at)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_registry_companies_workspace_created_at_id")
@@ -0,0 +1,59 @@
+"""add registry tombstones and updated_at indexes for the change feed
+
+Revision ID: e5b2a8c3d79f
+Revises: d4a1f7b2c68e
+Create Date: 2026-04-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b2a8c3d79f"
+down_revision: Union[str, Sequence[str], None] = "d4a1f7b2c68e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPDATED_AT_INDEXES = {
+    "ix_registry_companies_workspace_updated_at_id": "registry_companies",
+    "ix_registry_clients_workspace_updated_at_id": "registry_clients",
+    "ix_registry_client_objects_workspace_updated_at_id": "registry_client_objects",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "registry_tombstones",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("entity_type", sa.String(), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("workspace_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(["workspace_id"], ["access_workspaces.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_registry_tombstones_workspace_deleted_at_id",
+        "registry_tombstones",
+        ["workspace_id", "deleted_at", "id"],
+        unique=False,
+    )
+
+    # Built without blocking registry writes
+    with op.get_context().autocommit_block():
+        for index_name, table_name in UPDATED_AT_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table_name} (workspace_id, updated_at, id)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name in UPDATED_AT_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+    op.drop_index("ix_registry_tombstones_workspace_deleted_at_id", table_name="registry_tombstones")
+    op.drop_table("registry_tombstones")
@@ -0,0 +1,77 @@
+"""order the registry change feed by writing transaction id
+
+Revision ID: f3c9b6d4e8a1
+Revises: e2b8a5c3d7f9
+Create Date: 2026-04-21 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c9b6d4e8a1"
+down_revision: Union[str, Sequence[str], None] = "e2b8a5c3d7f9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CURRENT_XID = "(pg_current_xact_id()::text)::bigint"
+ENTITY_TABLES = ["registry_companies", "registry_clients", "registry_client_objects"]
+FEED_INDEXES = {
+    "registry_companies": "ix_registry_companies_workspace",
+    "registry_clients": "ix_registry_clients_workspace",
+    "registry_client_objects": "ix_registry_client_objects_workspace",
+    "registry_tombstones": "ix_registry_tombstones_workspace",
+}
+
+
+def upgrade() -> None:
+    # Existing rows keep 0 (already settled); a constant default does not rewrite the table
+    for table_name in ENTITY_TABLES:
+        op.add_column(table_name, sa.Column("created_xid", sa.BigInteger(), server_default="0", nullable=False))
+    for table_name in FEED_INDEXES:
+        op.add_column(table_name, sa.Column("change_xid", sa.BigInteger(), server_default="0", nullable=False))
+        op.execute(f"ALTER TABLE {table_name} ALTER COLUMN change_xid SET DEFAULT {CURRENT_XID}")
+    for table_name in ENTITY_TABLES:
+        op.execute(f"ALTER TABLE {table_name} ALTER COLUMN created_xid SET DEFAULT {CURRENT_XID}")
+
+    op.execute(
+        "CREATE OR REPLACE FUNCTION registry_touch_change_xid() RETURNS trigger AS $$ "
+        f"BEGIN NEW.change_xid := {CURRENT_XID}; RETURN NEW; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    for table_name in ENTITY_TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table_name}_change_xid BEFORE UPDATE ON {table_name} "
+            "FOR EACH ROW EXECUTE FUNCTION registry_touch_change_xid()"
+        )
+
+    # Built without blocking registry writes
+    with op.get_context().autocommit_block():
+        for table_name, prefix in FEED_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {prefix}_change_xid_id "
+                f"ON {table_name} (workspace_id, change_xid, id)"
+            )
+        for table_name in ENTITY_TABLES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {FEED_INDEXES[table_name]}_updated_at_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table_name in ENTITY_TABLES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {FEED_INDEXES[table_name]}_updated_at_id "
+                f"ON {table_name} (workspace_id, updated_at, id)"
+            )
+        for prefix in FEED_INDEXES.values():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {prefix}_change_xid_id")
+
+    for table_name in ENTITY_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table_name}_change_xid ON {table_name}")
+    op.execute("DROP FUNCTION IF EXISTS registry_touch_change_xid()")
+    for table_name in FEED_INDEXES:
+        op.drop_column(table_name, "change_xid")
+    for table_name in ENTITY_TABLES:
+        op.drop_column(table_name, "created_xid")
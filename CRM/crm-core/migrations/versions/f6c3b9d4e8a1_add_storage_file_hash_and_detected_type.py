@@ -0,0 +1,27 @@
+"""add sha256 and detected content type to storage files
+
+Revision ID: f6c3b9d4e8a1
+Revises: e5b2a8c3d79f
+Create Date: 2026-04-07 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f6c3b9d4e8a1"
+down_revision: Union[str, Sequence[str], None] = "e5b2a8c3d79f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("storage_files", sa.Column("sha256", sa.String(length=64), nullable=True))
+    op.add_column("storage_files", sa.Column("detected_content_type", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("storage_files", "detected_content_type")
+    op.drop_column("storage_files", "sha256")
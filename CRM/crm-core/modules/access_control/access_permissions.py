@@ -39,6 +39,7 @@ class PermissionService:
             "delete_form_template",
             "view_form_templates",
             "submit_form_record",
+            "import_form_records",
             "view_form_records",
             "view_own_form_records",
             "delete_form_record",
@@ -57,6 +58,7 @@ class PermissionService:
             "edit_client_object",
             "delete_client_object",
             "view_client_objects",
+            "import_registry",
         ],
         UserRole.SYSTEM_ADMIN: [
             "create_user",
@@ -83,6 +85,7 @@ class PermissionService:
             "delete_form_template",
             "view_form_templates",
             "submit_form_record",
+            "import_form_records",
             "view_form_records",
             "delete_form_record",
             "upload_files",
@@ -100,6 +103,7 @@ class PermissionService:
             "edit_client_object",
             "delete_client_object",
             "view_client_objects",
+            "import_registry",
         ],
         UserRole.ADMIN: [
             "create_user",
@@ -126,6 +130,7 @@ class PermissionService:
             "delete_form_template",
             "view_form_templates",
             "submit_form_record",
+            "import_form_records",
             "view_form_records",
             "delete_form_record",
             "upload_files",
@@ -143,6 +148,7 @@ class PermissionService:
             "edit_client_object",
             "delete_client_object",
             "view_client_objects",
+            "import_registry",
         ],
         UserRole.MANAGER: [
             "create_request",
@@ -158,6 +164,7 @@ class PermissionService:
             "edit_form_template",
             "view_form_templates",
             "submit_form_record",
+            "import_form_records",
             "view_form_records",
             "delete_form_record",
             "upload_files",
@@ -172,6 +179,7 @@ class PermissionService:
             "create_client_object",
             "edit_client_object",
             "view_client_objects",
+            "import_registry",
         ],
         UserRole.USER: [
         "create_request",
@@ -0,0 +1,209 @@
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import Numeric, case, cast, func
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import settings
+from modules.dynamic_records.dynamic_cache import TemplateCache
+from modules.dynamic_records.dynamic_fields import promoted_field_keys
+from modules.dynamic_records.dynamic_filters import build_entry_filters
+from modules.dynamic_records.dynamic_models import FormRecord, FormTemplate
+
+AGGREGATES = {"sum": func.sum, "avg": func.avg, "min": func.min, "max": func.max}
+BUCKETS = {"day", "week", "month"}
+DERIVED = {"share", "cumulative"}
+MAX_GROUP_BY = 3
+
+
+def _split(raw: str | None) -> list[str]:
+    return [item.strip() for item in (raw or "").split(",") if item.strip()]
+
+
+def _numeric_value(key: str):
+    """ entry_data -> numeric; non-number values become NULL instead of failing the query """
+    value = FormRecord.entry_data[key]
+    return case((func.jsonb_typeof(value) == "number", cast(value.astext, Numeric)))
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class DynamicAggregationService:
+    """
+    Group/pivot form records in SQL (count, sum, avg, min, max) instead of
+    exporting everything to a spreadsheet. Results are cached per template
+    revision and records_version (bumped by every record write), so repeated
+    dashboard queries cost one primary-key lookup until a record is added,
+    changed or deleted.
+    """
+    _cache = LRUCache(settings.AGGREGATE_CACHE_SIZE)
+
+    @staticmethod
+    def _parse_metrics(raw: str | None, fields: dict) -> list[tuple[str, str, str | None]]:
+        metrics = []
+        for item in _split(raw) or ["count"]:
+            if item == "count":
+                metrics.append(("count", "count", None))
+                continue
+            name, _, key = item.partition(":")
+            if name not in AGGREGATES or not key:
+                raise HTTPException(400, detail=f"Unknown metric '{item}' (use count, sum:field, avg:field, min:field, max:field)")
+            field = fields.get(key)
+            if not field:
+                raise HTTPException(400, detail=f"Unknown metric field '{key}'")
+            if field.get("type") != "number":
+                raise HTTPException(400, detail=f"Metric '{name}' needs a number field ('{key}' is {field.get('type', 'text')})")
+            metrics.append((f"{name}_{key}", name, key))
+        return metrics
+
+    @staticmethod
+    def _records_version(db: Session, template_id) -> int:
+        """ Moves whenever a record of the template is inserted, updated or deleted (mark_records_changed) """
+        return db.query(FormTemplate.records_version).filter(FormTemplate.id == template_id).scalar() or 0
+
+    @staticmethod
+    def aggregate(
+        db: Session,
+        template_id,
+        workspace_id,
+        group_by: str | None = None,
+        metrics: str | None = None,
+        bucket: str | None = None,
+        derived: str | None = None,
+        filters: dict[str, str] | None = None,
+        owner_id=None,
+    ) -> dict:
+        template = TemplateCache.get(db, template_id, workspace_id)
+        fields = {field.get("key"): field for field in template.schema_structure if field.get("key")}
+
+        group_keys = _split(group_by)
+        if len(group_keys) > MAX_GROUP_BY:
+            raise HTTPException(400, detail=f"Too many group_by fields (max {MAX_GROUP_BY})")
+        for key in group_keys:
+            if key not in fields:
+                raise HTTPException(400, detail=f"Unknown group_by field '{key}'")
+        if bucket and bucket not in BUCKETS:
+            raise HTTPException(400, detail="bucket must be one of day, week, month")
+        parsed_metrics = DynamicAggregationService._parse_metrics(metrics, fields)
+        derived_metrics = _split(derived)
+        for name in derived_metrics:
+            if name not in DERIVED:
+                raise HTTPException(400, detail=f"Unknown derived metric '{name}' (use share, cumulative)")
+        if "cumulative" in derived_metrics and not bucket:
+            raise HTTPException(400, detail="cumulative needs a bucket")
+
+        cache_key = (
+            template.id,
+            template.version,
+            template.updated_at,
+            DynamicAggregationService._records_version(db, template.id),
+            str(owner_id) if owner_id else None,
+            tuple(group_keys),
+            tuple(label for label, _, _ in parsed_metrics),
+            bucket,
+            tuple(derived_metrics),
+            tuple(sorted((filters or {}).items())),
+        )
+        cached = DynamicAggregationService._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        group_columns = [FormRecord.entry_data[key].astext.label(f"g{index}") for index, key in enumerate(group_keys)]
+        if bucket:
+            group_columns.insert(0, func.date_trunc(bucket, FormRecord.created_at).label("bucket"))
+        metric_columns = []
+        for label, name, key in parsed_metrics:
+            if name == "count":
+                metric_columns.append(func.count(FormRecord.id).label(label))
+            else:
+                metric_columns.append(AGGREGATES[name](_numeric_value(key)).label(label))
+
+        query = db.query(*group_columns, *metric_columns).select_from(FormRecord).join(
+            FormTemplate, FormRecord.template_id == FormTemplate.id
+        ).filter(
+            FormRecord.template_id == template.id,
+            FormTemplate.workspace_id == workspace_id
+        )
+        if owner_id:
+            query = query.filter(FormRecord.created_by_id == owner_id)
+        if filters:
+            query = query.filter(*build_entry_filters(
+                template.id, template.schema_structure, filters, promoted_field_keys(template)
+            ))
+        if group_columns:
+            query = query.group_by(*group_columns).order_by(*group_columns)
+
+        max_groups = max(1, settings.MAX_AGGREGATE_GROUPS)
+        try:
+            result_rows = query.limit(max_groups + 1).all()
+        except DataError:
+            db.rollback()
+            raise HTTPException(400, detail="Filter could not be applied to stored values")
+        truncated = len(result_rows) > max_groups
+        result_rows = result_rows[:max_groups]
+
+        rows = []
+        for row in result_rows:
+            mapping = row._mapping
+            rows.append({
+                "keys": {key: mapping[f"g{index}"] for index, key in enumerate(group_keys)},
+                "bucket": _json_value(mapping["bucket"]) if bucket else None,
+                "values": {label: _json_value(mapping[label]) for label, _, _ in parsed_metrics},
+            })
+        if derived_metrics and rows:
+            DynamicAggregationService._apply_derived(rows, group_keys, [label for label, _, _ in parsed_metrics], bucket, derived_metrics)
+
+        result = {
+            "template_id": str(template.id),
+            "version": template.version,
+            "group_by": group_keys,
+            "bucket": bucket,
+            "metrics": [label for label, _, _ in parsed_metrics],
+            "rows": rows,
+            "truncated": truncated,
+        }
+        DynamicAggregationService._cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def _apply_derived(rows: list, group_keys: list, metric_labels: list, bucket: str | None, derived: list) -> None:
+        """
+        Vectorized derived metrics over the (already small) grouped result:
+        - share: value / total of its bucket (or of the whole result)
+        - cumulative: running total per group across buckets
+        """
+        import pandas as pd
+
+        additive = [label for label in metric_labels if label == "count" or label.startswith("sum_")]
+        if not additive:
+            return
+        frame = pd.DataFrame(
+            [{**{f"k:{key}": row["keys"].get(key) for key in group_keys}, "bucket": row["bucket"], **row["values"]} for row in rows]
+        )
+        group_columns = [f"k:{key}" for key in group_keys]
+        for label in additive:
+            values = pd.to_numeric(frame[label], errors="coerce").fillna(0)
+            if "share" in derived:
+                totals = values.groupby(frame["bucket"]).transform("sum") if bucket else values.sum()
+                frame[f"{label}_share"] = (values / totals).where(totals != 0)
+            if "cumulative" in derived:
+                ordered = frame.assign(_value=values).sort_values("bucket", kind="stable")
+                if group_columns:
+                    running = ordered.groupby(group_columns, dropna=False)["_value"].cumsum()
+                else:
+                    running = ordered["_value"].cumsum()
+                frame[f"{label}_cumulative"] = running.reindex(frame.index)
+
+        derived_columns = [column for column in frame.columns if column.endswith("_share") or column.endswith("_cumulative")]
+        for index, row in enumerate(rows):
+            for column in derived_columns:
+                value = frame.at[index, column]
+                row["values"][column] = None if pd.isna(value) else float(value)
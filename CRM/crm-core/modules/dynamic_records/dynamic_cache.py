@@ -0,0 +1,185 @@
+import copy
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import settings
+from modules.dynamic_records.dynamic_models import FormTemplate, FormTemplateVersion
+from modules.dynamic_records.dynamic_templating import compile_request_text
+from modules.dynamic_records.dynamic_validation import compile_validator
+
+
+@dataclass(frozen=True)
+class TemplateVersionSnapshot:
+    """ Read-only copy of an (immutable) FormTemplateVersion row """
+    id: UUID
+    template_id: UUID
+    version: int
+    schema_structure: list
+    created_at: datetime | None
+
+    @cached_property
+    def validator(self):
+        # Versions never change, so this is compiled once for the life of the process
+        return compile_validator(self.schema_structure)
+
+
+@dataclass(frozen=True)
+class TemplateSnapshot:
+    """
+    Read-only copy of a FormTemplate row.
+    Exposes the same attribute names as the ORM model so services and response
+    schemas can use either interchangeably. Never mutate the nested JSON.
+    """
+    id: UUID
+    workspace_id: UUID
+    name: str
+    schema_structure: list
+    meta_data: dict | None
+    version: int
+    created_at: datetime | None
+    updated_at: datetime | None
+    schema_version: TemplateVersionSnapshot | None = None
+
+    @property
+    def version_id(self) -> UUID | None:
+        """ Current schema version; new records are pinned to it """
+        return self.schema_version.id if self.schema_version else None
+
+    @property
+    def request_settings(self) -> dict | None:
+        return (self.meta_data or {}).get("request_settings")
+
+    @cached_property
+    def validator(self):
+        # Shared with the schema version, so name/settings edits do not recompile it
+        if self.schema_version is not None:
+            return self.schema_version.validator
+        return compile_validator(self.schema_structure)
+
+    @cached_property
+    def request_text(self):
+        # Title/description templates parsed once per template version: render(data) -> (title, description)
+        return compile_request_text(self.name, self.schema_structure, self.request_settings)
+
+    @cached_property
+    def indexed_fields(self) -> list:
+        return [field for field in self.schema_structure if field.get("key") and field.get("indexed")]
+
+    @property
+    def etag(self) -> str:
+        return template_etag(self.id, self.version)
+
+
+def template_etag(template_id, version: int) -> str:
+    return f'"{template_id}-v{version}"'
+
+
+def mark_records_changed(db: Session, template_id) -> None:
+    """
+    Bump records_version in the caller's transaction; call it right before the
+    commit so the template row stays locked only for the commit itself.
+    Leaves version/updated_at alone, so template snapshots and ETags stay valid.
+    """
+    db.execute(
+        text("UPDATE dynamic_form_templates SET records_version = records_version + 1 WHERE id = :template_id"),
+        {"template_id": template_id},
+    )
+
+
+class TemplateCache:
+    """
+    Process-local cache of template snapshots keyed by template id.
+    Every lookup still checks the (tiny) version column in the database, so a
+    template changed by another worker is reloaded on the next access.
+    """
+    _cache = LRUCache(settings.TEMPLATE_CACHE_SIZE)
+
+    @staticmethod
+    def current_version(db: Session, template_id, workspace_id) -> int:
+        row = db.query(FormTemplate.version).filter(
+            FormTemplate.id == template_id,
+            FormTemplate.workspace_id == workspace_id
+        ).first()
+        if not row:
+            raise HTTPException(404, detail="Form Template not found")
+        return row.version or 1
+
+    @staticmethod
+    def get(db: Session, template_id, workspace_id, version: int | None = None) -> TemplateSnapshot:
+        if version is None:
+            version = TemplateCache.current_version(db, template_id, workspace_id)
+        cached = TemplateCache._cache.get(template_id)
+        if cached is not None and cached.version == version and cached.workspace_id == workspace_id:
+            return cached
+
+        template = db.query(FormTemplate).filter(
+            FormTemplate.id == template_id,
+            FormTemplate.workspace_id == workspace_id
+        ).first()
+        if not template:
+            raise HTTPException(404, detail="Form Template not found")
+        latest = db.query(FormTemplateVersion).filter(
+            FormTemplateVersion.template_id == template.id
+        ).order_by(FormTemplateVersion.version.desc()).first()
+        return TemplateCache.store(template, TemplateVersionCache.store(latest) if latest else None)
+
+    @staticmethod
+    def store(template: FormTemplate, schema_version: TemplateVersionSnapshot | None = None) -> TemplateSnapshot:
+        snapshot = TemplateSnapshot(
+            id=template.id,
+            workspace_id=template.workspace_id,
+            name=template.name,
+            schema_structure=copy.deepcopy(template.schema_structure or []),
+            meta_data=copy.deepcopy(template.meta_data) if template.meta_data else None,
+            version=template.version or 1,
+            created_at=template.created_at,
+            updated_at=template.updated_at,
+            schema_version=schema_version,
+        )
+        TemplateCache._cache.set(template.id, snapshot)
+        return snapshot
+
+    @staticmethod
+    def invalidate(template_id) -> None:
+        TemplateCache._cache.invalidate(template_id)
+
+
+class TemplateVersionCache:
+    """
+    Process-local cache of schema versions keyed by version id.
+    Versions are immutable, so entries are never revalidated or invalidated;
+    they only fall out through LRU eviction.
+    """
+    _cache = LRUCache(settings.TEMPLATE_CACHE_SIZE)
+
+    @staticmethod
+    def get(db: Session, version_id) -> TemplateVersionSnapshot:
+        cached = TemplateVersionCache._cache.get(version_id)
+        if cached is not None:
+            return cached
+        row = db.query(FormTemplateVersion).filter(FormTemplateVersion.id == version_id).first()
+        if not row:
+            raise HTTPException(404, detail="Template version not found")
+        return TemplateVersionCache.store(row)
+
+    @staticmethod
+    def store(row: FormTemplateVersion) -> TemplateVersionSnapshot:
+        cached = TemplateVersionCache._cache.get(row.id)
+        if cached is not None:
+            return cached
+        snapshot = TemplateVersionSnapshot(
+            id=row.id,
+            template_id=row.template_id,
+            version=row.version,
+            schema_structure=copy.deepcopy(row.schema_structure or []),
+            created_at=row.created_at,
+        )
+        TemplateVersionCache._cache.set(row.id, snapshot)
+        return snapshot
@@ -0,0 +1,253 @@
+import json
+import time
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from modules.dynamic_records.dynamic_cache import TemplateCache, mark_records_changed
+from modules.dynamic_records.dynamic_fields import FIELD_BACKFILL_JOB_TYPE, DynamicFieldService, set_promoted_fields
+from modules.dynamic_records.dynamic_models import FormRecord, FormRecordField
+from modules.dynamic_records.dynamic_validation import compile_validator
+from modules.jobs.job_enums import JobStatus
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+
+FIELD_OPERATION_JOB_TYPE = "form_field_operation"
+FIELD_OPERATIONS = ("rename", "drop", "default")
+# A chunk that cannot get its row locks in time is retried after a growing pause
+LOCK_RETRIES = 5
+LOCK_NOT_AVAILABLE = "55P03"
+
+# One statement per operation; every chunk is bounded by (after_id, upper_id] and returns the changed ids
+_CHUNK_FILTER = "template_id = :template_id AND id > :after_id AND (CAST(:upper_id AS uuid) IS NULL OR id <= :upper_id)"
+_OPERATION_SQL = {
+    "rename": (
+        "UPDATE dynamic_form_records "
+        "SET entry_data = (entry_data - CAST(:field_key AS text)) "
+        "|| jsonb_build_object(CAST(:new_key AS text), entry_data -> CAST(:field_key AS text)), updated_at = now() "
+        f"WHERE {_CHUNK_FILTER} AND entry_data ? CAST(:field_key AS text) "
+        "AND (:overwrite OR NOT entry_data ? CAST(:new_key AS text)) RETURNING id"
+    ),
+    "drop": (
+        "UPDATE dynamic_form_records "
+        "SET entry_data = entry_data - CAST(:field_key AS text), updated_at = now() "
+        f"WHERE {_CHUNK_FILTER} AND entry_data ? CAST(:field_key AS text) RETURNING id"
+    ),
+    "default": (
+        "UPDATE dynamic_form_records "
+        "SET entry_data = jsonb_set(entry_data, ARRAY[CAST(:field_key AS text)], CAST(:value AS jsonb), true), "
+        "updated_at = now() "
+        f"WHERE {_CHUNK_FILTER} AND (NOT entry_data ? CAST(:field_key AS text) "
+        "OR (:overwrite AND jsonb_typeof(entry_data -> CAST(:field_key AS text)) = 'null')) RETURNING id"
+    ),
+}
+
+
+def _is_lock_timeout(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+
+
+class DynamicFieldOperationService:
+    """
+    Rename, drop or default one field across every record of a template.
+    Runs as a job of short chunked UPDATEs so it is safe on a live table: each
+    chunk is its own transaction with a lock timeout, chunks are paced, and the
+    id cursor is persisted so a failed run can be resumed where it stopped.
+    """
+
+    @staticmethod
+    def _validate(template, operation: str, field_key: str, new_key: str | None, value) -> None:
+        if operation not in FIELD_OPERATIONS:
+            raise HTTPException(400, detail=f"Unsupported operation (allowed: {', '.join(FIELD_OPERATIONS)})")
+        if not field_key:
+            raise HTTPException(400, detail="field_key is required")
+        fields = {field.get("key"): field for field in template.schema_structure if field.get("key")}
+        if operation == "rename":
+            if not new_key or new_key == field_key:
+                raise HTTPException(400, detail="new_key is required and must differ from field_key")
+            if new_key not in fields:
+                raise HTTPException(400, detail=f"Field '{new_key}' is not in the template schema")
+        if operation == "default":
+            if field_key not in fields:
+                raise HTTPException(400, detail=f"Field '{field_key}' is not in the template schema")
+            if value is None:
+                raise HTTPException(400, detail="value is required for the default operation")
+            # Same type rules as a submission, for this one field only
+            error = compile_validator([{**fields[field_key], "required": False}])({field_key: value})
+            if error:
+                raise HTTPException(400, detail=error)
+
+    @staticmethod
+    def _dedupe_key(template_id) -> str:
+        # One operation per template at a time; chunks of two jobs must not interleave
+        return f"{FIELD_OPERATION_JOB_TYPE}:{template_id}"
+
+    @staticmethod
+    def _queue(db: Session, workspace_id, current_user, params: dict) -> BackgroundJob:
+        dedupe_key = DynamicFieldOperationService._dedupe_key(params["template_id"])
+        if JobService.find_active_job(db, workspace_id, dedupe_key):
+            raise HTTPException(409, detail="Another field operation is already running for this template")
+        try:
+            return JobService.create_job(
+                db,
+                workspace_id,
+                FIELD_OPERATION_JOB_TYPE,
+                requested_by_id=current_user.id,
+                params=params,
+                dedupe_key=dedupe_key,
+            )
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(409, detail="Another field operation is already running for this template")
+
+    @staticmethod
+    def start_operation(
+        db: Session,
+        template_id,
+        workspace_id,
+        operation: str,
+        field_key: str,
+        current_user,
+        new_key: str | None = None,
+        value=None,
+        overwrite: bool = False,
+    ) -> BackgroundJob:
+        template = TemplateCache.get(db, template_id, workspace_id)
+        operation = (operation or "").strip().lower()
+        DynamicFieldOperationService._validate(template, operation, field_key, new_key, value)
+        params = {
+            "template_id": str(template.id),
+            "operation": operation,
+            "field_key": field_key,
+            "new_key": new_key if operation == "rename" else None,
+            "value": value if operation == "default" else None,
+            "overwrite": bool(overwrite),
+            "start_after": None,
+        }
+        return DynamicFieldOperationService._queue(db, workspace_id, current_user, params)
+
+    @staticmethod
+    def resume_operation(db: Session, template_id, job_id, workspace_id, current_user) -> BackgroundJob:
+        """
+        New job with the same parameters, starting after the previous job's last
+        committed chunk. Failed jobs can be resumed, and so can jobs left
+        running by a worker that died (no heartbeat for JOB_STALE_TIMEOUT_SECONDS).
+        """
+        previous = JobService.get_job(db, job_id, workspace_id, FIELD_OPERATION_JOB_TYPE)
+        if (previous.params or {}).get("template_id") != str(template_id):
+            raise HTTPException(404, detail="Job not found")
+        if JobService.is_stale(previous):
+            JobService.fail_stale_jobs(workspace_id, DynamicFieldOperationService._dedupe_key(template_id))
+            db.refresh(previous)
+        if previous.status != JobStatus.FAILED.value:
+            raise HTTPException(409, detail="Only failed or stalled field operations can be resumed")
+        params = {
+            **(previous.params or {}),
+            "start_after": (previous.result or {}).get("cursor") or (previous.params or {}).get("start_after"),
+            "resumed_from": str(previous.id),
+        }
+        return DynamicFieldOperationService._queue(db, workspace_id, current_user, params)
+
+    @staticmethod
+    def run_operation(job_id):
+        JobService.run_job(job_id, DynamicFieldOperationService._execute)
+
+    @staticmethod
+    def _next_upper_bound(db: Session, template_id, after_id, batch_size: int):
+        """ Id of the last record in the next chunk (None when fewer than batch_size remain) """
+        return db.query(FormRecord.id).filter(
+            FormRecord.template_id == template_id,
+            FormRecord.id > after_id
+        ).order_by(FormRecord.id).offset(batch_size - 1).limit(1).scalar()
+
+    @staticmethod
+    def _run_chunk(db: Session, statement, values: dict, field_keys: list, template_id, after_id, upper_id) -> int:
+        """ One chunk in its own transaction; retried with backoff while row locks are held elsewhere """
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                db.execute(text(f"SET LOCAL lock_timeout = {int(settings.FIELD_OPERATION_LOCK_TIMEOUT_MS)}"))
+                updated_ids = db.execute(statement, {**values, "after_id": after_id, "upper_id": upper_id}).scalars().all()
+                # Promoted copies of the old key are stale on the changed records only (a rename
+                # skipped because new_key exists keeps field_key); indexed targets are backfilled at the end
+                if field_keys and updated_ids:
+                    db.query(FormRecordField).filter(
+                        FormRecordField.template_id == template_id,
+                        FormRecordField.field_key.in_(field_keys),
+                        FormRecordField.record_id.in_(updated_ids),
+                    ).delete(synchronize_session=False)
+                if updated_ids:
+                    mark_records_changed(db, template_id)
+                db.commit()
+                return len(updated_ids)
+            except OperationalError as exc:
+                db.rollback()
+                if not _is_lock_timeout(exc) or attempt == LOCK_RETRIES:
+                    raise
+                time.sleep(0.5 * (2 ** attempt))
+        return 0
+
+    @staticmethod
+    def _execute(db: Session, job: BackgroundJob) -> dict:
+        params = job.params or {}
+        template_id = uuid.UUID(params["template_id"])
+        operation = params["operation"]
+        field_key = params["field_key"]
+        batch_size = max(1, settings.FIELD_OPERATION_BATCH_ROWS)
+        pause = max(0, settings.FIELD_OPERATION_PAUSE_MS) / 1000
+
+        statement = text(_OPERATION_SQL[operation])
+        values = {
+            "template_id": template_id,
+            "field_key": field_key,
+            "new_key": params.get("new_key"),
+            "value": json.dumps(params.get("value")),
+            "overwrite": bool(params.get("overwrite")),
+        }
+        stale_keys = [field_key] if operation in ("rename", "drop") else []
+        target_key = params.get("new_key") if operation == "rename" else field_key
+        template = TemplateCache.get(db, template_id, job.workspace_id)
+        target_indexed = operation != "drop" and any(field["key"] == target_key for field in template.indexed_fields)
+        if target_indexed:
+            # Changed records have no promoted row for the target until the closing backfill
+            set_promoted_fields(db, template_id, unready=[target_key])
+
+        after_id = uuid.UUID(params["start_after"]) if params.get("start_after") else uuid.UUID(int=0)
+        total = db.query(func.count(FormRecord.id)).filter(
+            FormRecord.template_id == template_id,
+            FormRecord.id > after_id
+        ).scalar() or 0
+        JobService.report_progress(job.id, 0, total=total)
+
+        scanned = 0
+        updated = 0
+        while True:
+            upper_id = DynamicFieldOperationService._next_upper_bound(db, template_id, after_id, batch_size)
+            updated += DynamicFieldOperationService._run_chunk(
+                db, statement, values, stale_keys, template_id, after_id, upper_id
+            )
+            if upper_id is None:
+                scanned = total
+                break
+            scanned += batch_size
+            after_id = upper_id
+            # The cursor is what a resumed run starts after
+            JobService.report_progress(job.id, min(scanned, total), result={"cursor": str(after_id), "updated": updated})
+            if pause:
+                time.sleep(pause)
+
+        result = {"cursor": None, "updated": updated, "scanned": scanned}
+        if target_indexed:
+            backfill = JobService.create_job(
+                db,
+                job.workspace_id,
+                FIELD_BACKFILL_JOB_TYPE,
+                requested_by_id=job.requested_by_id,
+                params={"template_id": str(template_id), "field_keys": [target_key]},
+            )
+            DynamicFieldService.run_backfill(backfill.id)
+            result["field_backfill_job_id"] = str(backfill.id)
+        return result
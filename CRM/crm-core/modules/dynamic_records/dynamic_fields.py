@@ -0,0 +1,268 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from modules.dynamic_records.dynamic_cache import TemplateCache
+from modules.dynamic_records.dynamic_models import FormRecord, FormRecordField, FormTemplate
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+
+FIELD_BACKFILL_JOB_TYPE = "form_field_backfill"
+VALUE_COLUMNS = {"number": "value_number", "date": "value_date", "boolean": "value_bool"}
+# B-tree entries are limited to ~2.7 KB; longer text is promoted as a prefix
+MAX_PROMOTED_TEXT = 512
+# Template meta_data key: {field_key: field_type} of indexed fields whose side-table copy is complete
+PROMOTED_FIELDS_KEY = "promoted_fields"
+
+
+def indexed_fields(schema: list) -> list[dict]:
+    return [field for field in schema or [] if field.get("key") and field.get("indexed")]
+
+
+def promoted_field_keys(template) -> set[str]:
+    """
+    Indexed fields the side table can answer for: backfilled for their current
+    type. Until then filters and sorts read entry_data, so records without a
+    FormRecordField row yet are not dropped.
+    """
+    ready = (template.meta_data or {}).get(PROMOTED_FIELDS_KEY) or {}
+    return {
+        field["key"] for field in indexed_fields(template.schema_structure)
+        if field["key"] in ready and ready[field["key"]] == field.get("type")
+    }
+
+
+def set_promoted_fields(db: Session, template_id, ready: dict | None = None, unready: list | None = None) -> None:
+    """
+    Record side-table readiness in the template's meta_data and commit. The
+    version bump makes every worker reload its cached snapshot.
+    """
+    template = db.query(FormTemplate).filter(FormTemplate.id == template_id).with_for_update().first()
+    if not template:
+        return
+    meta = dict(template.meta_data or {})
+    promoted = {key: field_type for key, field_type in (meta.get(PROMOTED_FIELDS_KEY) or {}).items() if key not in (unready or [])}
+    promoted.update(ready or {})
+    meta[PROMOTED_FIELDS_KEY] = promoted
+    template.meta_data = meta
+    template.version = FormTemplate.version + 1
+    db.commit()
+    TemplateCache.invalidate(template_id)
+
+
+def value_column(field: dict) -> str:
+    return VALUE_COLUMNS.get(field.get("type"), "value_text")
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def typed_value(field: dict, value):
+    """ entry_data value -> value for the field's typed column (None when it does not fit) """
+    if value is None or value == "":
+        return None
+    column = value_column(field)
+    if column == "value_number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value
+    if column == "value_bool":
+        return value if isinstance(value, bool) else None
+    if column == "value_date":
+        return _parse_date(value)
+    return str(value)[:MAX_PROMOTED_TEXT]
+
+
+def build_field_rows(template_id, fields: list, record_id, data: dict) -> list[dict]:
+    rows = []
+    for field in fields:
+        value = typed_value(field, (data or {}).get(field["key"]))
+        if value is None:
+            continue
+        row = {
+            "record_id": record_id,
+            "field_key": field["key"],
+            "template_id": template_id,
+            "value_number": None,
+            "value_text": None,
+            "value_date": None,
+            "value_bool": None,
+        }
+        row[value_column(field)] = value
+        rows.append(row)
+    return rows
+
+
+def write_field_rows(db: Session, rows: list[dict]) -> None:
+    """ Upsert promoted values; every typed column is overwritten so type changes converge """
+    if not rows:
+        return
+    statement = pg_insert(FormRecordField)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FormRecordField.record_id, FormRecordField.field_key],
+            set_={
+                "template_id": statement.excluded.template_id,
+                "value_number": statement.excluded.value_number,
+                "value_text": statement.excluded.value_text,
+                "value_date": statement.excluded.value_date,
+                "value_bool": statement.excluded.value_bool,
+            },
+        ),
+        rows,
+    )
+
+
+def _filter_value(field: dict, raw: str):
+    column = value_column(field)
+    label = field.get("label") or field.get("key")
+    if column == "value_number":
+        try:
+            return Decimal(raw)
+        except InvalidOperation:
+            raise HTTPException(400, detail=f"Filter for '{label}' must be a number")
+    if column == "value_date":
+        parsed = _parse_date(raw)
+        if parsed is None:
+            raise HTTPException(400, detail=f"Filter for '{label}' must be a date (YYYY-MM-DD)")
+        return parsed
+    if column == "value_bool":
+        raise HTTPException(400, detail=f"Range filters are not supported for '{label}'")
+    return raw
+
+
+def promoted_filter(template_id, field: dict, op: str, raw: str):
+    """ Range filter (or prefix on a text field) answered from the typed side table """
+    column = getattr(FormRecordField, value_column(field))
+    if op == "prefix":
+        if value_column(field) != "value_text":
+            raise HTTPException(400, detail=f"Prefix filters are not supported for '{field.get('label') or field.get('key')}'")
+        escaped = raw.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condition = column.like(f"{escaped}%", escape="\\")
+    else:
+        value = _filter_value(field, raw)
+        if op == "gt":
+            condition = column > value
+        elif op == "gte":
+            condition = column >= value
+        elif op == "lt":
+            condition = column < value
+        else:
+            condition = column <= value
+    return FormRecord.id.in_(
+        select(FormRecordField.record_id).where(
+            FormRecordField.template_id == template_id,
+            FormRecordField.field_key == field["key"],
+            condition,
+        )
+    )
+
+
+class DynamicFieldService:
+    """ Keeps dynamic_form_record_fields in step with the `indexed` flags of a template """
+
+    @staticmethod
+    def sync_template_fields(db: Session, template, previous_schema: list, current_user=None) -> BackgroundJob | None:
+        """
+        Called inside a template update, before commit. Drops promoted values of
+        fields that are no longer indexed and queues a backfill job for newly
+        indexed fields (or indexed fields whose type changed).
+        """
+        before = {field["key"]: field.get("type") for field in indexed_fields(previous_schema)}
+        after = {field["key"]: field.get("type") for field in indexed_fields(template.schema_structure)}
+
+        removed = [key for key in before if key not in after]
+        if removed:
+            db.query(FormRecordField).filter(
+                FormRecordField.template_id == template.id,
+                FormRecordField.field_key.in_(removed)
+            ).delete(synchronize_session=False)
+
+        pending = [key for key, field_type in after.items() if before.get(key) != field_type]
+        if removed or pending:
+            # Pending fields are answered from entry_data until their backfill completes
+            meta = dict(template.meta_data or {})
+            meta[PROMOTED_FIELDS_KEY] = {
+                key: field_type for key, field_type in (meta.get(PROMOTED_FIELDS_KEY) or {}).items()
+                if key not in removed and key not in pending
+            }
+            template.meta_data = meta
+        if not pending:
+            return None
+        return JobService.create_job(
+            db,
+            template.workspace_id,
+            FIELD_BACKFILL_JOB_TYPE,
+            requested_by_id=current_user.id if current_user else None,
+            params={"template_id": str(template.id), "field_keys": pending},
+            commit=False,
+        )
+
+    @staticmethod
+    def run_backfill(job_id):
+        JobService.run_job(job_id, DynamicFieldService._execute_backfill)
+
+    @staticmethod
+    def _execute_backfill(db: Session, job: BackgroundJob) -> dict:
+        """
+        Walk the template's records in id order (keyset pagination) and upsert the
+        promoted values, committing per batch so locks and WAL stay small.
+        Records submitted meanwhile are written by the submit path itself.
+        Once every record is covered the fields are marked promoted, which lets
+        filters and sorts use the side table.
+        """
+        params = job.params or {}
+        template = TemplateCache.get(db, uuid.UUID(params["template_id"]), job.workspace_id)
+        wanted = set(params.get("field_keys") or [])
+        fields = [field for field in indexed_fields(template.schema_structure) if field["key"] in wanted]
+        if not fields:
+            return {"backfilled": 0, "field_keys": []}
+
+        batch_size = max(1, settings.FIELD_BACKFILL_BATCH_ROWS)
+        total = db.query(func.count(FormRecord.id)).filter(FormRecord.template_id == template.id).scalar() or 0
+        JobService.report_progress(job.id, 0, total=total)
+
+        processed = 0
+        last_id = None
+        while True:
+            query = db.query(FormRecord.id, FormRecord.entry_data).filter(FormRecord.template_id == template.id)
+            if last_id is not None:
+                query = query.filter(FormRecord.id > last_id)
+            batch = query.order_by(FormRecord.id).limit(batch_size).all()
+            if not batch:
+                break
+            rows = []
+            for record_id, entry_data in batch:
+                rows.extend(build_field_rows(template.id, fields, record_id, entry_data))
+            write_field_rows(db, rows)
+            db.commit()
+            last_id = batch[-1].id
+            processed += len(batch)
+            JobService.report_progress(job.id, processed)
+
+        # Only types the template still has; a later type change queued its own backfill
+        current = TemplateCache.get(db, template.id, job.workspace_id)
+        current_types = {field["key"]: field.get("type") for field in current.indexed_fields}
+        ready = {
+            field["key"]: field.get("type") for field in fields
+            if field["key"] in current_types and current_types[field["key"]] == field.get("type")
+        }
+        if ready:
+            set_promoted_fields(db, template.id, ready=ready)
+        return {"backfilled": processed, "field_keys": [field["key"] for field in fields]}
@@ -0,0 +1,177 @@
+import hashlib
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import Numeric, cast, not_, or_
+from sqlalchemy.orm import aliased
+
+from modules.dynamic_records.dynamic_fields import promoted_filter, value_column
+from modules.dynamic_records.dynamic_models import FormRecord, FormRecordField
+
+FILTER_PARAM = re.compile(r"^filter\[(?P<key>[^\]]+)\]$")
+OPERATORS = {"eq", "ne", "in", "gt", "gte", "lt", "lte", "contains", "prefix", "exists"}
+RANGE_OPERATORS = {"gt", "gte", "lt", "lte"}
+MAX_FILTERS = 10
+RECORD_SORT_COLUMNS = {"created_at": FormRecord.created_at, "updated_at": FormRecord.updated_at}
+
+
+def parse_filter_params(query_params) -> dict[str, str]:
+    """
+    Collect `filter[field]=op:value` query params.
+    A value without a known `op:` prefix is treated as `eq:value`.
+    """
+    filters = {}
+    for name, value in query_params.multi_items():
+        match = FILTER_PARAM.match(name)
+        if match:
+            filters[match.group("key")] = value
+    if len(filters) > MAX_FILTERS:
+        raise HTTPException(400, detail=f"Too many filters (max {MAX_FILTERS})")
+    return filters
+
+
+def split_operator(raw: str) -> tuple[str, str]:
+    op, sep, value = (raw or "").partition(":")
+    if sep and op in OPERATORS:
+        return op, value
+    return "eq", raw or ""
+
+
+def _typed_value(field: dict, raw: str):
+    field_type = field.get("type", "text")
+    label = field.get("label") or field.get("key")
+    if field_type == "number":
+        try:
+            number = float(raw)
+        except ValueError:
+            raise HTTPException(400, detail=f"Filter for '{label}' must be a number")
+        return int(number) if number.is_integer() and raw.lstrip("+-").isdigit() else number
+    if field_type == "boolean":
+        lowered = raw.strip().lower()
+        if lowered not in ("true", "false"):
+            raise HTTPException(400, detail=f"Filter for '{label}' must be true/false")
+        return lowered == "true"
+    return raw
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def field_expression(field: dict):
+    """
+    `entry_data ->> key`, cast to numeric for number fields. Kept identical to the
+    expression indexes created by `field_index_sql` so the planner can use them.
+    """
+    text_value = FormRecord.entry_data[field["key"]].astext
+    if field.get("type") == "number":
+        return cast(text_value, Numeric)
+    return text_value
+
+
+def build_entry_filters(template_id, schema: list, filters: dict[str, str], promoted: set[str] = frozenset()) -> list:
+    """
+    Compile filters into SQL clauses using the template's field types.
+    Equality uses JSONB containment (@>) so the GIN jsonb_path_ops index applies;
+    ranges on `promoted` fields (and prefixes on promoted text fields) use the
+    typed side table, other ranges and text matching use typed `->>` expressions.
+    `promoted` holds the indexed fields whose backfill has completed
+    (`promoted_field_keys`).
+    """
+    fields = {field.get("key"): field for field in schema or [] if field.get("key")}
+    clauses = []
+    for key, raw in filters.items():
+        field = fields.get(key)
+        if not field:
+            raise HTTPException(400, detail=f"Unknown filter field '{key}'")
+        op, raw_value = split_operator(raw)
+
+        # LIKE only applies to value_text; a prefix on other promoted types matches the JSONB text
+        promoted_prefix = op == "prefix" and value_column(field) == "value_text"
+        if field.get("indexed") and key in promoted and (op in RANGE_OPERATORS or promoted_prefix):
+            clauses.append(promoted_filter(template_id, field, op, raw_value))
+        elif op == "exists":
+            present = FormRecord.entry_data.has_key(key)
+            clauses.append(present if raw_value.strip().lower() != "false" else not_(present))
+        elif op == "eq":
+            clauses.append(FormRecord.entry_data.contains({key: _typed_value(field, raw_value)}))
+        elif op == "ne":
+            clauses.append(not_(FormRecord.entry_data.contains({key: _typed_value(field, raw_value)})))
+        elif op == "in":
+            values = [item for item in raw_value.split(",") if item != ""]
+            if not values:
+                raise HTTPException(400, detail=f"Filter for '{key}' needs at least one value")
+            clauses.append(or_(*[
+                FormRecord.entry_data.contains({key: _typed_value(field, item)}) for item in values
+            ]))
+        elif op in RANGE_OPERATORS:
+            if field.get("type") == "boolean":
+                raise HTTPException(400, detail=f"Operator '{op}' is not supported for '{key}'")
+            expression = field_expression(field)
+            value = _typed_value(field, raw_value)
+            if op == "gt":
+                clauses.append(expression > value)
+            elif op == "gte":
+                clauses.append(expression >= value)
+            elif op == "lt":
+                clauses.append(expression < value)
+            else:
+                clauses.append(expression <= value)
+        elif op == "contains":
+            clauses.append(FormRecord.entry_data[key].astext.ilike(f"%{_escape_like(raw_value)}%", escape="\\"))
+        elif op == "prefix":
+            clauses.append(FormRecord.entry_data[key].astext.like(f"{_escape_like(raw_value)}%", escape="\\"))
+    return clauses
+
+
+def apply_record_sort(query, template_id, schema: list, sort: str | None, promoted: set[str] = frozenset()):
+    """
+    `sort=field_key` / `sort=-field_key` (descending). Promoted indexed fields sort
+    on the typed side table; other template fields fall back to the JSONB value.
+    Default is newest first.
+    """
+    if not sort:
+        return query.order_by(FormRecord.created_at.desc())
+    descending = sort.startswith("-")
+    key = sort.lstrip("-+")
+
+    if key in RECORD_SORT_COLUMNS:
+        column = RECORD_SORT_COLUMNS[key]
+        return query.order_by(column.desc() if descending else column.asc(), FormRecord.id)
+
+    field = next((f for f in schema or [] if f.get("key") == key), None)
+    if not field:
+        raise HTTPException(400, detail=f"Unknown sort field '{key}'")
+
+    if field.get("indexed") and key in promoted:
+        promoted_row = aliased(FormRecordField)
+        query = query.outerjoin(
+            promoted_row,
+            (promoted_row.record_id == FormRecord.id) & (promoted_row.field_key == key)
+        )
+        column = getattr(promoted_row, value_column(field))
+    else:
+        column = field_expression(field)
+    ordering = column.desc().nulls_last() if descending else column.asc().nulls_last()
+    return query.order_by(ordering, FormRecord.id)
+
+
+def field_index_name(template_id, key: str) -> str:
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+    return f"ix_dfr_field_{template_id.hex[:16]}_{digest}"
+
+
+def field_index_sql(template_id, field: dict) -> str:
+    """
+    Partial expression index for one hot field of one template.
+    Values are inlined because DDL does not accept bind parameters; the key is
+    quoted as a SQL literal and the template id is a UUID.
+    """
+    key_literal = "'" + str(field["key"]).replace("'", "''") + "'"
+    expression = f"(entry_data ->> {key_literal})"
+    if field.get("type") == "number":
+        expression = f"CAST({expression} AS NUMERIC)"
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {field_index_name(template_id, field['key'])} "
+        f"ON dynamic_form_records (({expression})) WHERE template_id = '{template_id}'"
+    )
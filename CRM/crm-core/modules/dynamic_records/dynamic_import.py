@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import date, datetime
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from core.config import settings
+from core.tabular_reader import detect_format, iter_rows, spool_upload
+from modules.dynamic_records.dynamic_cache import TemplateCache, mark_records_changed
+from modules.dynamic_records.dynamic_fields import build_field_rows
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+
+IMPORT_JOB_TYPE = "form_import"
+TRUE_VALUES = {"true", "yes", "y", "1", "on"}
+FALSE_VALUES = {"false", "no", "n", "0", "off"}
+RECORD_STAGING_COPY = "COPY dynamic_import_staging (id, entry_data) FROM STDIN WITH (FORMAT csv)"
+FIELD_STAGING_COPY = (
+    "COPY dynamic_import_field_staging "
+    "(record_id, field_key, value_number, value_text, value_date, value_bool) FROM STDIN WITH (FORMAT csv)"
+)
+
+
+class DynamicImportService:
+    """
+    Spreadsheet import into dynamic_form_records.
+    Rows are validated with the template's compiled validator, valid rows are
+    COPY'd into a temp staging table and moved with one INSERT ... SELECT.
+    Imported rows are historical data: no workflow requests are created for them.
+    """
+
+    @staticmethod
+    def start_import(
+        db: Session,
+        template_id,
+        workspace_id,
+        upload_file: UploadFile,
+        current_user,
+        column_map: dict | None = None,
+    ) -> BackgroundJob:
+        file_format = detect_format(upload_file.filename)
+        TemplateCache.get(db, template_id, workspace_id)  # 404 early
+        source_path = spool_upload(upload_file, settings.MAX_IMPORT_MB * 1024 * 1024)
+        return JobService.create_job(
+            db,
+            workspace_id,
+            IMPORT_JOB_TYPE,
+            requested_by_id=current_user.id,
+            params={
+                "template_id": str(template_id),
+                "filename": upload_file.filename,
+                "format": file_format,
+                "_source_path": source_path,
+                "column_map": column_map or {},
+            },
+        )
+
+    @staticmethod
+    def run_import(job_id):
+        JobService.run_job(job_id, DynamicImportService._execute)
+
+    @staticmethod
+    def get_error_file(db: Session, job_id, workspace_id, current_user) -> str:
+        job = JobService.get_job(db, job_id, workspace_id, IMPORT_JOB_TYPE, current_user)
+        path = (job.result or {}).get("_error_file")
+        if not path or not os.path.exists(path):
+            raise HTTPException(404, detail="No error rows for this import")
+        return path
+
+    @staticmethod
+    def _map_columns(header: list, schema: list, column_map: dict) -> dict[int, dict]:
+        """Map column positions to template fields (explicit map, then key, then label)."""
+        by_key = {str(f.get("key")): f for f in schema if f.get("key")}
+        by_name = {}
+        for field in schema:
+            if field.get("key"):
+                by_name[str(field["key"]).strip().lower()] = field
+        for field in schema:
+            label = str(field.get("label") or "").strip().lower()
+            if label and label not in by_name:
+                by_name[label] = field
+        explicit = {str(k).strip().lower(): v for k, v in (column_map or {}).items()}
+
+        mapping = {}
+        for position, raw_name in enumerate(header):
+            name = str(raw_name or "").strip().lower()
+            if not name:
+                continue
+            if name in explicit:
+                field = by_key.get(str(explicit[name]))
+            else:
+                field = by_name.get(name)
+            if field:
+                mapping[position] = field
+        return mapping
+
+    @staticmethod
+    def _coerce(value, field_type: str):
+        """Spreadsheet cell -> the JSON value the form UI would have submitted."""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                return None
+        if field_type == "number":
+            if isinstance(value, str):
+                candidate = value.replace(" ", "")
+                if candidate.count(",") == 1 and "." not in candidate:
+                    candidate = candidate.replace(",", ".")  # decimal comma
+                else:
+                    candidate = candidate.replace(",", "")  # thousands separators
+                if candidate.lstrip("+-").isdigit():
+                    return int(candidate)
+                try:
+                    return float(candidate)
+                except ValueError:
+                    return value  # validator reports it
+            return value
+        if field_type == "boolean":
+            if isinstance(value, str):
+                lowered = value.lower()
+                if lowered in TRUE_VALUES:
+                    return True
+                if lowered in FALSE_VALUES:
+                    return False
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and value in (0, 1):
+                return bool(value)
+            return value
+        if isinstance(value, datetime):
+            return value.date().isoformat() if field_type == "date" else value.isoformat()
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Text-like fields are strings in the UI (phones, codes typed into Excel)
+            return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+        return value
+
+    @staticmethod
+    def _copy_rows(db: Session, buffer: io.StringIO, copy_sql: str = RECORD_STAGING_COPY):
+        buffer.seek(0)
+        raw_connection = db.connection().connection
+        with raw_connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, buffer)
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    @staticmethod
+    def _execute(db: Session, job: BackgroundJob) -> dict:
+        params = job.params or {}
+        source_path = params.get("_source_path")
+        template = TemplateCache.get(db, uuid.UUID(params["template_id"]), job.workspace_id)
+        validator = template.validator
+        chunk_rows = max(1, settings.IMPORT_COPY_CHUNK_ROWS)
+
+        error_dir = os.path.join(settings.FILE_STORAGE_ROOT, str(job.workspace_id), "imports")
+        os.makedirs(error_dir, exist_ok=True)
+        error_path = os.path.join(error_dir, f"{job.id}_errors.csv")
+
+        db.execute(text(
+            "CREATE TEMP TABLE dynamic_import_staging (id uuid NOT NULL, entry_data jsonb NOT NULL) ON COMMIT DROP"
+        ))
+        promoted = template.indexed_fields
+        if promoted:
+            db.execute(text(
+                "CREATE TEMP TABLE dynamic_import_field_staging ("
+                "record_id uuid NOT NULL, field_key text NOT NULL, value_number numeric, "
+                "value_text text, value_date date, value_bool boolean) ON COMMIT DROP"
+            ))
+
+        processed = imported = failed = 0
+        ignored_columns: list[str] = []
+        buffer = io.StringIO()
+        copy_writer = csv.writer(buffer)
+        field_buffer = io.StringIO()
+        field_writer = csv.writer(field_buffer)
+        pending = 0
+        try:
+            with open(error_path, "w", newline="", encoding="utf-8") as error_handle:
+                error_writer = csv.writer(error_handle)
+                rows = iter_rows(source_path, params.get("format") or "csv")
+                header_row = next(rows, None)
+                if header_row is None:
+                    raise HTTPException(400, detail="File is empty")
+                header = [str(cell).strip() if cell is not None else "" for cell in header_row[1]]
+                mapping = DynamicImportService._map_columns(header, template.schema_structure, params.get("column_map") or {})
+                if not mapping:
+                    raise HTTPException(400, detail="No columns match template fields")
+                ignored_columns = [name for position, name in enumerate(header) if name and position not in mapping]
+                error_writer.writerow(["row_number", "error", *header])
+
+                for row_number, cells in rows:
+                    processed += 1
+                    data = {}
+                    for position, field in mapping.items():
+                        value = cells[position] if position < len(cells) else None
+                        coerced = DynamicImportService._coerce(value, field.get("type", "text"))
+                        if coerced is not None:
+                            data[field["key"]] = coerced
+                    error = validator(data)
+                    if error:
+                        failed += 1
+                        error_writer.writerow([row_number, error, *["" if c is None else c for c in cells]])
+                    else:
+                        record_id = uuid.uuid4()
+                        copy_writer.writerow([str(record_id), json.dumps(data, ensure_ascii=False)])
+                        for field_row in build_field_rows(template.id, promoted, record_id, data):
+                            # Unquoted empty CSV fields load as NULL
+                            field_writer.writerow([
+                                field_row["record_id"],
+                                field_row["field_key"],
+                                field_row["value_number"],
+                                field_row["value_text"],
+                                field_row["value_date"],
+                                field_row["value_bool"],
+                            ])
+                        pending += 1
+                        imported += 1
+
+                    if pending >= chunk_rows:
+                        DynamicImportService._copy_rows(db, buffer)
+                        if promoted:
+                            DynamicImportService._copy_rows(db, field_buffer, FIELD_STAGING_COPY)
+                        pending = 0
+                    if processed % chunk_rows == 0:
+                        JobService.report_progress(job.id, processed, failed)
+
+            if pending:
+                DynamicImportService._copy_rows(db, buffer)
+                if promoted:
+                    DynamicImportService._copy_rows(db, field_buffer, FIELD_STAGING_COPY)
+
+            # One set-based move from staging into the real table
+            now = get_utc_now()
+            db.execute(
+                text(
+                    """
+                    INSERT INTO dynamic_form_records
+                        (id, template_id, template_version_id, entry_data, meta_data,
+                         created_at, updated_at, created_by_id, updated_by_id)
+                    SELECT id, :template_id, :template_version_id, entry_data, CAST(:meta_data AS jsonb),
+                           :now, :now, :user_id, :user_id
+                    FROM dynamic_import_staging
+                    """
+                ),
+                {
+                    "template_id": template.id,
+                    "template_version_id": template.version_id,
+                    "meta_data": json.dumps({"import_job_id": str(job.id)}),
+                    "now": now,
+                    "user_id": job.requested_by_id,
+                },
+            )
+            if promoted:
+                db.execute(
+                    text(
+                        """
+                        INSERT INTO dynamic_form_record_fields
+                            (record_id, field_key, template_id, value_number, value_text, value_date, value_bool)
+                        SELECT record_id, field_key, :template_id, value_number, value_text, value_date, value_bool
+                        FROM dynamic_import_field_staging
+                        """
+                    ),
+                    {"template_id": template.id},
+                )
+            mark_records_changed(db, template.id)
+            db.commit()
+        finally:
+            if source_path:
+                try:
+                    os.remove(source_path)
+                except OSError:
+                    pass
+
+        if not failed:
+            try:
+                os.remove(error_path)
+            except OSError:
+                pass
+        JobService.report_progress(job.id, processed, failed)
+        return {
+            "imported": imported,
+            "failed": failed,
+            "ignored_columns": ignored_columns,
+            "has_error_file": bool(failed),
+            "_error_file": error_path if failed else None,
+        }
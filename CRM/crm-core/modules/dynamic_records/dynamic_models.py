@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, ForeignKey, Index
+import uuid
+
+from sqlalchemy import Column, String, Integer, Numeric, Text, Date, DateTime, Boolean, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from core.base_models import CRMBasedModel
+from core.base_models import CRMBasedModel, get_utc_now
+from core.database_connector import Base
 
 class FormTemplate(CRMBasedModel):
     __tablename__ = "dynamic_form_templates"
@@ -11,19 +14,96 @@ class FormTemplate(CRMBasedModel):
 
     name = Column(String, nullable=False)
     schema_structure = Column(JSONB, nullable=False, default=list) 
+
+    # Bumped on every template change; used as cache key and ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Bumped whenever the template's records are written; aggregate cache key
+    records_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # CHANGE: access_tenants -> access_workspaces
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
 
 
+class FormTemplateVersion(Base):
+    """
+    Immutable copy of a template schema, written on every schema change.
+    Records point at the version they were validated against, so anything compiled
+    from a version (validators, column lists) can be cached without invalidation.
+    `version` counts schema changes only; FormTemplate.version also moves on
+    name/settings edits.
+    """
+    __tablename__ = "dynamic_form_template_versions"
+    __table_args__ = (
+        UniqueConstraint("template_id", "version", name="uq_dynamic_form_template_versions_template_version"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    template_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("dynamic_form_templates.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    version = Column(Integer, nullable=False)
+    schema_structure = Column(JSONB, nullable=False, default=list)
+    created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
+    created_by_id = Column(UUID(as_uuid=True), nullable=True)
+
+
 class FormRecord(CRMBasedModel):
     __tablename__ = "dynamic_form_records"
     __table_args__ = (
         Index("ix_dynamic_form_records_template_created_at", "template_id", "created_at"),
         Index("ix_dynamic_form_records_template_created_by_id", "template_id", "created_by_id"),
+        Index("ix_dynamic_form_records_template_id_id", "template_id", "id"),
+        Index("ix_dynamic_form_records_request_id", "request_id"),
+        Index("ix_dynamic_form_records_template_version_id", "template_id", "template_version_id"),
+        Index(
+            "ix_dynamic_form_records_entry_data_gin",
+            "entry_data",
+            postgresql_using="gin",
+            postgresql_ops={"entry_data": "jsonb_path_ops"},
+        ),
     )
 
     template_id = Column(UUID(as_uuid=True), ForeignKey("dynamic_form_templates.id"), nullable=False)
+    # Schema version the row was validated against (NULL for rows created before versioning)
+    template_version_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("dynamic_form_template_versions.id"),
+        nullable=True
+    )
     entry_data = Column(JSONB, nullable=False, default=dict)
+    # Request auto-created from this row (template request_settings); cleared if the request is deleted
+    request_id = Column(UUID(as_uuid=True), ForeignKey("workflow_requests.id", ondelete="SET NULL"), nullable=True)
 
     template = relationship("FormTemplate")
+    request = relationship("Request")
+
+
+class FormRecordField(Base):
+    """
+    Typed copy of the template fields marked `indexed` (one row per record and field).
+    Maintained on submit/import and backfilled by a job, so sorting and range filters
+    on business fields use B-tree indexes instead of scanning entry_data.
+    Not a CRMBasedModel: rows are derived data and carry no audit columns.
+    """
+    __tablename__ = "dynamic_form_record_fields"
+    __table_args__ = (
+        Index("ix_dynamic_form_record_fields_number", "template_id", "field_key", "value_number"),
+        Index("ix_dynamic_form_record_fields_text", "template_id", "field_key", "value_text"),
+        Index("ix_dynamic_form_record_fields_date", "template_id", "field_key", "value_date"),
+        Index("ix_dynamic_form_record_fields_bool", "template_id", "field_key", "value_bool"),
+    )
+
+    record_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("dynamic_form_records.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    field_key = Column(String, primary_key=True)
+    template_id = Column(UUID(as_uuid=True), ForeignKey("dynamic_form_templates.id"), nullable=False)
+
+    value_number = Column(Numeric, nullable=True)
+    value_text = Column(Text, nullable=True)
+    value_date = Column(Date, nullable=True)
+    value_bool = Column(Boolean, nullable=True)
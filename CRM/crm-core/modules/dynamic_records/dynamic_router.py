@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from uuid import UUID
 from core.database_connector import get_db
 from core.workspace_resolver import resolve_workspace_id
 from core.config import settings
+from core.http_cache import etag_matches
+from core.export_formats import export_filename, export_media_type, resolve_export_format
+from modules.dynamic_records.dynamic_cache import template_etag
+from modules.dynamic_records.dynamic_filters import parse_filter_params
+from modules.dynamic_records.dynamic_fields import FIELD_BACKFILL_JOB_TYPE
+from modules.dynamic_records.dynamic_aggregation import DynamicAggregationService
 from modules.dynamic_records.dynamic_service import DynamicRecordService
+from modules.dynamic_records.dynamic_import import DynamicImportService, IMPORT_JOB_TYPE
+from modules.dynamic_records.dynamic_versions import DynamicVersionService, VERSION_MIGRATION_JOB_TYPE
+from modules.dynamic_records.dynamic_field_ops import DynamicFieldOperationService, FIELD_OPERATION_JOB_TYPE
+from modules.jobs.job_service import JobService
 from modules.dynamic_records.dynamic_schemas import (
-    TemplateCreateRequest, TemplateUpdateRequest, RecordSubmitRequest, TemplateResponse, RecordResponse, RequestSettings, RecordQueueItem
+    TemplateCreateRequest, TemplateUpdateRequest, RecordSubmitRequest, TemplateResponse, RecordResponse, RequestSettings, RecordQueueItem,
+    RecordBatchSubmitRequest, RecordBatchSubmitResponse, FieldOperationRequest
 )
 # Protect these routes! Only logged in users.
 from modules.access_control.access_security import get_current_user
@@ -26,7 +38,8 @@ def _serialize_request_settings(settings: Optional[RequestSettings]):
         "department_field_key": settings.department_field_key,
         "priority": settings.priority.value if hasattr(settings.priority, "value") else str(settings.priority),
         "title_template": settings.title_template,
-        "description_template": settings.description_template
+        "description_template": settings.description_template,
+        "missing_placeholder": settings.missing_placeholder
     }
 
 @router.post("/template", response_model=TemplateResponse)
@@ -60,18 +73,28 @@ def list_form_templates(
 @router.get("/templates/{template_id}", response_model=TemplateResponse)
 def get_form_template(
     template_id: UUID,
+    request: Request,
+    response: Response,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     PermissionService.require_permission(current_user, "view_form_templates")
     workspace_id = resolve_workspace_id(current_user, workspace_id)
-    return DynamicRecordService.get_template(db, template_id, workspace_id)
+    # Compare the client's ETag against the version column before touching the schema JSON
+    version = DynamicRecordService.get_template_version(db, template_id, workspace_id)
+    etag = template_etag(template_id, version)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+    return DynamicRecordService.get_template_snapshot(db, template_id, workspace_id, version)
 
 @router.put("/templates/{template_id}", response_model=TemplateResponse)
 def update_form_template(
     template_id: UUID,
     payload: TemplateUpdateRequest,
+    background_tasks: BackgroundTasks,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -79,7 +102,9 @@ def update_form_template(
     PermissionService.require_permission(current_user, "edit_form_template")
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     structure = [x.model_dump() for x in payload.structure] if payload.structure is not None else None
-    template = DynamicRecordService.update_template(db, template_id, workspace_id, payload.name, structure)
+    template = DynamicRecordService.update_template(
+        db, template_id, workspace_id, payload.name, structure, current_user, background_tasks
+    )
     if payload.request_settings is not None:
         request_settings = _serialize_request_settings(payload.request_settings)
         template = DynamicRecordService.update_template_settings(db, template_id, workspace_id, request_settings)
@@ -96,6 +121,158 @@ def delete_form_template(
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     return DynamicRecordService.delete_template(db, template_id, workspace_id)
 
+@router.put("/templates/{template_id}/field-indexes/{field_key}")
+def create_form_field_index(
+    template_id: UUID,
+    field_key: str,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Opt-in expression index for a frequently filtered field """
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return DynamicRecordService.create_field_index(db, template_id, workspace_id, field_key)
+
+@router.delete("/templates/{template_id}/field-indexes/{field_key}")
+def drop_form_field_index(
+    template_id: UUID,
+    field_key: str,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return DynamicRecordService.drop_field_index(db, template_id, workspace_id, field_key)
+
+@router.get("/templates/{template_id}/versions")
+def list_form_template_versions(
+    template_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Schema versions (newest first) with the number of records pinned to each """
+    PermissionService.require_permission(current_user, "view_form_templates")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return DynamicVersionService.list_versions(db, template_id, workspace_id)
+
+@router.get("/templates/{template_id}/versions/{version}")
+def get_form_template_version(
+    template_id: UUID,
+    version: int,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "view_form_templates")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return DynamicVersionService.get_version(db, template_id, workspace_id, version)
+
+@router.post("/templates/{template_id}/versions/migrate")
+def migrate_form_records_to_current_version(
+    template_id: UUID,
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Re-validate older records against the current schema and pin the ones that pass """
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = DynamicVersionService.start_migration(db, template_id, workspace_id, current_user)
+    background_tasks.add_task(DynamicVersionService.run_migration, job.id)
+    return JobService.serialize_job(job)
+
+@router.get("/templates/{template_id}/versions/migrate/{job_id}")
+def get_form_version_migration(
+    template_id: UUID,
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = JobService.get_job(db, job_id, workspace_id, VERSION_MIGRATION_JOB_TYPE)
+    if (job.params or {}).get("template_id") != str(template_id):
+        raise HTTPException(404, detail="Job not found")
+    return JobService.serialize_job(job)
+
+@router.post("/templates/{template_id}/field-operations")
+def start_form_field_operation(
+    template_id: UUID,
+    payload: FieldOperationRequest,
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Rename, drop or default a field in every record of the template (chunked background job) """
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = DynamicFieldOperationService.start_operation(
+        db,
+        template_id,
+        workspace_id,
+        payload.operation,
+        payload.field_key,
+        current_user,
+        new_key=payload.new_key,
+        value=payload.value,
+        overwrite=payload.overwrite,
+    )
+    background_tasks.add_task(DynamicFieldOperationService.run_operation, job.id)
+    return JobService.serialize_job(job)
+
+@router.get("/templates/{template_id}/field-operations/{job_id}")
+def get_form_field_operation(
+    template_id: UUID,
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = JobService.get_job(db, job_id, workspace_id, FIELD_OPERATION_JOB_TYPE)
+    if (job.params or {}).get("template_id") != str(template_id):
+        raise HTTPException(404, detail="Job not found")
+    return JobService.serialize_job(job)
+
+@router.post("/templates/{template_id}/field-operations/{job_id}/resume")
+def resume_form_field_operation(
+    template_id: UUID,
+    job_id: UUID,
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Continue a failed operation after its last committed chunk """
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = DynamicFieldOperationService.resume_operation(db, template_id, job_id, workspace_id, current_user)
+    background_tasks.add_task(DynamicFieldOperationService.run_operation, job.id)
+    return JobService.serialize_job(job)
+
+@router.get("/templates/{template_id}/field-backfill/{job_id}")
+def get_form_field_backfill(
+    template_id: UUID,
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Progress of populating newly `indexed` fields for existing records """
+    PermissionService.require_permission(current_user, "edit_form_template")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job = JobService.get_job(db, job_id, workspace_id, FIELD_BACKFILL_JOB_TYPE)
+    if (job.params or {}).get("template_id") != str(template_id):
+        raise HTTPException(404, detail="Job not found")
+    return JobService.serialize_job(job)
+
 @router.post("/submit")
 def fill_out_form(
     submission: RecordSubmitRequest,
@@ -110,15 +287,84 @@ def fill_out_form(
         db, submission.template_id, submission.data, workspace_id, current_user
     )
 
+@router.post("/submit/batch", response_model=RecordBatchSubmitResponse)
+def fill_out_form_batch(
+    submission: RecordBatchSubmitRequest,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Integrations submit many rows for one template in a single call """
+    PermissionService.require_permission(current_user, "submit_form_record")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return DynamicRecordService.submit_records_batch(
+        db, submission.template_id, submission.records, workspace_id, current_user
+    )
+
+@router.post("/import")
+def import_form_records(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    template_id: UUID = Form(...),
+    column_map: Optional[str] = Form(None),  # JSON object: {"Spreadsheet column": "field_key"}
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Import a CSV/XLSX sheet into a template as a background job """
+    PermissionService.require_permission(current_user, "import_form_records")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    parsed_map = None
+    if column_map:
+        try:
+            parsed_map = json.loads(column_map)
+        except ValueError:
+            raise HTTPException(400, detail="column_map must be a JSON object")
+        if not isinstance(parsed_map, dict):
+            raise HTTPException(400, detail="column_map must be a JSON object")
+    job = DynamicImportService.start_import(db, template_id, workspace_id, file, current_user, parsed_map)
+    background_tasks.add_task(DynamicImportService.run_import, job.id)
+    return JobService.serialize_job(job)
+
+@router.get("/import/{job_id}")
+def get_form_import(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "import_form_records")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return JobService.serialize_job(JobService.get_job(db, job_id, workspace_id, IMPORT_JOB_TYPE, current_user))
+
+@router.get("/import/{job_id}/errors")
+def download_form_import_errors(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Rejected rows with the reason, as CSV """
+    PermissionService.require_permission(current_user, "import_form_records")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    path = DynamicImportService.get_error_file(db, job_id, workspace_id, current_user)
+    return FileResponse(path=path, media_type="text/csv", filename=f"import_{job_id}_errors.csv")
+
 @router.get("/records", response_model=List[RecordResponse])
 def list_form_records(
     template_id: UUID,
+    request: Request,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
     skip: int = 0,
-    limit: int = settings.DEFAULT_PAGE_SIZE
+    limit: int = settings.DEFAULT_PAGE_SIZE,
+    sort: Optional[str] = None
 ):
+    """
+    Supports `filter[field]=op:value` (eq, ne, in, gt, gte, lt, lte, contains, prefix, exists)
+    and `sort=field` / `sort=-field`
+    """
     if current_user.role in (UserRole.USER, UserRole.VIEWER):
         PermissionService.require_permission(current_user, "view_own_form_records")
         owner_id = current_user.id
@@ -126,16 +372,19 @@ def list_form_records(
         PermissionService.require_permission(current_user, "view_form_records")
         owner_id = None
     workspace_id = resolve_workspace_id(current_user, workspace_id)
-    return DynamicRecordService.list_records(db, template_id, workspace_id, owner_id, skip, limit)
+    filters = parse_filter_params(request.query_params)
+    return DynamicRecordService.list_records(db, template_id, workspace_id, owner_id, skip, limit, filters, sort)
 
 @router.get("/records/queue", response_model=List[RecordQueueItem])
 def list_form_records_queue(
     template_id: UUID,
+    request: Request,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user),
     skip: int = 0,
-    limit: int = settings.DEFAULT_PAGE_SIZE
+    limit: int = settings.DEFAULT_PAGE_SIZE,
+    sort: Optional[str] = None
 ):
     if current_user.role in (UserRole.USER, UserRole.VIEWER):
         PermissionService.require_permission(current_user, "view_own_form_records")
@@ -144,7 +393,10 @@ def list_form_records_queue(
         PermissionService.require_permission(current_user, "view_form_records")
         owner_id = None
     workspace_id = resolve_workspace_id(current_user, workspace_id)
-    return DynamicRecordService.list_records_with_requests(db, template_id, workspace_id, owner_id, skip, limit)
+    filters = parse_filter_params(request.query_params)
+    return DynamicRecordService.list_records_with_requests(
+        db, template_id, workspace_id, owner_id, skip, limit, filters, sort
+    )
 
 @router.get("/records/by-request/{request_id}", response_model=RecordResponse)
 def get_record_by_request(
@@ -156,13 +408,45 @@ def get_record_by_request(
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     return DynamicRecordService.get_record_by_request_id(db, request_id, workspace_id, current_user)
 
+@router.get("/records/aggregate")
+def aggregate_form_records(
+    template_id: UUID,
+    request: Request,
+    group_by: Optional[str] = None,
+    metrics: Optional[str] = None,
+    bucket: Optional[str] = None,
+    derived: Optional[str] = None,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Grouped counts/sums computed in the database.
+    Example: `group_by=status&metrics=count,sum:amount&bucket=month`
+    """
+    if current_user.role in (UserRole.USER, UserRole.VIEWER):
+        PermissionService.require_permission(current_user, "view_own_form_records")
+        owner_id = current_user.id
+    else:
+        PermissionService.require_permission(current_user, "view_form_records")
+        owner_id = None
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    filters = parse_filter_params(request.query_params)
+    return DynamicAggregationService.aggregate(
+        db, template_id, workspace_id, group_by, metrics, bucket, derived, filters, owner_id
+    )
+
 @router.get("/records/excel")
 def export_form_records_excel(
     template_id: UUID,
+    request: Request,
     workspace_id: Optional[UUID] = None,
+    sort: Optional[str] = None,
+    format: str = "xlsx",
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
+    """ Export records as .xlsx (or `format=csv|ndjson|parquet`) """
     if current_user.role in (UserRole.USER, UserRole.VIEWER):
         PermissionService.require_permission(current_user, "view_own_form_records")
         owner_id = current_user.id
@@ -170,15 +454,17 @@ def export_form_records_excel(
         PermissionService.require_permission(current_user, "view_form_records")
         owner_id = None
     workspace_id = resolve_workspace_id(current_user, workspace_id)
-    file_stream, safe_name = DynamicRecordService.export_records_excel(
-        db, template_id, workspace_id, owner_id
+    filters = parse_filter_params(request.query_params)
+    export_format = resolve_export_format(format)
+    file_stream, safe_name = DynamicRecordService.export_records(
+        db, template_id, workspace_id, owner_id, filters, sort, export_format
     )
     headers = {
-        "Content-Disposition": f'attachment; filename="{safe_name}_records.xlsx"'
+        "Content-Disposition": f'attachment; filename="{export_filename(f"{safe_name}_records", export_format)}"'
     }
     return StreamingResponse(
         file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=export_media_type(export_format),
         headers=headers
     )
 
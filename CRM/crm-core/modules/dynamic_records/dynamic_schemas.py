@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime
 from uuid import UUID
 from modules.workflow.workflow_enums import RequestPriority
@@ -10,6 +10,7 @@ class SchemaField(BaseModel):
     label: str
     type: str # text, number, boolean, department_select
     required: bool = False
+    indexed: bool = False  # promoted to typed B-tree columns for sort/range filters
 
 class RequestSettings(BaseModel):
     enabled: bool = False
@@ -18,6 +19,7 @@ class RequestSettings(BaseModel):
     priority: RequestPriority = RequestPriority.MEDIUM
     title_template: Optional[str] = None
     description_template: Optional[str] = None
+    missing_placeholder: Literal["keep", "empty"] = "keep"  # placeholders without a row value
 
 # Request to create a new Template
 class TemplateCreateRequest(BaseModel):
@@ -36,11 +38,39 @@ class RecordSubmitRequest(BaseModel):
     template_id: UUID
     data: Dict[str, Any]
 
+# Request to submit many rows for one template
+class RecordBatchSubmitRequest(BaseModel):
+    template_id: UUID
+    records: List[Dict[str, Any]]
+
+class RecordBatchResultItem(BaseModel):
+    index: int
+    status: str  # created | error
+    record_id: Optional[UUID] = None
+    request_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+class RecordBatchSubmitResponse(BaseModel):
+    template_id: UUID
+    total: int
+    created: int
+    failed: int
+    results: List[RecordBatchResultItem]
+
+# Admin bulk change of one field across all records of a template
+class FieldOperationRequest(BaseModel):
+    operation: Literal["rename", "drop", "default"]
+    field_key: str
+    new_key: Optional[str] = None  # rename target
+    value: Any = None  # default value
+    overwrite: bool = False  # rename: replace an existing new_key; default: also fill explicit nulls
+
 class TemplateResponse(BaseModel):
     id: UUID
     name: str
     schema_structure: List[Dict]
     meta_data: Optional[Dict[str, Any]] = None
+    version: int = 1
     model_config = ConfigDict(from_attributes=True)
 
 class RecordResponse(BaseModel):
@@ -48,6 +78,8 @@ class RecordResponse(BaseModel):
     template_id: UUID
     entry_data: Dict[str, Any]
     meta_data: Optional[Dict[str, Any]] = None
+    request_id: Optional[UUID] = None
+    template_version_id: Optional[UUID] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
@@ -1,10 +1,18 @@
 import uuid
-from tempfile import SpooledTemporaryFile
 
-from fastapi import HTTPException
-from openpyxl import Workbook
-from sqlalchemy.orm import Session
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session, joinedload
+from core.base_models import get_utc_now
+from core.export_stream import ensure_export_limit, stream_query
+from core.export_formats import column_type, stream_export
 from modules.dynamic_records.dynamic_models import FormTemplate, FormRecord
+from modules.dynamic_records.dynamic_cache import TemplateCache, TemplateSnapshot, mark_records_changed
+from modules.dynamic_records.dynamic_validation import compile_validator
+from modules.dynamic_records.dynamic_filters import apply_record_sort, build_entry_filters, field_index_name, field_index_sql
+from modules.dynamic_records.dynamic_fields import DynamicFieldService, build_field_rows, promoted_field_keys, write_field_rows
+from modules.dynamic_records.dynamic_versions import create_schema_version
 from modules.workflow.workflow_models import Request, Department
 from modules.workflow.workflow_enums import RequestPriority, RequestStatus
 from modules.workflow.workflow_service import WorkflowService
@@ -19,29 +27,9 @@ class DynamicRecordService:
         Loops through the Template Rules and checks the Data.
         Strict 1C-style validation.
         """
-        for field in schema:
-            key = field.get("key")
-            required = field.get("required", False)
-            field_type = field.get("type", "text")
-            
-            value = data.get(key)
-
-            # 1. Check Required
-            if required and (value is None or value == ""):
-                raise HTTPException(400, detail=f"Field '{field['label']}' is required.")
-
-            # 2. Check Type (Strictness)
-            if value is not None:
-                if field_type == "number" and not isinstance(value, (int, float)):
-                    raise HTTPException(400, detail=f"Field '{field['label']}' must be a number.")
-                
-                if field_type == "boolean" and not isinstance(value, bool):
-                    raise HTTPException(400, detail=f"Field '{field['label']}' must be true/false.")
-
-                if field_type == "department_select":
-                    if not isinstance(value, str) or not value.strip():
-                        raise HTTPException(400, detail=f"Field '{field['label']}' must be a department ID.")
-
+        error = compile_validator(schema)(data)
+        if error:
+            raise HTTPException(400, detail=error)
         return True
 
     @staticmethod
@@ -57,26 +45,25 @@ class DynamicRecordService:
             meta_data=meta or None
         )
         db.add(new_template)
+        db.flush()
+        create_schema_version(db, new_template)
         db.commit()
         db.refresh(new_template)
         return new_template
 
     @staticmethod
     def submit_record(db: Session, template_id, raw_data: dict, workspace_id, current_user):
-        # 1. Get the Blueprint
-        template = db.query(FormTemplate).filter(
-            FormTemplate.id == template_id,
-            FormTemplate.workspace_id == workspace_id
-        ).first()
-        if not template:
-            raise HTTPException(404, detail="Form Template not found")
+        # 1. Get the Blueprint (cached per template version)
+        template = DynamicRecordService.get_template_snapshot(db, template_id, workspace_id)
 
         # 2. Run the Validator (The strict check)
-        DynamicRecordService.validate_input(template.schema_structure, raw_data)
+        error = template.validator(raw_data)
+        if error:
+            raise HTTPException(400, detail=error)
 
         # 3. Create Request if enabled
         req = None
-        request_settings = (template.meta_data or {}).get("request_settings") if template.meta_data else None
+        request_settings = template.request_settings
         if request_settings and request_settings.get("enabled"):
             PermissionService.require_permission(current_user, "create_request")
             department_id = request_settings.get("department_id")
@@ -101,13 +88,7 @@ class DynamicRecordService:
             except Exception:
                 priority = RequestPriority.MEDIUM
 
-            title_template = request_settings.get("title_template") or template.name
-            description_template = request_settings.get("description_template")
-            title = DynamicRecordService._render_template(title_template, raw_data)
-            if description_template:
-                description = DynamicRecordService._render_template(description_template, raw_data)
-            else:
-                description = DynamicRecordService._build_default_description(template.schema_structure, raw_data)
+            title, description = template.request_text(raw_data)
 
             req = Request(
                 title=title,
@@ -125,24 +106,165 @@ class DynamicRecordService:
         new_record = FormRecord(
             template_id=template_id,
             entry_data=raw_data,
-            meta_data={}
+            meta_data={},
+            request_id=req.id if req else None,
+            template_version_id=template.version_id
         )
         db.add(new_record)
         db.flush()
+        write_field_rows(db, build_field_rows(template.id, template.indexed_fields, new_record.id, raw_data))
         if req:
-            new_record.meta_data = {
-                **(new_record.meta_data or {}),
-                "request_id": str(req.id)
-            }
             req.meta_data = {
                 **(req.meta_data or {}),
                 "template_id": str(template.id),
                 "record_id": str(new_record.id)
             }
+        mark_records_changed(db, template.id)
         db.commit()
         db.refresh(new_record)
         return new_record
 
+    @staticmethod
+    def submit_records_batch(db: Session, template_id, rows: list, workspace_id, current_user):
+        """
+        Submit many records for one template in a single transaction.
+        Invalid rows are reported and skipped; valid rows (and their linked requests)
+        are bulk-inserted with RETURNING; requests go first so records can reference them.
+        """
+        if len(rows) > settings.MAX_BATCH_SUBMIT_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds max row limit ({settings.MAX_BATCH_SUBMIT_ROWS})"
+            )
+        template = DynamicRecordService.get_template_snapshot(db, template_id, workspace_id)
+        validator = template.validator
+
+        results: list[dict | None] = [None] * len(rows)
+        valid: list[tuple[int, dict]] = []
+        for index, data in enumerate(rows):
+            if not isinstance(data, dict):
+                results[index] = {"index": index, "status": "error", "error": "Row must be an object"}
+                continue
+            error = validator(data)
+            if error:
+                results[index] = {"index": index, "status": "error", "error": error}
+                continue
+            valid.append((index, data))
+
+        request_settings = template.request_settings
+        create_requests = bool(request_settings and request_settings.get("enabled"))
+        render_request_text = template.request_text
+        row_departments: dict[int, uuid.UUID] = {}
+        priority = RequestPriority.MEDIUM
+        if create_requests and valid:
+            PermissionService.require_permission(current_user, "create_request")
+            default_department_id = request_settings.get("department_id")
+            department_field_key = request_settings.get("department_field_key")
+            still_valid = []
+            for index, data in valid:
+                department_id = default_department_id
+                if department_field_key and data.get(department_field_key):
+                    department_id = data.get(department_field_key)
+                if not department_id:
+                    results[index] = {"index": index, "status": "error", "error": "Template request settings missing department_id"}
+                    continue
+                try:
+                    row_departments[index] = uuid.UUID(str(department_id))
+                except Exception:
+                    results[index] = {"index": index, "status": "error", "error": "Invalid department_id in request settings or form data"}
+                    continue
+                still_valid.append((index, data))
+            valid = still_valid
+
+            # Resolve every referenced department with one IN query
+            wanted = set(row_departments.values())
+            existing = set()
+            if wanted:
+                existing = {
+                    row.id for row in db.query(Department.id).filter(
+                        Department.id.in_(wanted),
+                        Department.workspace_id == workspace_id
+                    )
+                }
+            still_valid = []
+            for index, data in valid:
+                if row_departments[index] not in existing:
+                    results[index] = {"index": index, "status": "error", "error": "Department not found"}
+                    continue
+                still_valid.append((index, data))
+            valid = still_valid
+
+            try:
+                priority = RequestPriority(request_settings.get("priority") or RequestPriority.MEDIUM.value)
+            except Exception:
+                priority = RequestPriority.MEDIUM
+
+        now = get_utc_now()
+        record_rows = []
+        request_rows = []
+        field_rows = []
+        for index, data in valid:
+            record_id = uuid.uuid4()
+            request_id = None
+            if create_requests:
+                request_id = uuid.uuid4()
+                title, description = render_request_text(data)
+                request_rows.append({
+                    "id": request_id,
+                    "title": title,
+                    "description": description,
+                    "priority": priority,
+                    "status": RequestStatus.NEW,
+                    "department_id": row_departments[index],
+                    "workspace_id": workspace_id,
+                    "created_by_id": current_user.id,
+                    "updated_by_id": current_user.id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "meta_data": {"template_id": str(template.id), "record_id": str(record_id)},
+                })
+            record_rows.append({
+                "id": record_id,
+                "template_id": template.id,
+                "template_version_id": template.version_id,
+                "entry_data": data,
+                "meta_data": {},
+                "request_id": request_id,
+                "created_by_id": current_user.id,
+                "updated_by_id": current_user.id,
+                "created_at": now,
+                "updated_at": now,
+            })
+            field_rows.extend(build_field_rows(template.id, template.indexed_fields, record_id, data))
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "record_id": str(record_id),
+                "request_id": str(request_id) if request_id else None,
+            }
+
+        # Core inserts bypass the ORM unit of work (auditing columns are set above)
+        if request_rows:
+            db.execute(insert(Request).returning(Request.id, sort_by_parameter_order=True), request_rows)
+        inserted_ids = []
+        if record_rows:
+            inserted_ids = db.execute(
+                insert(FormRecord).returning(FormRecord.id, sort_by_parameter_order=True), record_rows
+            ).scalars().all()
+        write_field_rows(db, field_rows)
+        if inserted_ids:
+            mark_records_changed(db, template.id)
+        db.commit()
+
+        created = len(inserted_ids)
+        return {
+            "template_id": str(template.id),
+            "total": len(rows),
+            "created": created,
+            "failed": len(rows) - created,
+            "results": results,
+        }
+
     @staticmethod
     def list_templates(db: Session, workspace_id, skip: int = 0, limit: int = settings.DEFAULT_PAGE_SIZE):
         limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
@@ -162,25 +284,61 @@ class DynamicRecordService:
         return template
 
     @staticmethod
-    def update_template(db: Session, template_id, workspace_id, name=None, structure=None):
+    def get_template_version(db: Session, template_id, workspace_id) -> int:
+        return TemplateCache.current_version(db, template_id, workspace_id)
+
+    @staticmethod
+    def get_template_snapshot(db: Session, template_id, workspace_id, version: int | None = None) -> TemplateSnapshot:
+        """
+        Read-only template for hot paths (submit, export, GET with ETag).
+        Only the version column is queried when the cached copy is current.
+        """
+        return TemplateCache.get(db, template_id, workspace_id, version)
+
+    @staticmethod
+    def update_template(
+        db: Session,
+        template_id,
+        workspace_id,
+        name=None,
+        structure=None,
+        current_user=None,
+        background_tasks: BackgroundTasks | None = None,
+    ):
         template = DynamicRecordService.get_template(db, template_id, workspace_id)
+        previous_structure = template.schema_structure or []
+        backfill_job = None
         if name is not None:
             template.name = name
-        if structure is not None:
+        if structure is not None and structure != previous_structure:
             template.schema_structure = structure
+            # Old records stay pinned to the version they were validated against
+            create_schema_version(db, template, current_user.id if current_user else None)
+            # Newly `indexed` fields are backfilled into the typed side table by a job
+            backfill_job = DynamicFieldService.sync_template_fields(db, template, previous_structure, current_user)
+            if backfill_job:
+                meta = dict(template.meta_data or {})
+                meta["field_backfill_job_id"] = str(backfill_job.id)
+                template.meta_data = meta
+        template.version = FormTemplate.version + 1
         db.commit()
         db.refresh(template)
+        TemplateCache.invalidate(template.id)
+        if backfill_job and background_tasks is not None:
+            background_tasks.add_task(DynamicFieldService.run_backfill, backfill_job.id)
         return template
 
     @staticmethod
     def update_template_settings(db: Session, template_id, workspace_id, request_settings: dict | None = None):
         template = DynamicRecordService.get_template(db, template_id, workspace_id)
         if request_settings is not None:
-            meta = template.meta_data or {}
+            meta = dict(template.meta_data or {})
             meta["request_settings"] = request_settings
             template.meta_data = meta
+            template.version = FormTemplate.version + 1
         db.commit()
         db.refresh(template)
+        TemplateCache.invalidate(template.id)
         return template
 
     @staticmethod
@@ -191,12 +349,21 @@ class DynamicRecordService:
             raise HTTPException(400, detail="Cannot delete template with existing records")
         db.delete(template)
         db.commit()
+        TemplateCache.invalidate(template_id)
         return {"message": "Template deleted"}
 
     @staticmethod
-    def list_records(db: Session, template_id, workspace_id, owner_id: str | None = None, skip: int = 0, limit: int = settings.DEFAULT_PAGE_SIZE):
-        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
-        skip = max(skip, 0)
+    def _records_query(
+        db: Session,
+        template_id,
+        workspace_id,
+        owner_id: str | None = None,
+        filters: dict[str, str] | None = None,
+        sort: str | None = None,
+        start_dt=None,
+        end_dt=None,
+    ):
+        """ Records of the template; start_dt/end_dt bound created_at as [start_dt, end_dt) """
         query = db.query(FormRecord).join(
             FormTemplate, FormRecord.template_id == FormTemplate.id
         ).filter(
@@ -205,37 +372,105 @@ class DynamicRecordService:
         )
         if owner_id:
             query = query.filter(FormRecord.created_by_id == owner_id)
-        return query.order_by(FormRecord.created_at.desc()).offset(skip).limit(limit).all()
+        if filters or sort:
+            template = DynamicRecordService.get_template_snapshot(db, template_id, workspace_id)
+            if filters:
+                query = query.filter(*build_entry_filters(
+                    template.id, template.schema_structure, filters, promoted_field_keys(template)
+                ))
+            return apply_record_sort(query, template.id, template.schema_structure, sort, promoted_field_keys(template))
+        return query.order_by(FormRecord.created_at.desc())
 
     @staticmethod
-    def list_records_with_requests(db: Session, template_id, workspace_id, owner_id: str | None = None, skip: int = 0, limit: int = settings.DEFAULT_PAGE_SIZE):
-        records = DynamicRecordService.list_records(db, template_id, workspace_id, owner_id, skip, limit)
-        request_ids = set()
-        for record in records:
-            meta = record.meta_data or {}
-            request_id = meta.get("request_id")
-            if request_id:
-                try:
-                    request_ids.add(uuid.UUID(str(request_id)))
-                except Exception:
-                    continue
+    def _fetch_page(db: Session, query, skip: int, limit: int):
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        skip = max(skip, 0)
+        try:
+            return query.offset(skip).limit(limit).all()
+        except DataError:
+            # e.g. a stored value that cannot be cast for a numeric range filter
+            db.rollback()
+            raise HTTPException(400, detail="Filter could not be applied to stored values")
+
+    @staticmethod
+    def list_records(
+        db: Session,
+        template_id,
+        workspace_id,
+        owner_id: str | None = None,
+        skip: int = 0,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+        filters: dict[str, str] | None = None,
+        sort: str | None = None,
+    ):
+        query = DynamicRecordService._records_query(db, template_id, workspace_id, owner_id, filters, sort)
+        return DynamicRecordService._fetch_page(db, query, skip, limit)
+
+    @staticmethod
+    def create_field_index(db: Session, template_id, workspace_id, field_key: str):
+        """
+        Opt-in partial expression index on one field of one template (hot filters).
+        Built CONCURRENTLY outside the session transaction so writes are not blocked.
+        """
+        template = DynamicRecordService.get_template(db, template_id, workspace_id)
+        field = next((f for f in template.schema_structure or [] if f.get("key") == field_key), None)
+        if not field:
+            raise HTTPException(404, detail="Field not found in template")
+        if field.get("type") == "boolean":
+            raise HTTPException(400, detail="Boolean fields are served by the GIN index")
+
+        with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(field_index_sql(template.id, field)))
+
+        meta = dict(template.meta_data or {})
+        indexed = [key for key in meta.get("field_indexes", []) if key != field_key]
+        meta["field_indexes"] = indexed + [field_key]
+        template.meta_data = meta
+        template.version = FormTemplate.version + 1
+        db.commit()
+        db.refresh(template)
+        TemplateCache.invalidate(template.id)
+        return {"field_key": field_key, "index_name": field_index_name(template.id, field_key)}
+
+    @staticmethod
+    def drop_field_index(db: Session, template_id, workspace_id, field_key: str):
+        template = DynamicRecordService.get_template(db, template_id, workspace_id)
+        index_name = field_index_name(template.id, field_key)
+        with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+        meta = dict(template.meta_data or {})
+        meta["field_indexes"] = [key for key in meta.get("field_indexes", []) if key != field_key]
+        template.meta_data = meta
+        template.version = FormTemplate.version + 1
+        db.commit()
+        db.refresh(template)
+        TemplateCache.invalidate(template.id)
+        return {"message": "Field index dropped"}
 
-        request_map = {}
-        if request_ids:
-            requests = db.query(Request).filter(Request.id.in_(list(request_ids))).all()
-            request_map = {str(req.id): req for req in requests}
-
-        items = []
-        for record in records:
-            request_info = None
-            meta = record.meta_data or {}
-            request_id = meta.get("request_id")
-            if request_id:
-                req = request_map.get(str(request_id))
-                if req:
-                    request_info = WorkflowService._serialize_request(req)
-            items.append({"record": record, "request": request_info})
-        return items
+    @staticmethod
+    def list_records_with_requests(
+        db: Session,
+        template_id,
+        workspace_id,
+        owner_id: str | None = None,
+        skip: int = 0,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+        filters: dict[str, str] | None = None,
+        sort: str | None = None,
+    ):
+        """ One page of records with their linked request (and its assignee) loaded in the same query """
+        query = DynamicRecordService._records_query(
+            db, template_id, workspace_id, owner_id, filters, sort
+        ).options(joinedload(FormRecord.request).joinedload(Request.assignee))
+        records = DynamicRecordService._fetch_page(db, query, skip, limit)
+        return [
+            {
+                "record": record,
+                "request": WorkflowService._serialize_request(record.request) if record.request else None,
+            }
+            for record in records
+        ]
 
     @staticmethod
     def delete_record(db: Session, record_id, workspace_id, current_user):
@@ -248,39 +483,30 @@ class DynamicRecordService:
         if not record:
             raise HTTPException(404, detail="Form Record not found")
 
-        request_id = (record.meta_data or {}).get("request_id")
-        if request_id:
+        if record.request_id:
             try:
-                request_uuid = request_id if hasattr(request_id, "hex") else uuid.UUID(str(request_id))
-                WorkflowService.delete_request(db, request_uuid, workspace_id, current_user)
+                WorkflowService.delete_request(db, record.request_id, workspace_id, current_user)
             except HTTPException as exc:
                 if exc.status_code != 404:
                     raise
-            except Exception:
-                raise HTTPException(400, detail="Unable to delete linked request")
 
+        template_id = record.template_id
         db.delete(record)
+        mark_records_changed(db, template_id)
         db.commit()
         return {"message": "Record deleted"}
 
     @staticmethod
     def get_record_by_request_id(db: Session, request_id, workspace_id, current_user):
         req = WorkflowService.get_request_by_id(db, request_id, workspace_id, current_user)
-        record_id = (req.meta_data or {}).get("record_id")
-        if not record_id:
-            raise HTTPException(404, detail="No record linked to this request")
-        try:
-            record_uuid = record_id if hasattr(record_id, "hex") else uuid.UUID(str(record_id))
-        except Exception:
-            raise HTTPException(400, detail="Invalid linked record_id")
         record = db.query(FormRecord).join(
             FormTemplate, FormRecord.template_id == FormTemplate.id
         ).filter(
-            FormRecord.id == record_uuid,
+            FormRecord.request_id == req.id,
             FormTemplate.workspace_id == workspace_id
         ).first()
         if not record:
-            raise HTTPException(404, detail="Linked record not found")
+            raise HTTPException(404, detail="No record linked to this request")
         return record
 
     @staticmethod
@@ -299,72 +525,77 @@ class DynamicRecordService:
         return record
 
     @staticmethod
-    def export_records_excel(db: Session, template_id, workspace_id, owner_id: str | None = None):
-        template = DynamicRecordService.get_template(db, template_id, workspace_id)
-        count_query = db.query(FormRecord).join(
+    def _export_query(
+        db: Session,
+        template: TemplateSnapshot,
+        workspace_id,
+        owner_id=None,
+        filters: dict[str, str] | None = None,
+        sort: str | None = None,
+        start_dt=None,
+        end_dt=None,
+    ):
+        """ Records of the template; start_dt/end_dt bound created_at as [start_dt, end_dt) """
+        query = db.query(FormRecord).join(
             FormTemplate, FormRecord.template_id == FormTemplate.id
         ).filter(
-            FormRecord.template_id == template_id,
+            FormRecord.template_id == template.id,
             FormTemplate.workspace_id == workspace_id
         )
         if owner_id:
-            count_query = count_query.filter(FormRecord.created_by_id == owner_id)
-        total = count_query.count()
-        if total > settings.MAX_EXPORT_ROWS:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Export exceeds max row limit ({settings.MAX_EXPORT_ROWS})"
-            )
+            query = query.filter(FormRecord.created_by_id == owner_id)
+        if start_dt:
+            query = query.filter(FormRecord.created_at >= start_dt)
+        if end_dt:
+            query = query.filter(FormRecord.created_at < end_dt)
+        if filters:
+            query = query.filter(*build_entry_filters(
+                template.id, template.schema_structure, filters, promoted_field_keys(template)
+            ))
+        return apply_record_sort(query, template.id, template.schema_structure, sort, promoted_field_keys(template))
+
+    @staticmethod
+    def export_records(
+        db: Session,
+        template_id,
+        workspace_id,
+        owner_id: str | None = None,
+        filters: dict[str, str] | None = None,
+        sort: str | None = None,
+        export_format: str = "xlsx",
+        progress=None,
+        start_dt=None,
+        end_dt=None,
+    ):
+        template = DynamicRecordService.get_template_snapshot(db, template_id, workspace_id)
+        # Validates filters/sort and enforces the row cap before streaming starts
+        ensure_export_limit(
+            DynamicRecordService._export_query(db, template, workspace_id, owner_id, filters, sort, start_dt, end_dt),
+            export_format=export_format,
+        )
 
         # Build ordered columns based on template structure
+        # (machine formats are keyed by field key, spreadsheets by label)
+        use_keys = export_format in ("ndjson", "parquet")
+        keys = []
         columns = []
         for field in template.schema_structure:
             key = field.get("key")
             label = field.get("label") or key
             if key:
-                columns.append((key, label))
-
-        workbook = Workbook(write_only=True)
-        sheet_name = (template.name or "Template")[:31]
-        sheet = workbook.create_sheet(title=sheet_name)
-        sheet.append([label for _, label in columns])
-
-        records_query = db.query(FormRecord).join(
-            FormTemplate, FormRecord.template_id == FormTemplate.id
-        ).filter(
-            FormRecord.template_id == template_id,
-            FormTemplate.workspace_id == workspace_id
-        )
-        if owner_id:
-            records_query = records_query.filter(FormRecord.created_by_id == owner_id)
-        records_query = records_query.order_by(FormRecord.created_at.desc()).limit(settings.MAX_EXPORT_ROWS)
-
-        for record in records_query.yield_per(1000):
-            row = []
-            for key, _ in columns:
-                row.append(record.entry_data.get(key))
-            sheet.append(row)
-
-        output = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_MB * 1024 * 1024)
-        workbook.save(output)
-        output.seek(0)
-        return output, (template.name or "template")
-
-    @staticmethod
-    def _render_template(text: str, data: dict):
-        rendered = text
-        for key, value in data.items():
-            rendered = rendered.replace(f"{{{key}}}", str(value))
-        return rendered
+                keys.append(key)
+                columns.append((key if use_keys else label, column_type(field.get("type"))))
+
+        def rows():
+            records = stream_query(
+                lambda session: DynamicRecordService._export_query(
+                    session, template, workspace_id, owner_id, filters, sort, start_dt, end_dt
+                ).with_entities(FormRecord.entry_data),
+                progress=progress,
+            )
+            for record in records:
+                entry_data = record.entry_data or {}
+                yield [entry_data.get(key) for key in keys]
 
-    @staticmethod
-    def _build_default_description(schema: list, data: dict):
-        lines = []
-        for field in schema:
-            key = field.get("key")
-            label = field.get("label") or key
-            if not key:
-                continue
-            value = data.get(key)
-            lines.append(f"{label}: {value if value is not None else ''}")
-        return "\n".join(lines)
+        stream = stream_export(export_format, template.name or "Template", columns, rows())
+        return stream, (template.name or "template")
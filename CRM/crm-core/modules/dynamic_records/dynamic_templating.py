@@ -0,0 +1,83 @@
+import re
+from typing import Callable
+
+# {key} or {key:format_spec}; the key is matched verbatim (no trimming)
+_PLACEHOLDER = re.compile(r"\{([^{}:]+)(?::([^{}]*))?\}")
+MISSING_KEEP = "keep"
+MISSING_EMPTY = "empty"
+
+
+def _format_value(value, spec: str | None) -> str:
+    if not spec:
+        return str(value)
+    try:
+        return format(value, spec)
+    except (TypeError, ValueError):
+        # e.g. `{amount:,.2f}` on a text value: fall back to the plain value
+        return str(value)
+
+
+def compile_text_template(text: str, missing: str = MISSING_KEEP) -> Callable[[dict], str]:
+    """
+    Parse `{key}` / `{key:spec}` placeholders once into literal and field tokens.
+    The returned callable renders a row in one pass over the tokens, so the cost
+    no longer grows with the number of keys in the submitted data.
+    `missing` decides what a placeholder without a value becomes: the placeholder
+    text itself (`keep`, the historical behaviour) or nothing (`empty`, which also
+    blanks null values).
+    """
+    # split() yields [literal, key, spec, literal, key, spec, ..., literal]
+    pieces = _PLACEHOLDER.split(text or "")
+    head = pieces[0]
+    tokens = []  # (key, spec, placeholder text, literal after it)
+    for index in range(1, len(pieces), 3):
+        key, spec = pieces[index], pieces[index + 1]
+        placeholder = "{" + key + (f":{spec}" if spec is not None else "") + "}"
+        tokens.append((key, spec, placeholder, pieces[index + 2]))
+    if not tokens:
+        return lambda data: head
+    keep_missing = missing != MISSING_EMPTY
+
+    def render(data: dict) -> str:
+        parts = [head]
+        for key, spec, placeholder, literal in tokens:
+            value = data.get(key)
+            if value is not None or (key in data and keep_missing):
+                parts.append(_format_value(value, spec))
+            elif keep_missing:
+                parts.append(placeholder)
+            parts.append(literal)
+        return "".join(parts)
+
+    return render
+
+
+def compile_default_description(schema: list) -> Callable[[dict], str]:
+    """ `Label: value` per template field, used when no description template is set """
+    fields = [(field["key"], field.get("label") or field["key"]) for field in schema or [] if field.get("key")]
+
+    def render(data: dict) -> str:
+        lines = []
+        for key, label in fields:
+            value = data.get(key)
+            lines.append(f"{label}: {value if value is not None else ''}")
+        return "\n".join(lines)
+
+    return render
+
+
+def compile_request_text(name: str, schema: list, request_settings: dict | None) -> Callable[[dict], tuple[str, str]]:
+    """ Title and description renderer for requests created from a template's rows """
+    request_settings = request_settings or {}
+    missing = request_settings.get("missing_placeholder") or MISSING_KEEP
+    render_title = compile_text_template(request_settings.get("title_template") or name, missing)
+    description_template = request_settings.get("description_template")
+    if description_template:
+        render_description = compile_text_template(description_template, missing)
+    else:
+        render_description = compile_default_description(schema)
+
+    def render(data: dict) -> tuple[str, str]:
+        return render_title(data), render_description(data)
+
+    return render
@@ -0,0 +1,37 @@
+from typing import Callable, Optional
+
+
+def compile_validator(schema: list) -> Callable[[dict], Optional[str]]:
+    """
+    Turn template rules into a single validation callable.
+    The schema is walked once here instead of once per submitted row; the callable
+    returns the first error message for a row, or None when the row is valid.
+    """
+    rules = []
+    for field in schema or []:
+        key = field.get("key")
+        label = field.get("label") or key
+        rules.append((key, label, bool(field.get("required", False)), field.get("type", "text")))
+
+    def validate(data: dict) -> Optional[str]:
+        for key, label, required, field_type in rules:
+            value = data.get(key)
+
+            # 1. Check Required
+            if required and (value is None or value == ""):
+                return f"Field '{label}' is required."
+
+            # 2. Check Type (Strictness)
+            if value is not None:
+                if field_type == "number" and not isinstance(value, (int, float)):
+                    return f"Field '{label}' must be a number."
+
+                if field_type == "boolean" and not isinstance(value, bool):
+                    return f"Field '{label}' must be true/false."
+
+                if field_type == "department_select":
+                    if not isinstance(value, str) or not value.strip():
+                        return f"Field '{label}' must be a department ID."
+        return None
+
+    return validate
@@ -0,0 +1,176 @@
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.context import get_current_user_id
+from modules.dynamic_records.dynamic_cache import TemplateCache, TemplateVersionCache
+from modules.dynamic_records.dynamic_models import FormRecord, FormTemplate, FormTemplateVersion
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+
+VERSION_MIGRATION_JOB_TYPE = "form_version_migration"
+# Rejected rows reported back in the job result
+MAX_MIGRATION_ERRORS = 50
+
+
+def create_schema_version(db: Session, template: FormTemplate, created_by_id=None) -> FormTemplateVersion:
+    """
+    Append an immutable copy of the template's current schema (before commit).
+    Concurrent schema edits collide on the (template_id, version) unique constraint.
+    """
+    latest = db.query(func.max(FormTemplateVersion.version)).filter(
+        FormTemplateVersion.template_id == template.id
+    ).scalar() or 0
+    row = FormTemplateVersion(
+        template_id=template.id,
+        version=latest + 1,
+        schema_structure=template.schema_structure or [],
+        created_by_id=created_by_id or get_current_user_id(),
+    )
+    db.add(row)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, detail="Template schema was changed concurrently, reload and retry")
+    return row
+
+
+class DynamicVersionService:
+    """ Schema version history of a template and re-pinning records to the latest version """
+
+    @staticmethod
+    def _serialize_version(row: FormTemplateVersion, record_count: int | None = None, current_id=None) -> dict:
+        payload = {
+            "id": str(row.id),
+            "template_id": str(row.template_id),
+            "version": row.version,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "created_by_id": str(row.created_by_id) if row.created_by_id else None,
+            "is_current": row.id == current_id,
+        }
+        if record_count is not None:
+            payload["record_count"] = record_count
+        return payload
+
+    @staticmethod
+    def list_versions(db: Session, template_id, workspace_id) -> dict:
+        template = TemplateCache.get(db, template_id, workspace_id)
+        rows = db.query(FormTemplateVersion).filter(
+            FormTemplateVersion.template_id == template.id
+        ).order_by(FormTemplateVersion.version.desc()).all()
+        counts = dict(
+            db.query(FormRecord.template_version_id, func.count(FormRecord.id)).filter(
+                FormRecord.template_id == template.id
+            ).group_by(FormRecord.template_version_id).all()
+        )
+        return {
+            "template_id": str(template.id),
+            "current_version_id": str(template.version_id) if template.version_id else None,
+            # Records created before versioning existed
+            "unversioned_records": counts.get(None, 0),
+            "versions": [
+                DynamicVersionService._serialize_version(row, counts.get(row.id, 0), template.version_id)
+                for row in rows
+            ],
+        }
+
+    @staticmethod
+    def get_version(db: Session, template_id, workspace_id, version: int) -> dict:
+        template = TemplateCache.get(db, template_id, workspace_id)
+        row = db.query(FormTemplateVersion).filter(
+            FormTemplateVersion.template_id == template.id,
+            FormTemplateVersion.version == version
+        ).first()
+        if not row:
+            raise HTTPException(404, detail="Template version not found")
+        payload = DynamicVersionService._serialize_version(row, current_id=template.version_id)
+        payload["schema_structure"] = row.schema_structure or []
+        return payload
+
+    @staticmethod
+    def start_migration(db: Session, template_id, workspace_id, current_user) -> BackgroundJob:
+        """ Queue re-validation of older/unversioned records against the current schema """
+        template = TemplateCache.get(db, template_id, workspace_id)
+        if template.version_id is None:
+            raise HTTPException(400, detail="Template has no schema version yet")
+        dedupe_key = f"{VERSION_MIGRATION_JOB_TYPE}:{template.id}"
+        existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+        if existing:
+            return existing
+        try:
+            return JobService.create_job(
+                db,
+                workspace_id,
+                VERSION_MIGRATION_JOB_TYPE,
+                requested_by_id=current_user.id,
+                params={"template_id": str(template.id), "target_version_id": str(template.version_id)},
+                dedupe_key=dedupe_key,
+            )
+        except IntegrityError:
+            db.rollback()
+            existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+            if not existing:
+                raise HTTPException(409, detail="Migration could not be queued, retry")
+            return existing
+
+    @staticmethod
+    def run_migration(job_id):
+        JobService.run_job(job_id, DynamicVersionService._execute_migration)
+
+    @staticmethod
+    def _execute_migration(db: Session, job: BackgroundJob) -> dict:
+        """
+        Walk records not pinned to the target version in id order (keyset
+        pagination). Rows that pass the target version's validator are re-pinned
+        in one UPDATE per batch; the rest stay on their version and are reported.
+        """
+        params = job.params or {}
+        template_id = uuid.UUID(params["template_id"])
+        target = TemplateVersionCache.get(db, uuid.UUID(params["target_version_id"]))
+        validator = target.validator
+        batch_size = max(1, settings.VERSION_MIGRATION_BATCH_ROWS)
+
+        stale = or_(FormRecord.template_version_id.is_(None), FormRecord.template_version_id != target.id)
+        total = db.query(func.count(FormRecord.id)).filter(FormRecord.template_id == template_id, stale).scalar() or 0
+        JobService.report_progress(job.id, 0, total=total)
+
+        processed = 0
+        migrated = 0
+        errors = []
+        last_id = None
+        while True:
+            query = db.query(FormRecord.id, FormRecord.entry_data).filter(FormRecord.template_id == template_id, stale)
+            if last_id is not None:
+                query = query.filter(FormRecord.id > last_id)
+            batch = query.order_by(FormRecord.id).limit(batch_size).all()
+            if not batch:
+                break
+            valid_ids = []
+            for record_id, entry_data in batch:
+                error = validator(entry_data or {})
+                if error:
+                    if len(errors) < MAX_MIGRATION_ERRORS:
+                        errors.append({"record_id": str(record_id), "error": error})
+                    continue
+                valid_ids.append(record_id)
+            if valid_ids:
+                db.query(FormRecord).filter(FormRecord.id.in_(valid_ids)).update(
+                    {FormRecord.template_version_id: target.id}, synchronize_session=False
+                )
+            db.commit()
+            last_id = batch[-1].id
+            processed += len(batch)
+            migrated += len(valid_ids)
+            JobService.report_progress(job.id, processed, failed=processed - migrated)
+
+        return {
+            "target_version": target.version,
+            "migrated": migrated,
+            "rejected": processed - migrated,
+            "errors": errors,
+        }
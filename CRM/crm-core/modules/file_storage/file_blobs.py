@@ -0,0 +1,134 @@
+import os
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database_connector import SessionLocal
+from modules.file_storage.file_models import StorageBlob
+from modules.file_storage.file_stream import StreamedUpload, discard, publish
+
+# Session.info key holding blobs whose last reference was dropped in the open transaction
+RELEASED_BLOBS_KEY = "released_storage_blobs"
+
+
+def blob_path(workspace_id, sha256: str) -> str:
+    """ media_storage/{workspace_id}/blobs/ab/cd/abcd... (two fan-out levels keep directories small) """
+    return os.path.join(settings.FILE_STORAGE_ROOT, str(workspace_id), "blobs", sha256[:2], sha256[2:4], sha256)
+
+
+def _lock_blob(db: Session, workspace_id, sha256: str) -> None:
+    """
+    Transaction-scoped advisory lock per blob. Serializes a new reference to
+    some content against removal of the same content's file after its last
+    reference went away.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(f"{workspace_id}:{sha256}", 0))))
+
+
+class FileBlobService:
+
+    @staticmethod
+    def acquire(db: Session, workspace_id, stored: StreamedUpload) -> str:
+        """
+        Add a reference to the blob holding `stored`'s content and return its path.
+        Known content just bumps the count (the temp file is dropped); new content
+        is moved into place. Does not commit.
+        """
+        _lock_blob(db, workspace_id, stored.sha256)
+        table = StorageBlob.__table__
+        statement = insert(table).values(
+            workspace_id=workspace_id,
+            sha256=stored.sha256,
+            physical_path=blob_path(workspace_id, stored.sha256),
+            file_size=stored.size,
+            detected_content_type=stored.detected_content_type,
+            ref_count=1,
+        )
+        physical_path = db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.workspace_id, table.c.sha256],
+                set_={"ref_count": table.c.ref_count + 1, "updated_at": func.now()},
+            ).returning(table.c.physical_path)
+        ).scalar_one()
+        if os.path.exists(physical_path):
+            discard(stored.temp_path)
+        else:
+            os.makedirs(os.path.dirname(physical_path), exist_ok=True)
+            publish(stored.temp_path, physical_path)
+        return physical_path
+
+    @staticmethod
+    def add_reference(db: Session, workspace_id, sha256: str) -> StorageBlob | None:
+        """ Reference an existing blob without any upload; None when the content is unknown. Does not commit. """
+        _lock_blob(db, workspace_id, sha256)
+        blob = db.query(StorageBlob).filter(
+            StorageBlob.workspace_id == workspace_id,
+            StorageBlob.sha256 == sha256
+        ).with_for_update().first()
+        if not blob or not os.path.exists(blob.physical_path):
+            return None
+        blob.ref_count += 1
+        return blob
+
+    @staticmethod
+    def release(db: Session, workspace_id, sha256: str | None, physical_path: str) -> bool:
+        """
+        Drop one reference held by an attachment stored at `physical_path`.
+        False when that path is not a blob (files stored before blobs existed),
+        so the caller removes it directly. The file of a blob that reaches zero
+        is removed only after the transaction commits. Does not commit.
+        """
+        if not sha256:
+            return False
+        table = StorageBlob.__table__
+        ref_count = db.execute(
+            table.update()
+            .where(
+                table.c.workspace_id == workspace_id,
+                table.c.sha256 == sha256,
+                table.c.physical_path == physical_path,
+            )
+            .values(ref_count=table.c.ref_count - 1, updated_at=func.now())
+            .returning(table.c.ref_count)
+        ).scalar_one_or_none()
+        if ref_count is None:
+            return False
+        if ref_count <= 0:
+            db.execute(table.delete().where(table.c.workspace_id == workspace_id, table.c.sha256 == sha256))
+            db.info.setdefault(RELEASED_BLOBS_KEY, []).append((workspace_id, sha256, physical_path))
+        return True
+
+    @staticmethod
+    def remove_unreferenced(released: list[tuple]) -> None:
+        """ Unlink blob files whose row is still gone (a new upload may have revived one meanwhile) """
+        db = SessionLocal()
+        try:
+            for workspace_id, sha256, physical_path in released:
+                _lock_blob(db, workspace_id, sha256)
+                revived = db.query(StorageBlob.sha256).filter(
+                    StorageBlob.workspace_id == workspace_id,
+                    StorageBlob.sha256 == sha256
+                ).first()
+                if revived is None:
+                    discard(physical_path)
+                db.commit()
+        finally:
+            db.close()
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_blobs(session: Session):
+    released = session.info.pop(RELEASED_BLOBS_KEY, None)
+    if released:
+        try:
+            FileBlobService.remove_unreferenced(released)
+        except Exception:
+            # Best-effort cleanup; orphaned blob files can be cleaned later
+            pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_released_blobs(session: Session):
+    session.info.pop(RELEASED_BLOBS_KEY, None)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import UUID
-from core.base_models import CRMBasedModel
+from sqlalchemy import BigInteger, Column, DateTime, String, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from core.base_models import CRMBasedModel, get_utc_now
+from core.database_connector import Base
 
 class FileAttachment(CRMBasedModel):
     __tablename__ = "storage_files"
@@ -16,9 +17,13 @@ class FileAttachment(CRMBasedModel):
     file_size = Column(Integer, nullable=False)   # in bytes
 
     # 2. System Info (Security)
-    # We NEVER save the file as "contract.pdf" on disk. We save it as a UUID.
+    # We NEVER save the file as "contract.pdf" on disk. We save it as a UUID
+    # (generated files) or its SHA-256 (uploads, shared via StorageBlob).
     # This prevents hackers from overwriting system files.
-    physical_path = Column(String, nullable=False, unique=True)
+    physical_path = Column(String, nullable=False)
+    # Computed while the upload streams to disk (null for files stored before that)
+    sha256 = Column(String(64), nullable=True)
+    detected_content_type = Column(String, nullable=True)  # sniffed from the leading bytes
 
     # 3. Ownership
     uploaded_by_id = Column(UUID(as_uuid=True), ForeignKey("access_users.id"), nullable=False)
@@ -29,4 +34,48 @@ class FileAttachment(CRMBasedModel):
     # For now, we keep it generic.
     entity_id = Column(UUID(as_uuid=True), nullable=True) # e.g. Request ID
     entity_type = Column(String, nullable=True) # e.g. "request", "user_avatar"
-    
+
+
+class StorageBlob(Base):
+    """
+    One stored copy of some content per workspace, keyed by SHA-256.
+    `ref_count` is the number of attachments pointing at it; the file is removed at zero.
+    """
+    __tablename__ = "storage_blobs"
+
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), primary_key=True)
+    sha256 = Column(String(64), primary_key=True)
+    physical_path = Column(String, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    detected_content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=get_utc_now, onupdate=get_utc_now, nullable=False)
+
+
+class UploadSession(CRMBasedModel):
+    """
+    A resumable upload: numbered chunks are written into a preallocated temp
+    file until all have arrived, then the file is stored like a direct upload.
+    """
+    __tablename__ = "storage_upload_sessions"
+    __table_args__ = (
+        Index("ix_storage_upload_sessions_expires_at", "expires_at"),
+        Index("ix_storage_upload_sessions_workspace_uploaded_by", "workspace_id", "uploaded_by_id"),
+    )
+
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    received_chunks = Column(JSONB, nullable=False, default=list)  # chunk indexes written so far
+    temp_path = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="open")  # open | completed
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    uploaded_by_id = Column(UUID(as_uuid=True), ForeignKey("access_users.id"), nullable=False)
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=True)
+    entity_type = Column(String, nullable=True)
+    # Attachment created on completion (repeated completes return it)
+    file_id = Column(UUID(as_uuid=True), ForeignKey("storage_files.id", ondelete="SET NULL"), nullable=True)
@@ -1,4 +1,8 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form
+import anyio
+from secrets import token_hex
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
@@ -6,10 +10,12 @@ from typing import Optional
 
 from core.database_connector import get_db
 from core.config import settings
+from core.http_cache import content_disposition, etag_matches
 from core.workspace_resolver import resolve_workspace_id
 from modules.access_control.access_security import get_current_user
 from modules.access_control.access_permissions import PermissionService
 from modules.file_storage.file_service import FileStorageService
+from modules.file_storage.file_uploads import UPLOAD_CHUNK_BYTES, FileUploadSessionService
 
 router = APIRouter(prefix="/files", tags=["File Storage"])
 
@@ -20,6 +26,8 @@ def _serialize_file(file_record):
         "filename": file_record.filename,
         "content_type": file_record.content_type,
         "file_size": file_record.file_size,
+        "sha256": file_record.sha256,
+        "detected_content_type": file_record.detected_content_type,
         "uploaded_by_id": str(file_record.uploaded_by_id) if file_record.uploaded_by_id else None,
         "workspace_id": str(file_record.workspace_id) if file_record.workspace_id else None,
         "entity_id": str(file_record.entity_id) if file_record.entity_id else None,
@@ -28,6 +36,44 @@ def _serialize_file(file_record):
     }
 
 
+class DownloadFileResponse(FileResponse):
+    """
+    FileResponse with RFC 9110 multi-range replies: `multipart/byteranges` as
+    the Content-Type and CRLF-delimited parts (Starlette puts the type in
+    Content-Range and separates parts with bare LF).
+    """
+
+    async def _handle_multiple_ranges(self, send, ranges, file_size, send_header_only):
+        boundary = token_hex(13)
+        part_type = self.headers["content-type"]
+        part_headers = [
+            (
+                f"--{boundary}\r\nContent-Type: {part_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{file_size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode("latin-1")
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(
+            sum(len(header) + (end - start) + 2 for header, (start, end) in zip(part_headers, ranges)) + len(closing)
+        )
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for header, (start, end) in zip(part_headers, ranges):
+                await send({"type": "http.response.body", "body": header, "more_body": True})
+                await file.seek(start)
+                while start < end:
+                    chunk = await file.read(min(self.chunk_size, end - start))
+                    start += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+
 @router.get("")
 def list_documents(
     entity_type: Optional[str] = None,
@@ -79,32 +125,191 @@ def upload_document(
         current_user=current_user,
     )
 
-@router.get("/download/{file_id}")
+@router.post("/upload/by-hash")
+def upload_document_by_hash(
+    sha256: str = Form(...),
+    filename: str = Form(...),
+    content_type: Optional[str] = Form(None),
+    entity_id: Optional[UUID] = Form(None),
+    entity_type: Optional[str] = Form(None),
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Attach content the workspace already stores without re-sending it (404 -> use /upload) """
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return FileStorageService.save_file_by_hash(
+        db,
+        sha256,
+        filename,
+        content_type,
+        current_user.id,
+        workspace_id,
+        entity_id,
+        entity_type,
+        current_user=current_user,
+    )
+
+async def _read_chunk_body(request: Request, limit: int) -> bytes:
+    """ Request body of one chunk, refusing more than `limit` bytes without buffering them """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+    body = bytearray()
+    async for piece in request.stream():
+        body.extend(piece)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+    return bytes(body)
+
+
+@router.post("/uploads")
+def create_upload_session(
+    filename: str = Form(...),
+    total_size: int = Form(...),
+    content_type: Optional[str] = Form(None),
+    entity_id: Optional[UUID] = Form(None),
+    entity_type: Optional[str] = Form(None),
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Start a resumable upload; send `chunk_count` chunks of `chunk_size` bytes, then complete """
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    upload = FileUploadSessionService.create_session(
+        db,
+        filename,
+        total_size,
+        content_type,
+        current_user.id,
+        workspace_id,
+        entity_id,
+        entity_type,
+        current_user=current_user,
+    )
+    return FileUploadSessionService.serialize_session(upload)
+
+
+@router.get("/uploads/{session_id}")
+def get_upload_session(
+    session_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Received chunks / offset, to resume after a dropped connection """
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    upload = FileUploadSessionService.get_session(db, session_id, workspace_id, current_user.id)
+    return FileUploadSessionService.serialize_session(upload)
+
+
+@router.put("/uploads/{session_id}/chunks/{index}")
+async def upload_chunk(
+    session_id: UUID,
+    index: int,
+    request: Request,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Raw chunk bytes as the request body (`application/octet-stream`) """
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    data = await _read_chunk_body(request, UPLOAD_CHUNK_BYTES)
+    return await run_in_threadpool(
+        FileUploadSessionService.write_chunk,
+        db,
+        session_id,
+        index,
+        data,
+        workspace_id,
+        current_user.id,
+    )
+
+
+@router.post("/uploads/{session_id}/complete")
+def complete_upload_session(
+    session_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Validate, scan and store the assembled file; returns the attachment like /upload """
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return FileUploadSessionService.complete(
+        db,
+        session_id,
+        workspace_id,
+        current_user.id,
+        current_user=current_user,
+    )
+
+
+@router.delete("/uploads/{session_id}")
+def abort_upload_session(
+    session_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    PermissionService.require_permission(current_user, "upload_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return FileUploadSessionService.abort(db, session_id, workspace_id, current_user.id)
+
+
+@router.api_route("/download/{file_id}", methods=["GET", "HEAD"])
 def download_document(
     file_id: UUID,
+    request: Request,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """ Secure Download """
+    """ Secure Download (supports If-None-Match, Range / multi-range and If-Range) """
     PermissionService.require_permission(current_user, "download_files")
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     
-    # 1. Get Metadata
+    # 1. Get Metadata (access is checked on every request, including revalidations)
     file_record = FileStorageService.get_file_for_download(
         db,
         file_id,
         workspace_id,
         current_user=current_user,
+        require_on_disk=False,
     )
-    
-    # 2. Stream the file back
+
+    # 2. Unchanged content: answer from the ETag alone, without touching the disk
+    etag = FileStorageService.download_etag(file_record)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    # 3. Let the reverse proxy send the bytes (sendfile, ranges) when configured
+    if settings.FILE_ACCEL_REDIRECT_PREFIX:
+        return Response(
+            media_type=file_record.content_type,
+            headers={
+                **cache_headers,
+                "X-Accel-Redirect": FileStorageService.accel_redirect_path(file_record),
+                "Content-Disposition": content_disposition(file_record.filename),
+            },
+        )
+
+    # 4. Stream the file back
     # 'media_type' tells the browser if it's a PDF, Image, etc.
     # 'filename' tells the browser what name to save it as.
-    return FileResponse(
+    # FileResponse serves Range / If-Range (matched against our ETag) and uses
+    # zero-copy pathsend when the ASGI server offers it.
+    FileStorageService.ensure_on_disk(file_record)
+    return DownloadFileResponse(
         path=file_record.physical_path,
         media_type=file_record.content_type,
-        filename=file_record.filename
+        filename=file_record.filename,
+        headers=cache_headers,
     )
 
 
@@ -1,14 +1,18 @@
 import os
+import re
 import shlex
 import shutil
 import subprocess
 import uuid
+from urllib.parse import quote
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
 
 from core.config import settings
 from modules.access_control.access_enums import UserRole
 from modules.file_storage.file_models import FileAttachment
+from modules.file_storage.file_blobs import FileBlobService
+from modules.file_storage.file_stream import CONTAINER_TYPES, StreamedUpload, discard, write_stream
 
 # CONFIG: Where do we save?
 STORAGE_ROOT = settings.FILE_STORAGE_ROOT
@@ -16,6 +20,7 @@ MAX_UPLOAD_BYTES = settings.MAX_UPLOAD_MB * 1024 * 1024
 ALLOWED_MIME_TYPES = None
 if settings.ALLOWED_UPLOAD_MIME:
     ALLOWED_MIME_TYPES = {m.strip().lower() for m in settings.ALLOWED_UPLOAD_MIME.split(",") if m.strip()}
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 
 class FileStorageService:
 
@@ -30,43 +35,63 @@ class FileStorageService:
         FileStorageService._validate_entity_access(db, normalized_entity_type, entity_id, workspace_id, current_user)
 
         # Validate content type when configured
-        if ALLOWED_MIME_TYPES:
-            content_type = (upload_file.content_type or "").lower()
-            if content_type not in ALLOWED_MIME_TYPES:
-                raise HTTPException(status_code=415, detail="Unsupported file type")
+        FileStorageService.check_declared_type(upload_file.content_type)
 
-        # 2. Generate Safe Name
-        # We rename "hack.exe" to "a1b2-c3d4..." to be safe.
-        safe_filename = str(uuid.uuid4())
-        physical_path = os.path.join(workspace_path, safe_filename)
-
-        # 3. Write to Disk
-        try:
-            with open(physical_path, "wb") as buffer:
-                # Shutil creates a stream to copy data efficiently
-                shutil.copyfileobj(upload_file.file, buffer)
-        except Exception as e:
-            raise HTTPException(500, detail=f"File write failed: {e}")
-
-        # 4. Validate and Save Metadata to DB
-        # We need the cursor at the end to know the size, or read from headers
-        # FastAPI spools files, so getting size can be tricky.
-        # Simple way: use os.path.getsize after saving.
-        file_size = os.path.getsize(physical_path)
-        if file_size > MAX_UPLOAD_BYTES:
-            try:
-                os.remove(physical_path)
-            except OSError:
-                pass
+        # Reject before copying anything when the spooled size is already known
+        if upload_file.size is not None and upload_file.size > MAX_UPLOAD_BYTES:
             raise HTTPException(
                 status_code=413,
                 detail=f"File exceeds max size of {settings.MAX_UPLOAD_MB} MB"
             )
 
-        # Optional antivirus scan hook
+        # 2. Stream to a temp file: stops at the size limit, hashes and sniffs as it writes
+        stored = write_stream(upload_file.file, workspace_path, MAX_UPLOAD_BYTES)
+
+        db_file = FileStorageService.store_upload(
+            db,
+            stored,
+            upload_file.filename,
+            upload_file.content_type,
+            user_id,
+            workspace_id,
+            entity_id,
+            normalized_entity_type,
+        )
+        db.commit()
+        db.refresh(db_file)
+        return db_file
+
+    @staticmethod
+    def check_declared_type(content_type: str | None) -> None:
+        if ALLOWED_MIME_TYPES and (content_type or "").lower() not in ALLOWED_MIME_TYPES:
+            raise HTTPException(status_code=415, detail="Unsupported file type")
+
+    @staticmethod
+    def store_upload(
+        db: Session,
+        stored: StreamedUpload,
+        filename: str,
+        content_type: str | None,
+        user_id,
+        workspace_id,
+        entity_id=None,
+        entity_type: str | None = None,
+    ) -> FileAttachment:
+        """
+        Validate, scan and store a fully received upload (temp file), then add its
+        FileAttachment. Shared by direct and resumable uploads. The temp file is
+        consumed either way; the caller commits.
+        """
+        if ALLOWED_MIME_TYPES and stored.detected_content_type:
+            detected = stored.detected_content_type
+            if detected not in ALLOWED_MIME_TYPES and detected not in CONTAINER_TYPES:
+                discard(stored.temp_path)
+                raise HTTPException(status_code=415, detail="File content does not match an allowed type")
+
+        # Optional antivirus scan hook (runs before the file becomes visible)
         if settings.FILE_SCAN_COMMAND:
             try:
-                cmd = shlex.split(settings.FILE_SCAN_COMMAND) + [physical_path]
+                cmd = shlex.split(settings.FILE_SCAN_COMMAND) + [stored.temp_path]
                 result = subprocess.run(
                     cmd,
                     capture_output=True,
@@ -75,36 +100,129 @@ class FileStorageService:
                     check=False,
                 )
             except Exception:
-                try:
-                    os.remove(physical_path)
-                except OSError:
-                    pass
+                discard(stored.temp_path)
                 raise HTTPException(status_code=500, detail="File scan failed")
             if result.returncode != 0:
-                try:
-                    os.remove(physical_path)
-                except OSError:
-                    pass
+                discard(stored.temp_path)
                 raise HTTPException(status_code=400, detail="File rejected by security scan")
 
+        # Store as a content-addressed blob; known content only gains a reference
+        # The name on disk is the hash, never "hack.exe".
+        try:
+            physical_path = FileBlobService.acquire(db, workspace_id, stored)
+        except Exception:
+            db.rollback()
+            discard(stored.temp_path)
+            raise
+
         db_file = FileAttachment(
-            filename=upload_file.filename,
-            content_type=upload_file.content_type,
-            file_size=file_size,
+            filename=filename,
+            content_type=content_type or stored.detected_content_type or "application/octet-stream",
+            file_size=stored.size,
             physical_path=physical_path,
+            sha256=stored.sha256,
+            detected_content_type=stored.detected_content_type,
+            uploaded_by_id=user_id,
+            workspace_id=workspace_id,
+            entity_id=entity_id,
+            entity_type=entity_type
+        )
+        db.add(db_file)
+        return db_file
+
+    @staticmethod
+    def save_file_by_hash(
+        db: Session,
+        sha256: str,
+        filename: str,
+        content_type: str | None,
+        user_id,
+        workspace_id,
+        entity_id=None,
+        entity_type=None,
+        current_user=None,
+    ):
+        """
+        Attach content the workspace already stores, identified by its SHA-256,
+        without sending the bytes again. 404 tells the client to upload normally.
+        """
+        sha256 = (sha256 or "").strip().lower()
+        if not SHA256_PATTERN.match(sha256):
+            raise HTTPException(status_code=400, detail="sha256 must be 64 hex characters")
+        if not (filename or "").strip():
+            raise HTTPException(status_code=400, detail="filename is required")
+
+        normalized_entity_type = FileStorageService._normalize_entity_type(entity_type)
+        FileStorageService._validate_entity_access(db, normalized_entity_type, entity_id, workspace_id, current_user)
+
+        blob = FileBlobService.add_reference(db, workspace_id, sha256)
+        if not blob:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Content not stored; upload the file")
+        content_type = content_type or blob.detected_content_type or "application/octet-stream"
+        try:
+            FileStorageService.check_declared_type(content_type)
+        except HTTPException:
+            db.rollback()
+            raise
+
+        db_file = FileAttachment(
+            filename=filename.strip(),
+            content_type=content_type,
+            file_size=blob.file_size,
+            physical_path=blob.physical_path,
+            sha256=sha256,
+            detected_content_type=blob.detected_content_type,
             uploaded_by_id=user_id,
             workspace_id=workspace_id,
             entity_id=entity_id,
             entity_type=normalized_entity_type
         )
-        
         db.add(db_file)
         db.commit()
         db.refresh(db_file)
         return db_file
 
     @staticmethod
-    def get_file_for_download(db: Session, file_id, workspace_id, current_user=None):
+    def store_generated_file(
+        db: Session,
+        source_path: str,
+        filename: str,
+        content_type: str,
+        user_id,
+        workspace_id,
+        entity_type: str | None = None,
+        entity_id=None,
+    ):
+        """
+        Register a file produced on the server (e.g. an export) as an attachment.
+        The file is moved into the workspace directory, not copied.
+        """
+        workspace_path = os.path.join(STORAGE_ROOT, str(workspace_id))
+        os.makedirs(workspace_path, exist_ok=True)
+        physical_path = os.path.join(workspace_path, str(uuid.uuid4()))
+        try:
+            shutil.move(source_path, physical_path)
+        except Exception as e:
+            raise HTTPException(500, detail=f"File write failed: {e}")
+
+        db_file = FileAttachment(
+            filename=filename,
+            content_type=content_type,
+            file_size=os.path.getsize(physical_path),
+            physical_path=physical_path,
+            uploaded_by_id=user_id,
+            workspace_id=workspace_id,
+            entity_id=entity_id,
+            entity_type=FileStorageService._normalize_entity_type(entity_type)
+        )
+        db.add(db_file)
+        db.commit()
+        db.refresh(db_file)
+        return db_file
+
+    @staticmethod
+    def get_file_for_download(db: Session, file_id, workspace_id, current_user=None, require_on_disk: bool = True):
         # 1. Find the Record
         file_record = db.query(FileAttachment).filter(
             FileAttachment.id == file_id,
@@ -130,11 +248,30 @@ class FileStorageService:
             ) and file_record.uploaded_by_id != current_user.id:
                 raise HTTPException(status_code=403, detail="Access denied")
 
-        # 2. Check if file exists on disk
+        # 2. Check if file exists on disk (skipped when the caller may answer 304)
+        if require_on_disk:
+            FileStorageService.ensure_on_disk(file_record)
+
+        return file_record
+
+    @staticmethod
+    def ensure_on_disk(file_record: FileAttachment) -> None:
         if not os.path.exists(file_record.physical_path):
             raise HTTPException(500, detail="File missing from disk")
 
-        return file_record
+    @staticmethod
+    def download_etag(file_record: FileAttachment) -> str:
+        """
+        Strong ETag without touching the disk. Attachment content never changes,
+        so the content hash (or the id, for files stored before hashing) identifies it.
+        """
+        return f'"{file_record.sha256 or file_record.id}"'
+
+    @staticmethod
+    def accel_redirect_path(file_record: FileAttachment) -> str:
+        """ Internal URI the reverse proxy serves the file from (FILE_ACCEL_REDIRECT_PREFIX + path under the storage root) """
+        relative_path = os.path.relpath(file_record.physical_path, STORAGE_ROOT).replace(os.sep, "/")
+        return settings.FILE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative_path)
 
     @staticmethod
     def list_files(
@@ -196,11 +333,13 @@ class FileStorageService:
                 raise HTTPException(status_code=403, detail="Access denied")
 
         physical_path = file_record.physical_path
+        # Shared blobs lose one reference (their file goes after commit at zero)
+        is_blob = FileBlobService.release(db, workspace_id, file_record.sha256, physical_path)
         db.delete(file_record)
         db.commit()
 
         try:
-            if physical_path and os.path.exists(physical_path):
+            if not is_blob and physical_path and os.path.exists(physical_path):
                 os.remove(physical_path)
         except OSError:
             # Best-effort cleanup; orphaned file can be cleaned later
@@ -228,7 +367,10 @@ class FileStorageService:
         files = query.all()
         for file_record in files:
             physical_path = file_record.physical_path
+            is_blob = FileBlobService.release(db, file_record.workspace_id, file_record.sha256, physical_path)
             db.delete(file_record)
+            if is_blob:
+                continue
             try:
                 if physical_path and os.path.exists(physical_path):
                     os.remove(physical_path)
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import HTTPException
+
+CHUNK_SIZE = 1024 * 1024
+# Leading bytes the content sniffer looks at
+SNIFF_BYTES = 512
+
+# (offset, signature, content type); first match wins
+MAGIC_SIGNATURES = (
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (8, b"WEBP", "image/webp"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (0, b"MZ", "application/x-msdownload"),
+    (0, b"\x7fELF", "application/x-executable"),
+    (0, b"<?xml", "application/xml"),
+)
+# Office / OpenDocument files are ZIP (or OLE) containers; their declared type is trusted
+CONTAINER_TYPES = {"application/zip", "application/x-ole-storage"}
+
+
+@dataclass(frozen=True)
+class StreamedUpload:
+    temp_path: str
+    size: int
+    sha256: str
+    detected_content_type: str | None
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    """ Content type from the leading bytes; None when nothing is recognised """
+    for offset, signature, content_type in MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    if head and b"\x00" not in head:
+        try:
+            head.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            # A multi-byte character cut off at the end of the sample is still text
+            if exc.start < len(head) - 3:
+                return None
+        return "text/plain"
+    return None
+
+
+def discard(path: str | None) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def write_stream(source: BinaryIO, directory: str, max_bytes: int) -> StreamedUpload:
+    """
+    Copy `source` into a hidden temp file in `directory` chunk by chunk.
+    Stops with 413 as soon as `max_bytes` is passed, hashes and sniffs while
+    writing, and fsyncs before returning; `publish` then moves it into place.
+    """
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    head = b""
+    written = 0
+    try:
+        with open(temp_path, "wb") as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds max size of {max_bytes // (1024 * 1024)} MB"
+                    )
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                digest.update(chunk)
+                target.write(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+    except HTTPException:
+        discard(temp_path)
+        raise
+    except Exception as e:
+        discard(temp_path)
+        raise HTTPException(500, detail=f"File write failed: {e}")
+    return StreamedUpload(temp_path, written, digest.hexdigest(), sniff_content_type(head))
+
+
+def preallocate(path: str, size: int) -> None:
+    """ Create `path` with `size` bytes reserved up front (chunks are then written in place) """
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_EXCL, 0o600)
+    try:
+        if size:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+    except OSError as e:
+        os.close(fd)
+        discard(path)
+        raise HTTPException(507, detail=f"Cannot reserve upload space: {e}")
+    os.close(fd)
+
+
+def write_at(path: str, offset: int, data: bytes) -> None:
+    """ Write one chunk at its offset and flush it to disk """
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def scan_file(path: str) -> StreamedUpload:
+    """ Hash and sniff a file assembled in place (resumable uploads); same result as `write_stream` """
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    with open(path, "rb") as source:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+            digest.update(chunk)
+            size += len(chunk)
+    return StreamedUpload(path, size, digest.hexdigest(), sniff_content_type(head))
+
+
+def publish(temp_path: str, final_path: str) -> None:
+    """ Atomic rename into place, then fsync the directory so the rename survives a crash """
+    try:
+        os.replace(temp_path, final_path)
+        directory_fd = os.open(os.path.dirname(final_path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+    except OSError as e:
+        discard(temp_path)
+        raise HTTPException(500, detail=f"File write failed: {e}")
@@ -0,0 +1,289 @@
+import math
+import os
+import uuid
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from core.config import settings
+from core.database_connector import SessionLocal
+from modules.file_storage.file_models import FileAttachment, UploadSession
+from modules.file_storage.file_service import MAX_UPLOAD_BYTES, STORAGE_ROOT, FileStorageService
+from modules.file_storage.file_stream import discard, preallocate, scan_file, write_at
+
+UPLOAD_CHUNK_BYTES = settings.UPLOAD_CHUNK_KB * 1024
+UPLOAD_MAX_RESERVED_BYTES = settings.UPLOAD_MAX_RESERVED_MB * 1024 * 1024
+# Expired sessions removed per batch (when sessions are created, plus the startup/periodic sweep)
+EXPIRED_SWEEP_LIMIT = 100
+
+
+class FileUploadSessionService:
+
+    @staticmethod
+    def _expires_at():
+        return get_utc_now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+    @staticmethod
+    def _chunk_count(upload: UploadSession) -> int:
+        return math.ceil(upload.total_size / upload.chunk_size)
+
+    @staticmethod
+    def serialize_session(upload: UploadSession) -> dict:
+        received = set(upload.received_chunks or [])
+        chunk_count = FileUploadSessionService._chunk_count(upload)
+        # Offset = bytes received without gaps from the start (where a sequential client resumes)
+        contiguous = 0
+        while contiguous in received:
+            contiguous += 1
+        return {
+            "id": str(upload.id),
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "total_size": upload.total_size,
+            "chunk_size": upload.chunk_size,
+            "chunk_count": chunk_count,
+            "received_chunks": sorted(received),
+            "missing_chunks": [index for index in range(chunk_count) if index not in received],
+            "offset": min(contiguous * upload.chunk_size, upload.total_size),
+            "status": upload.status,
+            "file_id": str(upload.file_id) if upload.file_id else None,
+            "expires_at": upload.expires_at.isoformat() if upload.expires_at else None,
+        }
+
+    @staticmethod
+    def collect_expired(db: Session, limit: int = EXPIRED_SWEEP_LIMIT) -> int:
+        """ Delete expired sessions and their temp files (rows other workers hold are skipped) """
+        expired = db.query(UploadSession).filter(
+            UploadSession.expires_at < get_utc_now()
+        ).order_by(UploadSession.expires_at).limit(limit).with_for_update(skip_locked=True).all()
+        for upload in expired:
+            if upload.status == "open":
+                discard(upload.temp_path)
+            db.delete(upload)
+        db.commit()
+        return len(expired)
+
+    @staticmethod
+    def sweep_expired() -> int:
+        """
+        Remove every expired session, batch by batch, so abandoned temp files go
+        even when nobody opens a new upload. Runs in its own session (startup and
+        the periodic sweep in app.main).
+        """
+        db = SessionLocal()
+        try:
+            removed = 0
+            while True:
+                collected = FileUploadSessionService.collect_expired(db)
+                removed += collected
+                if collected < EXPIRED_SWEEP_LIMIT:
+                    return removed
+        finally:
+            db.close()
+
+    @staticmethod
+    def _check_quota(db: Session, workspace_id, user_id, total_size: int) -> None:
+        """
+        Every open session holds its full size on disk until it completes or
+        expires, so cap sessions per user and reserved bytes per workspace.
+        The workspace advisory lock (held until commit) serializes concurrent
+        creates so they cannot both pass the check.
+        """
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(f"upload-sessions:{workspace_id}", 0))))
+        open_sessions = db.query(UploadSession).filter(
+            UploadSession.workspace_id == workspace_id,
+            UploadSession.status == "open",
+            UploadSession.expires_at >= get_utc_now()
+        )
+        user_sessions = open_sessions.filter(UploadSession.uploaded_by_id == user_id).count()
+        if user_sessions >= settings.UPLOAD_MAX_OPEN_SESSIONS:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many unfinished uploads (max {settings.UPLOAD_MAX_OPEN_SESSIONS}); complete or delete one first"
+            )
+        reserved = open_sessions.with_entities(func.coalesce(func.sum(UploadSession.total_size), 0)).scalar()
+        if reserved + total_size > UPLOAD_MAX_RESERVED_BYTES:
+            raise HTTPException(
+                status_code=507,
+                detail=f"Unfinished uploads in this workspace exceed {settings.UPLOAD_MAX_RESERVED_MB} MB; retry later"
+            )
+
+    @staticmethod
+    def create_session(
+        db: Session,
+        filename: str,
+        total_size: int,
+        content_type: str | None,
+        user_id,
+        workspace_id,
+        entity_id=None,
+        entity_type=None,
+        current_user=None,
+    ) -> UploadSession:
+        filename = (filename or "").strip()
+        if not filename:
+            raise HTTPException(status_code=400, detail="filename is required")
+        if total_size <= 0:
+            raise HTTPException(status_code=400, detail="total_size must be positive")
+        # The whole size is declared up front, so oversize uploads never start
+        if total_size > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds max size of {settings.MAX_UPLOAD_MB} MB"
+            )
+        FileStorageService.check_declared_type(content_type)
+        normalized_entity_type = FileStorageService._normalize_entity_type(entity_type)
+        FileStorageService._validate_entity_access(db, normalized_entity_type, entity_id, workspace_id, current_user)
+
+        FileUploadSessionService.collect_expired(db)
+        FileUploadSessionService._check_quota(db, workspace_id, user_id, total_size)
+
+        session_id = uuid.uuid4()
+        workspace_path = os.path.join(STORAGE_ROOT, str(workspace_id))
+        os.makedirs(workspace_path, exist_ok=True)
+        temp_path = os.path.join(workspace_path, f".upload-{session_id}.part")
+        preallocate(temp_path, total_size)
+
+        upload = UploadSession(
+            id=session_id,
+            filename=filename,
+            content_type=content_type,
+            total_size=total_size,
+            chunk_size=UPLOAD_CHUNK_BYTES,
+            received_chunks=[],
+            temp_path=temp_path,
+            status="open",
+            expires_at=FileUploadSessionService._expires_at(),
+            uploaded_by_id=user_id,
+            workspace_id=workspace_id,
+            entity_id=entity_id,
+            entity_type=normalized_entity_type,
+        )
+        db.add(upload)
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            discard(temp_path)
+            raise
+        db.refresh(upload)
+        return upload
+
+    @staticmethod
+    def get_session(db: Session, session_id, workspace_id, user_id, lock: bool = False) -> UploadSession:
+        """ Sessions are private to the user who opened them """
+        query = db.query(UploadSession).filter(
+            UploadSession.id == session_id,
+            UploadSession.workspace_id == workspace_id,
+            UploadSession.uploaded_by_id == user_id
+        )
+        if lock:
+            query = query.with_for_update()
+        upload = query.first()
+        if not upload:
+            raise HTTPException(404, detail="Upload session not found")
+        if upload.status == "open" and upload.expires_at < get_utc_now():
+            raise HTTPException(410, detail="Upload session expired")
+        return upload
+
+    @staticmethod
+    def write_chunk(db: Session, session_id, index: int, data: bytes, workspace_id, user_id) -> dict:
+        """
+        Write chunk `index` at its offset in the temp file. Chunks may arrive in
+        any order or again (a retried chunk overwrites itself). Bodies are read
+        before this runs; the row lock only serializes the disk write against
+        other chunks and completion, so a finished file is never written to.
+        """
+        upload = FileUploadSessionService.get_session(db, session_id, workspace_id, user_id, lock=True)
+        if upload.status != "open":
+            raise HTTPException(409, detail="Upload already completed")
+        chunk_count = FileUploadSessionService._chunk_count(upload)
+        if not 0 <= index < chunk_count:
+            raise HTTPException(400, detail=f"Chunk index must be between 0 and {chunk_count - 1}")
+        offset = index * upload.chunk_size
+        expected = min(upload.chunk_size, upload.total_size - offset)
+        if len(data) != expected:
+            raise HTTPException(400, detail=f"Chunk {index} must be {expected} bytes, got {len(data)}")
+
+        try:
+            write_at(upload.temp_path, offset, data)
+        except OSError as e:
+            db.rollback()
+            raise HTTPException(500, detail=f"File write failed: {e}")
+
+        if index not in (upload.received_chunks or []):
+            upload.received_chunks = sorted([*(upload.received_chunks or []), index])
+        upload.expires_at = FileUploadSessionService._expires_at()
+        db.commit()
+        return FileUploadSessionService.serialize_session(upload)
+
+    @staticmethod
+    def complete(db: Session, session_id, workspace_id, user_id, current_user=None) -> FileAttachment:
+        """
+        Store the assembled file exactly like a direct upload (type checks, scan,
+        blob, FileAttachment). Completing again returns the same attachment.
+        """
+        upload = FileUploadSessionService.get_session(db, session_id, workspace_id, user_id, lock=True)
+        if upload.status == "completed":
+            file_record = db.query(FileAttachment).filter(FileAttachment.id == upload.file_id).first()
+            if not file_record:
+                raise HTTPException(404, detail="Uploaded file was deleted")
+            return file_record
+
+        missing = FileUploadSessionService.serialize_session(upload)["missing_chunks"]
+        if missing:
+            raise HTTPException(409, detail=f"Missing chunks: {', '.join(str(index) for index in missing[:20])}")
+
+        try:
+            FileStorageService._validate_entity_access(
+                db, upload.entity_type, upload.entity_id, workspace_id, current_user
+            )
+            try:
+                stored = scan_file(upload.temp_path)
+            except OSError:
+                raise HTTPException(500, detail="Upload data is missing; start a new upload")
+            if stored.size != upload.total_size:
+                discard(upload.temp_path)
+                raise HTTPException(400, detail="Assembled file size does not match total_size")
+            file_record = FileStorageService.store_upload(
+                db,
+                stored,
+                upload.filename,
+                upload.content_type,
+                user_id,
+                workspace_id,
+                upload.entity_id,
+                upload.entity_type,
+            )
+        except HTTPException:
+            # A rejected file cannot be retried; end the session with it
+            db.rollback()
+            FileUploadSessionService.abort(db, session_id, workspace_id, user_id)
+            raise
+
+        db.flush()
+        upload.status = "completed"
+        upload.file_id = file_record.id
+        upload.received_chunks = []
+        upload.expires_at = FileUploadSessionService._expires_at()
+        db.commit()
+        db.refresh(file_record)
+        return file_record
+
+    @staticmethod
+    def abort(db: Session, session_id, workspace_id, user_id) -> dict:
+        upload = db.query(UploadSession).filter(
+            UploadSession.id == session_id,
+            UploadSession.workspace_id == workspace_id,
+            UploadSession.uploaded_by_id == user_id
+        ).first()
+        if not upload:
+            raise HTTPException(404, detail="Upload session not found")
+        if upload.status == "open":
+            discard(upload.temp_path)
+        db.delete(upload)
+        db.commit()
+        return {"message": "Upload session deleted"}
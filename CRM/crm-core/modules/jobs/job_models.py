@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from core.base_models import CRMBasedModel
+from modules.jobs.job_enums import JobStatus
+
+class BackgroundJob(CRMBasedModel):
+    """
+    A long-running task (imports, exports, backfills) executed after the HTTP
+    response is sent. Clients poll it for progress.
+    """
+    __tablename__ = "system_jobs"
+    __table_args__ = (
+        Index("ix_system_jobs_workspace_type_created_at", "workspace_id", "job_type", "created_at"),
+        # At most one active job per dedupe key: identical concurrent requests share it
+        Index(
+            "uq_system_jobs_active_dedupe_key",
+            "workspace_id",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("dedupe_key IS NOT NULL AND status IN ('pending', 'running')"),
+        ),
+    )
+
+    job_type = Column(String, nullable=False)  # e.g. "form_import"
+    status = Column(String, nullable=False, default=JobStatus.PENDING.value)
+    dedupe_key = Column(String, nullable=True)
+
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+    requested_by_id = Column(UUID(as_uuid=True), ForeignKey("access_users.id"), nullable=True)
+
+    # Progress
+    total_items = Column(Integer, nullable=True)
+    processed_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+
+    params = Column(JSONB, nullable=False, default=dict)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Refreshed by the running worker; an active job whose heartbeat stops is failed as stale
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
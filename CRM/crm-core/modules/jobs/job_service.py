@@ -0,0 +1,248 @@
+import threading
+import traceback
+from datetime import timedelta
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from core.config import settings
+from core.database_connector import SessionLocal
+from modules.access_control.access_enums import UserRole
+from modules.jobs.job_enums import JobStatus
+from modules.jobs.job_models import BackgroundJob
+
+ADMIN_ROLES = (UserRole.SUPERADMIN, UserRole.SYSTEM_ADMIN, UserRole.ADMIN)
+ACTIVE_STATUSES = (JobStatus.PENDING.value, JobStatus.RUNNING.value)
+STALE_JOB_ERROR = "Job stopped responding (worker restarted or crashed)"
+
+
+class JobService:
+    """
+    Keys in params/result starting with "_" are internal (server paths etc.)
+    and are never returned to clients.
+    """
+
+    @staticmethod
+    def _public(payload: dict | None) -> dict | None:
+        if payload is None:
+            return None
+        return {key: value for key, value in payload.items() if not str(key).startswith("_")}
+
+    @staticmethod
+    def serialize_job(job: BackgroundJob) -> dict:
+        progress = None
+        if job.total_items:
+            progress = round(min(job.processed_items / job.total_items, 1.0), 4)
+        elif job.status == JobStatus.COMPLETED.value:
+            progress = 1.0
+        return {
+            "id": str(job.id),
+            "job_type": job.job_type,
+            "status": job.status,
+            "total_items": job.total_items,
+            "processed_items": job.processed_items,
+            "failed_items": job.failed_items,
+            "progress": progress,
+            "params": JobService._public(job.params or {}),
+            "result": JobService._public(job.result),
+            "error": job.error,
+            "requested_by_id": str(job.requested_by_id) if job.requested_by_id else None,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    def create_job(
+        db: Session,
+        workspace_id,
+        job_type: str,
+        requested_by_id=None,
+        params: dict | None = None,
+        commit: bool = True,
+        dedupe_key: str | None = None,
+    ) -> BackgroundJob:
+        """
+        commit=False only flushes, so the job is created atomically with the caller's changes.
+        A dedupe_key already held by a pending/running job raises IntegrityError.
+        """
+        job = BackgroundJob(
+            job_type=job_type,
+            status=JobStatus.PENDING.value,
+            workspace_id=workspace_id,
+            requested_by_id=requested_by_id,
+            params=params or {},
+            dedupe_key=dedupe_key,
+        )
+        db.add(job)
+        if not commit:
+            db.flush()
+            return job
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def _last_sign_of_life():
+        """ Heartbeat of a running job; start (or creation) time before the first beat """
+        return func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.started_at, BackgroundJob.created_at)
+
+    @staticmethod
+    def is_stale(job: BackgroundJob) -> bool:
+        """ Active job whose worker has not been heard from within JOB_STALE_TIMEOUT_SECONDS """
+        if job.status not in ACTIVE_STATUSES:
+            return False
+        last_seen = job.heartbeat_at or job.started_at or job.created_at
+        cutoff = get_utc_now() - timedelta(seconds=settings.JOB_STALE_TIMEOUT_SECONDS)
+        return last_seen is not None and last_seen < cutoff
+
+    @staticmethod
+    def fail_stale_jobs(workspace_id, dedupe_key: str | None = None) -> int:
+        """
+        Mark pending/running jobs whose worker died as failed, which releases
+        their dedupe key. Runs in its own session so the caller's transaction
+        is never committed early.
+        """
+        cutoff = get_utc_now() - timedelta(seconds=settings.JOB_STALE_TIMEOUT_SECONDS)
+        db = SessionLocal()
+        try:
+            query = db.query(BackgroundJob).filter(
+                BackgroundJob.workspace_id == workspace_id,
+                BackgroundJob.status.in_(ACTIVE_STATUSES),
+                JobService._last_sign_of_life() < cutoff
+            )
+            if dedupe_key is not None:
+                query = query.filter(BackgroundJob.dedupe_key == dedupe_key)
+            failed = query.update(
+                {
+                    BackgroundJob.status: JobStatus.FAILED.value,
+                    BackgroundJob.error: STALE_JOB_ERROR,
+                    BackgroundJob.finished_at: get_utc_now(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            return failed
+        finally:
+            db.close()
+
+    @staticmethod
+    def find_active_job(db: Session, workspace_id, dedupe_key: str) -> BackgroundJob | None:
+        """ The live job holding dedupe_key; a stale holder is failed first so the key can be reused """
+        JobService.fail_stale_jobs(workspace_id, dedupe_key)
+        return db.query(BackgroundJob).filter(
+            BackgroundJob.workspace_id == workspace_id,
+            BackgroundJob.dedupe_key == dedupe_key,
+            BackgroundJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    @staticmethod
+    def get_job(db: Session, job_id, workspace_id, job_type: str | None = None, current_user=None) -> BackgroundJob:
+        query = db.query(BackgroundJob).filter(
+            BackgroundJob.id == job_id,
+            BackgroundJob.workspace_id == workspace_id
+        )
+        if job_type:
+            query = query.filter(BackgroundJob.job_type == job_type)
+        job = query.first()
+        if not job:
+            raise HTTPException(404, detail="Job not found")
+        # Non-admins only see the jobs they started
+        if current_user is not None and current_user.role not in ADMIN_ROLES and job.requested_by_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Access denied")
+        return job
+
+    @staticmethod
+    def report_progress(job_id, processed: int, failed: int | None = None, total: int | None = None, result: dict | None = None):
+        """
+        Persist progress through a separate short session so the worker's own
+        transaction (e.g. a COPY into a staging table) is never committed early.
+        """
+        db = SessionLocal()
+        try:
+            job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+            if not job:
+                return
+            job.processed_items = processed
+            job.heartbeat_at = get_utc_now()
+            if failed is not None:
+                job.failed_items = failed
+            if total is not None:
+                job.total_items = total
+            if result is not None:
+                job.result = {**(job.result or {}), **result}
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _start_heartbeat(job_id) -> threading.Event:
+        """
+        Refresh heartbeat_at every JOB_HEARTBEAT_SECONDS from a daemon thread
+        while the handler runs, so long steps without progress reports are not
+        mistaken for a dead worker. Set the returned event to stop it.
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+                db = SessionLocal()
+                try:
+                    db.query(BackgroundJob).filter(
+                        BackgroundJob.id == job_id,
+                        BackgroundJob.status == JobStatus.RUNNING.value
+                    ).update({BackgroundJob.heartbeat_at: get_utc_now()}, synchronize_session=False)
+                    db.commit()
+                except Exception as exc:
+                    print(f"⚠️ JOB {job_id} heartbeat failed: {exc}")
+                finally:
+                    db.close()
+
+        threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True).start()
+        return stop
+
+    @staticmethod
+    def run_job(job_id, handler: Callable[[Session, BackgroundJob], Optional[dict]]):
+        """
+        Execute handler(db, job) in its own session (meant for BackgroundTasks).
+        The handler returns the job result payload; any exception fails the job.
+        """
+        db = SessionLocal()
+        heartbeat = None
+        try:
+            job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+            if not job or job.status != JobStatus.PENDING.value:
+                return
+            job.status = JobStatus.RUNNING.value
+            job.started_at = get_utc_now()
+            job.heartbeat_at = job.started_at
+            job.error = None
+            db.commit()
+            heartbeat = JobService._start_heartbeat(job_id)
+
+            try:
+                result = handler(db, job)
+            except Exception as exc:
+                db.rollback()
+                print(f"❌ JOB {job_id} ({job.job_type}) failed: {exc}")
+                traceback.print_exc()
+                job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+                job.status = JobStatus.FAILED.value
+                job.error = exc.detail if isinstance(exc, HTTPException) else str(exc)
+                job.finished_at = get_utc_now()
+                db.commit()
+                return
+
+            db.refresh(job)
+            job.status = JobStatus.COMPLETED.value
+            job.result = {**(job.result or {}), **(result or {})}
+            job.finished_at = get_utc_now()
+            db.commit()
+        finally:
+            if heartbeat is not None:
+                heartbeat.set()
+            db.close()
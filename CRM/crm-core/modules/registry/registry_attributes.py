@@ -0,0 +1,136 @@
+import base64
+import json
+import re
+from collections import Counter
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import not_, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from modules.registry.registry_models import ClientObject, ObjectAttributeKey
+
+ATTRIBUTE_PARAM = re.compile(r"^attr\[(?P<key>[^\]]+)\]$")
+ATTRIBUTE_OPERATORS = {"eq", "in", "prefix", "contains", "exists"}
+MAX_ATTRIBUTE_FILTERS = 10
+
+
+def parse_attribute_filters(query_params) -> dict[str, str]:
+    """
+    Collect `attr[key]=op:value` query params.
+    A value without a known `op:` prefix is treated as `eq:value`.
+    """
+    filters = {}
+    for name, value in query_params.multi_items():
+        match = ATTRIBUTE_PARAM.match(name)
+        if match:
+            filters[match.group("key").strip()] = value
+    if len(filters) > MAX_ATTRIBUTE_FILTERS:
+        raise HTTPException(400, detail=f"Too many attribute filters (max {MAX_ATTRIBUTE_FILTERS})")
+    return filters
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_attribute_filters(filters: dict[str, str]) -> list:
+    """
+    Compile attribute filters into SQL clauses. Attribute values are always
+    strings (see `_normalize_attributes`), so equality is JSONB containment and
+    `exists` is the `?` operator, both answered by the GIN index on attributes.
+    Text matching adds the `?` check so the index narrows the rows first.
+    """
+    clauses = []
+    for key, raw in filters.items():
+        op, sep, value = (raw or "").partition(":")
+        if not (sep and op in ATTRIBUTE_OPERATORS):
+            op, value = "eq", raw or ""
+        value = value.strip()
+        present = ClientObject.attributes.has_key(key)
+        if op == "exists":
+            clauses.append(present if value.lower() != "false" else not_(present))
+        elif op == "eq":
+            clauses.append(ClientObject.attributes.contains({key: value}))
+        elif op == "in":
+            values = [item.strip() for item in value.split(",") if item.strip()]
+            if not values:
+                raise HTTPException(400, detail=f"Filter for '{key}' needs at least one value")
+            clauses.append(or_(*[ClientObject.attributes.contains({key: item}) for item in values]))
+        elif op == "prefix":
+            clauses.append(present)
+            clauses.append(ClientObject.attributes[key].astext.ilike(f"{_escape_like(value)}%", escape="\\"))
+        elif op == "contains":
+            clauses.append(present)
+            clauses.append(ClientObject.attributes[key].astext.ilike(f"%{_escape_like(value)}%", escape="\\"))
+    return clauses
+
+
+def encode_cursor(created_at: datetime, object_id) -> str:
+    raw = json.dumps([created_at.isoformat(), str(object_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, object_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(object_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, detail="Invalid cursor")
+
+
+def after_cursor(cursor: str):
+    """ Rows after the cursor in (created_at DESC, id DESC) order """
+    created_at, object_id = decode_cursor(cursor)
+    return tuple_(ClientObject.created_at, ClientObject.id) < tuple_(created_at, object_id)
+
+
+class ObjectAttributeCatalog:
+    """ Per-workspace attribute keys with object counts, kept current by deltas """
+
+    @staticmethod
+    def apply_changes(db: Session, workspace_id, before: list[dict], after: list[dict]) -> None:
+        """
+        Adjust counts for objects whose attributes went from `before` to `after`
+        (an empty dict for created / deleted objects). Does not commit.
+        """
+        delta: Counter = Counter()
+        for attributes in before:
+            delta.subtract(set(attributes or {}))
+        for attributes in after:
+            delta.update(set(attributes or {}))
+        changes = {key: count for key, count in delta.items() if count}
+        if not changes:
+            return
+        now = get_utc_now()
+        table = ObjectAttributeKey.__table__
+        statement = insert(table).values([
+            {"workspace_id": workspace_id, "key": key, "object_count": count, "updated_at": now}
+            for key, count in sorted(changes.items())  # fixed order avoids deadlocks between writers
+        ])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.workspace_id, table.c.key],
+            set_={
+                "object_count": table.c.object_count + statement.excluded.object_count,
+                "updated_at": statement.excluded.updated_at,
+            },
+        ))
+        removed = [key for key, count in changes.items() if count < 0]
+        if removed:
+            db.query(ObjectAttributeKey).filter(
+                ObjectAttributeKey.workspace_id == workspace_id,
+                ObjectAttributeKey.key.in_(removed),
+                ObjectAttributeKey.object_count <= 0
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def list_keys(db: Session, workspace_id) -> list[dict]:
+        rows = db.query(ObjectAttributeKey).filter(
+            ObjectAttributeKey.workspace_id == workspace_id,
+            ObjectAttributeKey.object_count > 0
+        ).order_by(ObjectAttributeKey.object_count.desc(), ObjectAttributeKey.key).all()
+        return [{"key": row.key, "object_count": row.object_count} for row in rows]
@@ -0,0 +1,413 @@
+import csv
+import io
+import itertools
+import re
+import unicodedata
+import uuid
+from difflib import SequenceMatcher
+
+from fastapi import HTTPException
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from core.config import settings
+from modules.jobs.job_enums import JobStatus
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+from modules.registry.registry_models import Client, ClientDuplicateCluster, ClientObject
+from modules.registry.registry_service import RegistryService
+
+DEDUP_JOB_TYPE = "registry_client_dedup"
+# Phone numbers are compared on their last digits so +371 / 00371 / trunk prefixes agree
+PHONE_DIGITS = 8
+MIN_PHONE_DIGITS = 7
+KEYS_COPY = "COPY registry_dedup_keys (block_key, client_id, name, email, phone) FROM STDIN WITH (FORMAT csv)"
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def _ascii_lower(value: str | None) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def normalize_name(first_name: str | None, last_name: str | None) -> str:
+    full_name = f"{_ascii_lower(first_name)} {_ascii_lower(last_name)}"
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", full_name).split())
+
+
+def normalize_email(email: str | None) -> str | None:
+    value = (email or "").strip().lower()
+    if "@" not in value:
+        return None
+    local, _, domain = value.rpartition("@")
+    local = local.split("+", 1)[0]  # name+tag@ is the same mailbox
+    return f"{local}@{domain}" if local and domain else None
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits[-PHONE_DIGITS:]
+
+
+def soundex(value: str | None) -> str:
+    """ American Soundex (e.g. Robert / Rupert -> R163) """
+    letters = re.sub(r"[^a-z]", "", _ascii_lower(value))
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def blocking_keys(first_name, last_name, name: str, email: str | None, phone: str | None) -> list[str]:
+    """
+    Clients are only compared with clients sharing a key: the same email, the
+    same phone, or the same phonetic last name with the same email domain (or
+    first initial when there is no email).
+    """
+    keys = []
+    if email:
+        keys.append(f"e:{email}")
+    if phone:
+        keys.append(f"p:{phone}")
+    last_code = soundex(last_name)
+    if last_code:
+        qualifier = email.rpartition("@")[2] if email else (name[:1] if name else "")
+        keys.append(f"n:{last_code}:{qualifier}")
+    return keys
+
+
+def score_pair(a: tuple, b: tuple) -> float:
+    """
+    a / b are (name, email, phone), already normalized.
+    A shared email or phone needs a moderately similar name; without one the
+    names must be near-identical, and conflicting contacts lower the score.
+    """
+    name_a, email_a, phone_a = a
+    name_b, email_b, phone_b = b
+    similarity = SequenceMatcher(None, name_a, name_b).ratio() if name_a and name_b else 0.0
+    if (email_a and email_a == email_b) or (phone_a and phone_a == phone_b):
+        return 0.5 + 0.5 * similarity
+    conflicting = (email_a and email_b and email_a != email_b) or (phone_a and phone_b and phone_a != phone_b)
+    return (0.6 if conflicting else 0.85) * similarity
+
+
+class _DisjointSet:
+    """ Union-find that only stores clients that matched something """
+
+    def __init__(self):
+        self.parent: dict = {}
+        self.score: dict = {}  # root -> best pair score of its set
+
+    def find(self, item):
+        parent = self.parent.get(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b, score: float):
+        root_a, root_b = self.find(a), self.find(b)
+        self.parent.setdefault(root_a, root_a)
+        self.parent[root_b] = root_a
+        self.score[root_a] = max(score, self.score.get(root_a, 0.0), self.score.pop(root_b, 0.0))
+
+    def groups(self) -> dict:
+        grouped: dict = {}
+        for item in list(self.parent):
+            grouped.setdefault(self.find(item), []).append(item)
+        return grouped
+
+
+class RegistryDedupService:
+    """
+    Duplicate client detection in three passes, all bounded in memory:
+    1. stream clients in id order and COPY their normalized fields under each
+       blocking key into a temp table;
+    2. stream the blocks (GROUP BY in Postgres) and score pairs only inside a
+       block, skipping blocks above DEDUP_MAX_BLOCK_SIZE;
+    3. join matching pairs with a disjoint set into clusters and store them.
+    """
+
+    @staticmethod
+    def start_scan(db: Session, workspace_id, current_user) -> BackgroundJob:
+        dedupe_key = f"{DEDUP_JOB_TYPE}:{workspace_id}"
+        existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+        if existing:
+            return existing
+        try:
+            return JobService.create_job(
+                db,
+                workspace_id,
+                DEDUP_JOB_TYPE,
+                requested_by_id=current_user.id,
+                params={"threshold": settings.DEDUP_MATCH_THRESHOLD},
+                dedupe_key=dedupe_key,
+            )
+        except IntegrityError:
+            db.rollback()
+            existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+            if not existing:
+                raise HTTPException(409, detail="Scan could not be queued, retry")
+            return existing
+
+    @staticmethod
+    def run_scan(job_id):
+        JobService.run_job(job_id, RegistryDedupService._execute_scan)
+
+    @staticmethod
+    def _copy_keys(db: Session, buffer: io.StringIO):
+        buffer.seek(0)
+        raw_connection = db.connection().connection
+        with raw_connection.cursor() as cursor:
+            cursor.copy_expert(KEYS_COPY, buffer)
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    @staticmethod
+    def _execute_scan(db: Session, job: BackgroundJob) -> dict:
+        workspace_id = job.workspace_id
+        threshold = float((job.params or {}).get("threshold") or settings.DEDUP_MATCH_THRESHOLD)
+        batch_size = max(1, settings.DEDUP_SCAN_BATCH_ROWS)
+        max_block = max(2, settings.DEDUP_MAX_BLOCK_SIZE)
+
+        total = db.query(func.count(Client.id)).filter(Client.workspace_id == workspace_id).scalar() or 0
+        JobService.report_progress(job.id, 0, total=total)
+
+        db.execute(text(
+            "CREATE TEMP TABLE registry_dedup_keys ("
+            "block_key text NOT NULL, client_id uuid NOT NULL, name text, email text, phone text) ON COMMIT DROP"
+        ))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        scanned = 0
+        last_id = None
+        while True:
+            query = db.query(Client.id, Client.first_name, Client.last_name, Client.email, Client.phone).filter(
+                Client.workspace_id == workspace_id
+            )
+            if last_id is not None:
+                query = query.filter(Client.id > last_id)
+            batch = query.order_by(Client.id).limit(batch_size).all()
+            if not batch:
+                break
+            for client_id, first_name, last_name, email, phone in batch:
+                name = normalize_name(first_name, last_name)
+                email = normalize_email(email)
+                phone = normalize_phone(phone)
+                for key in blocking_keys(first_name, last_name, name, email, phone):
+                    writer.writerow([key, str(client_id), name, email, phone])
+            RegistryDedupService._copy_keys(db, buffer)
+            last_id = batch[-1].id
+            scanned += len(batch)
+            JobService.report_progress(job.id, scanned)
+
+        db.execute(text("ANALYZE registry_dedup_keys"))
+        skipped_blocks = db.execute(
+            text(
+                "SELECT count(*) FROM (SELECT 1 FROM registry_dedup_keys GROUP BY block_key "
+                "HAVING count(*) > :max_block) AS oversized"
+            ),
+            {"max_block": max_block},
+        ).scalar() or 0
+
+        clusters = _DisjointSet()
+        compared = 0
+        blocks = db.execute(
+            text(
+                """
+                SELECT k.block_key, k.client_id, k.name, k.email, k.phone
+                FROM registry_dedup_keys AS k
+                JOIN (
+                    SELECT block_key FROM registry_dedup_keys
+                    GROUP BY block_key HAVING count(*) BETWEEN 2 AND :max_block
+                ) AS b ON b.block_key = k.block_key
+                ORDER BY k.block_key
+                """
+            ).execution_options(stream_results=True, yield_per=batch_size),
+            {"max_block": max_block},
+        )
+        for _, members in itertools.groupby(blocks, key=lambda row: row.block_key):
+            members = [(row.client_id, (row.name, row.email, row.phone)) for row in members]
+            for (id_a, features_a), (id_b, features_b) in itertools.combinations(members, 2):
+                if id_a == id_b or clusters.find(id_a) == clusters.find(id_b):
+                    continue  # already joined through another block
+                compared += 1
+                score = score_pair(features_a, features_b)
+                if score >= threshold:
+                    clusters.union(id_a, id_b, score)
+        blocks.close()
+        grouped = clusters.groups()
+
+        # Previous scans of this workspace are superseded
+        db.query(ClientDuplicateCluster).filter(
+            ClientDuplicateCluster.workspace_id == workspace_id
+        ).delete(synchronize_session=False)
+        now = get_utc_now()
+        rows = []
+        for root, members in grouped.items():
+            rows.append({
+                "id": uuid.uuid4(),
+                "job_id": job.id,
+                "workspace_id": workspace_id,
+                "client_ids": sorted(str(member) for member in members),
+                "size": len(members),
+                "score": round(clusters.score.get(root, 0.0), 4),
+                "created_at": now,
+                "updated_at": now,
+                "created_by_id": job.requested_by_id,
+                "updated_by_id": job.requested_by_id,
+                "meta_data": {},
+            })
+            if len(rows) >= batch_size:
+                db.execute(ClientDuplicateCluster.__table__.insert(), rows)
+                rows = []
+        if rows:
+            db.execute(ClientDuplicateCluster.__table__.insert(), rows)
+        db.commit()
+
+        return {
+            "scanned": scanned,
+            "compared_pairs": compared,
+            "clusters": len(grouped),
+            "duplicate_clients": sum(len(members) for members in grouped.values()),
+            "skipped_blocks": skipped_blocks,
+        }
+
+    @staticmethod
+    def list_clusters(db: Session, workspace_id, skip: int = 0, limit: int = 50, min_score: float = 0.0) -> tuple[list[dict], int]:
+        """ Clusters of the latest finished scan, best first, with the clients of the page loaded in one query """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        skip = max(skip, 0)
+        latest_job_id = db.query(BackgroundJob.id).filter(
+            BackgroundJob.workspace_id == workspace_id,
+            BackgroundJob.job_type == DEDUP_JOB_TYPE,
+            BackgroundJob.status == JobStatus.COMPLETED.value
+        ).order_by(BackgroundJob.created_at.desc()).limit(1).scalar()
+        if latest_job_id is None:
+            return [], 0
+
+        base = db.query(ClientDuplicateCluster).filter(
+            ClientDuplicateCluster.workspace_id == workspace_id,
+            ClientDuplicateCluster.job_id == latest_job_id,
+            ClientDuplicateCluster.score >= min_score
+        )
+        total = base.order_by(None).count()
+        clusters = base.order_by(ClientDuplicateCluster.score.desc(), ClientDuplicateCluster.id).offset(skip).limit(limit).all()
+
+        client_ids = {uuid.UUID(client_id) for cluster in clusters for client_id in cluster.client_ids}
+        clients = {}
+        if client_ids:
+            object_counts = dict(
+                db.query(ClientObject.client_id, func.count(ClientObject.id)).filter(
+                    ClientObject.workspace_id == workspace_id,
+                    ClientObject.client_id.in_(client_ids)
+                ).group_by(ClientObject.client_id).all()
+            )
+            for client in db.query(Client).filter(Client.workspace_id == workspace_id, Client.id.in_(client_ids)).all():
+                clients[str(client.id)] = {
+                    "id": str(client.id),
+                    "first_name": client.first_name,
+                    "last_name": client.last_name,
+                    "email": client.email,
+                    "phone": client.phone,
+                    "company_id": str(client.company_id) if client.company_id else None,
+                    "object_count": object_counts.get(client.id, 0),
+                    "created_at": client.created_at.isoformat() if client.created_at else None,
+                }
+        return [
+            {
+                "id": str(cluster.id),
+                "job_id": str(cluster.job_id),
+                "score": cluster.score,
+                "size": cluster.size,
+                # Clients merged or deleted since the scan drop out
+                "clients": [clients[client_id] for client_id in cluster.client_ids if client_id in clients],
+            }
+            for cluster in clusters
+        ], total
+
+    @staticmethod
+    def merge_clients(db: Session, workspace_id, target_id, source_ids: list) -> dict:
+        """
+        Fold source clients into the target in one transaction: blank target
+        fields are filled from the sources (oldest first), objects are repointed
+        with one UPDATE, and the sources are deleted.
+        """
+        source_ids = list(dict.fromkeys(source_id for source_id in source_ids if source_id != target_id))
+        if not source_ids:
+            raise HTTPException(400, detail="Select at least one client to merge into the target")
+
+        # Row locks keep concurrent edits/merges of the same clients out
+        clients = db.query(Client).filter(
+            Client.workspace_id == workspace_id,
+            Client.id.in_([target_id, *source_ids])
+        ).order_by(Client.created_at).with_for_update().all()
+        by_id = {client.id: client for client in clients}
+        target = by_id.get(target_id)
+        if not target:
+            raise HTTPException(404, detail="Client not found")
+        missing = [str(source_id) for source_id in source_ids if source_id not in by_id]
+        if missing:
+            raise HTTPException(404, detail=f"Clients not found: {', '.join(missing)}")
+
+        sources = [client for client in clients if client.id != target_id]
+        for field in ("email", "phone", "notes", "company_id"):
+            if getattr(target, field) is None:
+                value = next((getattr(source, field) for source in sources if getattr(source, field) is not None), None)
+                setattr(target, field, value)
+
+        moved_objects = db.query(ClientObject).filter(
+            ClientObject.workspace_id == workspace_id,
+            ClientObject.client_id.in_(source_ids)
+        ).update(
+            {ClientObject.client_id: target_id, ClientObject.updated_at: get_utc_now()},
+            synchronize_session=False,
+        )
+        db.query(Client).filter(
+            Client.workspace_id == workspace_id,
+            Client.id.in_(source_ids)
+        ).delete(synchronize_session=False)
+        RegistryService._record_deletions(db, workspace_id, "client", source_ids)
+
+        # Drop merged clients from stored clusters; clusters left with one client go away
+        merged = {str(source_id) for source_id in source_ids}
+        stale_clusters = db.query(ClientDuplicateCluster).filter(
+            ClientDuplicateCluster.workspace_id == workspace_id,
+            ClientDuplicateCluster.client_ids.op("?|")(array(list(merged)))
+        ).all()
+        for cluster in stale_clusters:
+            remaining = [client_id for client_id in cluster.client_ids if client_id not in merged]
+            if len(remaining) < 2:
+                db.delete(cluster)
+            else:
+                cluster.client_ids = remaining
+                cluster.size = len(remaining)
+
+        db.commit()
+        db.refresh(target)
+        db.refresh(target, attribute_names=["company", "status_company"])
+        return {
+            "client": RegistryService._serialize_client(target),
+            "merged_client_ids": sorted(merged),
+            "moved_objects": moved_objects,
+        }
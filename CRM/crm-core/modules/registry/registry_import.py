@@ -0,0 +1,575 @@
+import csv
+import json
+import os
+import time
+import uuid
+
+from fastapi import HTTPException, UploadFile
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.base_models import get_utc_now
+from core.config import settings
+from core.tabular_reader import RECORD_EXTENSIONS, detect_format, iter_records, spool_upload
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import JobService
+from modules.registry.registry_attributes import ObjectAttributeCatalog
+from modules.registry.registry_models import Client, ClientObject, Company
+from modules.registry.registry_service import RegistryService
+
+REGISTRY_IMPORT_JOB_TYPE = "registry_import"
+IMPORT_ENTITIES = ("companies", "clients", "objects")
+
+COMPANY_COLUMNS = ("name", "registration_number", "email", "phone", "address")
+CLIENT_COLUMNS = (
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "notes",
+    "status",
+    "company",
+    "company_registration_number",
+    "status_company",
+    "status_company_registration_number",
+)
+# Any other object column (or the keys of an NDJSON `attributes` object) becomes an attribute
+OBJECT_COLUMNS = ("name", "client_email", "company", "company_registration_number", "attributes")
+ENTITY_COLUMNS = {"companies": COMPANY_COLUMNS, "clients": CLIENT_COLUMNS, "objects": OBJECT_COLUMNS}
+
+_EMAIL = TypeAdapter(EmailStr)
+
+
+class RowError(ValueError):
+    """ A problem with one input row; reported in the error file, the import goes on """
+
+
+def _cell(value) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Excel turns registration numbers and phones into floats
+        value = int(value)
+    text_value = str(value).strip()
+    return text_value or None
+
+
+def _email(value) -> str | None:
+    raw = _cell(value)
+    if raw is None:
+        return None
+    try:
+        return _EMAIL.validate_python(raw)
+    except ValidationError:
+        raise RowError(f"Invalid email '{raw}'")
+
+
+def _normalize_keys(data: dict, known: tuple) -> dict:
+    """ Known columns are matched case-insensitively; other keys are kept verbatim """
+    known_lookup = {name: name for name in known}
+    normalized = {}
+    for key, value in data.items():
+        name = str(key or "").strip()
+        if not name:
+            continue
+        normalized[known_lookup.get(name.lower(), name)] = value
+    return normalized
+
+
+def _company_ref(data: dict, prefix: str) -> tuple[str | None, str | None] | None:
+    registration_number = _cell(data.get(f"{prefix}_registration_number"))
+    name = _cell(data.get(prefix))
+    if not registration_number and not name:
+        return None
+    return registration_number, name
+
+
+class RegistryImportService:
+    """
+    Bulk upsert of companies, clients or client objects from CSV, XLSX or NDJSON.
+    Rows are processed in chunks: existing rows are matched with one lookup per
+    chunk (companies by registration number, then email; clients by email;
+    objects by name and owner), company references are resolved the same way,
+    and the chunk is written with a single INSERT ... ON CONFLICT (id) DO UPDATE.
+    Blank cells keep the stored value. Rows without a match key (companies with
+    neither registration number nor email, clients without email) are always
+    inserted and reported as `unmatched_inserted`. One import per workspace runs
+    at a time, so matches cannot race with another import.
+    """
+
+    @staticmethod
+    def start_import(db: Session, entity_type: str, workspace_id, upload_file: UploadFile, current_user) -> BackgroundJob:
+        entity_type = (entity_type or "").strip().lower()
+        if entity_type not in IMPORT_ENTITIES:
+            raise HTTPException(400, detail=f"entity_type must be one of: {', '.join(IMPORT_ENTITIES)}")
+        file_format = detect_format(upload_file.filename, RECORD_EXTENSIONS)
+        dedupe_key = f"{REGISTRY_IMPORT_JOB_TYPE}:{workspace_id}"
+        if JobService.find_active_job(db, workspace_id, dedupe_key):
+            raise HTTPException(409, detail="Another registry import is already running in this workspace")
+        source_path = spool_upload(upload_file, settings.MAX_IMPORT_MB * 1024 * 1024)
+        try:
+            return JobService.create_job(
+                db,
+                workspace_id,
+                REGISTRY_IMPORT_JOB_TYPE,
+                requested_by_id=current_user.id,
+                params={
+                    "entity_type": entity_type,
+                    "filename": upload_file.filename,
+                    "format": file_format,
+                    "_source_path": source_path,
+                },
+                dedupe_key=dedupe_key,
+            )
+        except IntegrityError:
+            db.rollback()
+            os.remove(source_path)
+            raise HTTPException(409, detail="Another registry import is already running in this workspace")
+
+    @staticmethod
+    def run_import(job_id):
+        JobService.run_job(job_id, RegistryImportService._execute)
+
+    @staticmethod
+    def get_error_file(db: Session, job_id, workspace_id, current_user) -> str:
+        job = JobService.get_job(db, job_id, workspace_id, REGISTRY_IMPORT_JOB_TYPE, current_user)
+        path = (job.result or {}).get("_error_file")
+        if not path or not os.path.exists(path):
+            raise HTTPException(404, detail="No error rows for this import")
+        return path
+
+    @staticmethod
+    def _resolve_companies(db: Session, workspace_id, refs: set) -> dict:
+        """
+        Map (registration_number, name) references to company ids in two queries.
+        A failed reference maps to the error message instead of an id.
+        """
+        registration_numbers = {reg for reg, _ in refs if reg}
+        names = {name.lower() for reg, name in refs if not reg and name}
+        by_registration = {}
+        if registration_numbers:
+            # Newest first, so the oldest company wins when a number is duplicated
+            rows = db.query(Company.id, Company.registration_number).filter(
+                Company.workspace_id == workspace_id,
+                Company.registration_number.in_(registration_numbers)
+            ).order_by(Company.created_at.desc()).all()
+            by_registration = {registration_number: company_id for company_id, registration_number in rows}
+        by_name: dict[str, list] = {}
+        if names:
+            rows = db.query(Company.id, func.lower(Company.name)).filter(
+                Company.workspace_id == workspace_id,
+                func.lower(Company.name).in_(names)
+            ).all()
+            for company_id, name in rows:
+                by_name.setdefault(name, []).append(company_id)
+
+        resolved = {}
+        for registration_number, name in refs:
+            if registration_number:
+                resolved[(registration_number, name)] = by_registration.get(registration_number) or (
+                    f"Company with registration number '{registration_number}' not found"
+                )
+                continue
+            matches = by_name.get(name.lower(), [])
+            if len(matches) == 1:
+                resolved[(registration_number, name)] = matches[0]
+            elif not matches:
+                resolved[(registration_number, name)] = f"Company '{name}' not found"
+            else:
+                resolved[(registration_number, name)] = f"Company name '{name}' is ambiguous, use its registration number"
+        return resolved
+
+    @staticmethod
+    def _company_id(resolved: dict, ref):
+        if ref is None:
+            return None
+        company_id = resolved[ref]
+        if isinstance(company_id, str):
+            raise RowError(company_id)
+        return company_id
+
+    @staticmethod
+    def _upsert(db: Session, model, rows: list[dict], set_columns: dict):
+        """ One INSERT ... ON CONFLICT (id) DO UPDATE for the chunk """
+        if not rows:
+            return
+        table = model.__table__
+        statement = insert(table).values(rows)
+        excluded = statement.excluded
+        update = {name: build(table.c, excluded) for name, build in set_columns.items()}
+        update["updated_at"] = excluded.updated_at
+        update["updated_by_id"] = excluded.updated_by_id
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_=update,
+                # Matched ids always come from this workspace; never touch another one
+                where=table.c.workspace_id == excluded.workspace_id,
+            )
+        )
+
+    @staticmethod
+    def _audit_columns(job: BackgroundJob, now) -> dict:
+        return {
+            "workspace_id": job.workspace_id,
+            "created_at": now,
+            "updated_at": now,
+            "created_by_id": job.requested_by_id,
+            "updated_by_id": job.requested_by_id,
+        }
+
+    @staticmethod
+    def _collapse(rows: dict, row_id, values: dict):
+        """ A row repeated within one chunk (same match key) is merged, later values win """
+        if row_id in rows:
+            rows[row_id].update({key: value for key, value in values.items() if value is not None})
+        else:
+            rows[row_id] = values
+
+    @staticmethod
+    def _import_companies(db: Session, job: BackgroundJob, chunk: list) -> tuple[int, int, int, list]:
+        workspace_id = job.workspace_id
+        errors = []
+        parsed = []
+        for row_number, data in chunk:
+            try:
+                name = _cell(data.get("name"))
+                if not name:
+                    raise RowError("name is required")
+                parsed.append((row_number, {
+                    "name": name,
+                    "registration_number": _cell(data.get("registration_number")),
+                    "email": _email(data.get("email")),
+                    "phone": _cell(data.get("phone")),
+                    "address": _cell(data.get("address")),
+                }))
+            except RowError as exc:
+                errors.append((row_number, str(exc), data))
+
+        registration_numbers = {values["registration_number"] for _, values in parsed if values["registration_number"]}
+        emails = {values["email"].lower() for _, values in parsed if values["email"]}
+        # Match keys -> company id; rows new in this chunk are added as they are assigned
+        by_registration, by_email = {}, {}
+        if registration_numbers:
+            rows = db.query(Company.id, Company.registration_number).filter(
+                Company.workspace_id == workspace_id,
+                Company.registration_number.in_(registration_numbers)
+            ).order_by(Company.created_at.desc()).all()
+            by_registration = {registration_number: company_id for company_id, registration_number in rows}
+        if emails:
+            rows = db.query(Company.id, func.lower(Company.email), Company.registration_number).filter(
+                Company.workspace_id == workspace_id,
+                func.lower(Company.email).in_(emails)
+            ).order_by(Company.created_at.desc()).all()
+            by_email = {email: (company_id, registration_number) for company_id, email, registration_number in rows}
+        existing_ids = set(by_registration.values()) | {company_id for company_id, _ in by_email.values()}
+
+        now = get_utc_now()
+        audit = RegistryImportService._audit_columns(job, now)
+        rows: dict = {}
+        unkeyed = 0
+        for _, values in parsed:
+            registration_number = values["registration_number"]
+            email_key = values["email"].lower() if values["email"] else None
+            row_id = by_registration.get(registration_number) if registration_number else None
+            if row_id is None and email_key and email_key in by_email:
+                # Email fallback, unless that company already has a different registration number
+                candidate_id, candidate_registration = by_email[email_key]
+                if not registration_number or not candidate_registration or candidate_registration == registration_number:
+                    row_id = candidate_id
+            if row_id is None:
+                row_id = uuid.uuid4()
+                if not registration_number and not email_key:
+                    # Nothing to match on: a re-run of the file inserts this row again
+                    unkeyed += 1
+            if registration_number:
+                by_registration[registration_number] = row_id
+            if email_key:
+                previous = by_email.get(email_key)
+                if previous is None or previous[0] == row_id:
+                    by_email[email_key] = (row_id, registration_number or (previous[1] if previous else None))
+            RegistryImportService._collapse(rows, row_id, {"id": row_id, **values, **audit, "meta_data": {}})
+
+        RegistryImportService._upsert(db, Company, list(rows.values()), {
+            "name": lambda table, excluded: excluded.name,
+            "registration_number": lambda table, excluded: func.coalesce(excluded.registration_number, table.registration_number),
+            "email": lambda table, excluded: func.coalesce(excluded.email, table.email),
+            "phone": lambda table, excluded: func.coalesce(excluded.phone, table.phone),
+            "address": lambda table, excluded: func.coalesce(excluded.address, table.address),
+        })
+        matched = existing_ids.intersection(rows)
+        return len(rows) - len(matched), len(matched), unkeyed, errors
+
+    @staticmethod
+    def _import_clients(db: Session, job: BackgroundJob, chunk: list) -> tuple[int, int, int, list]:
+        workspace_id = job.workspace_id
+        refs = set()
+        for _, data in chunk:
+            for prefix in ("company", "status_company"):
+                ref = _company_ref(data, prefix)
+                if ref:
+                    refs.add(ref)
+        resolved = RegistryImportService._resolve_companies(db, workspace_id, refs) if refs else {}
+
+        errors = []
+        parsed = []
+        for row_number, data in chunk:
+            try:
+                first_name = _cell(data.get("first_name"))
+                last_name = _cell(data.get("last_name"))
+                if not first_name or not last_name:
+                    raise RowError("first_name and last_name are required")
+                raw_status = _cell(data.get("status"))
+                status = None
+                if raw_status:
+                    try:
+                        status = RegistryService._normalize_status(raw_status)
+                    except HTTPException as exc:
+                        raise RowError(f"{exc.detail} '{raw_status}'")
+                status_company_id = RegistryImportService._company_id(resolved, _company_ref(data, "status_company"))
+                if status in RegistryService.CHANGED_STATUS_VALUES and not status_company_id:
+                    raise RowError("Select company for changed status")
+                if status_company_id and status not in RegistryService.CHANGED_STATUS_VALUES:
+                    raise RowError("Status company is only allowed for changed statuses")
+                parsed.append((row_number, {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": _email(data.get("email")),
+                    "phone": _cell(data.get("phone")),
+                    "notes": _cell(data.get("notes")),
+                    "company_id": RegistryImportService._company_id(resolved, _company_ref(data, "company")),
+                    "status": status,
+                    "status_company_id": status_company_id,
+                }))
+            except RowError as exc:
+                errors.append((row_number, str(exc), data))
+
+        emails = {values["email"].lower() for _, values in parsed if values["email"]}
+        existing_by_email = {}
+        if emails:
+            rows = db.query(Client.id, func.lower(Client.email), Client.status, Client.status_company_id).filter(
+                Client.workspace_id == workspace_id,
+                func.lower(Client.email).in_(emails)
+            ).order_by(Client.created_at.desc()).all()
+            existing_by_email = {email: (client_id, status, status_company_id) for client_id, email, status, status_company_id in rows}
+
+        now = get_utc_now()
+        audit = RegistryImportService._audit_columns(job, now)
+        rows: dict = {}
+        matched = set()
+        new_keys: dict = {}
+        unkeyed = 0
+        for _, values in parsed:
+            email_key = values["email"].lower() if values["email"] else None
+            existing = existing_by_email.get(email_key) if email_key else None
+            if existing:
+                row_id, current_status, current_status_company_id = existing
+                matched.add(row_id)
+                if values["status"] is None:
+                    # Status and its company move together, so an omitted status keeps both
+                    values["status"] = current_status
+                    values["status_company_id"] = current_status_company_id
+            elif email_key and email_key in new_keys:
+                row_id = new_keys[email_key]
+            else:
+                row_id = uuid.uuid4()
+                if email_key:
+                    new_keys[email_key] = row_id
+                else:
+                    # No email to match on: a re-run of the file inserts this row again
+                    unkeyed += 1
+            if values["status"] is None and row_id not in rows:
+                values["status"] = "new"
+            RegistryImportService._collapse(rows, row_id, {"id": row_id, **values, **audit, "meta_data": {}})
+
+        RegistryImportService._upsert(db, Client, list(rows.values()), {
+            "first_name": lambda table, excluded: excluded.first_name,
+            "last_name": lambda table, excluded: excluded.last_name,
+            "email": lambda table, excluded: func.coalesce(excluded.email, table.email),
+            "phone": lambda table, excluded: func.coalesce(excluded.phone, table.phone),
+            "notes": lambda table, excluded: func.coalesce(excluded.notes, table.notes),
+            "company_id": lambda table, excluded: func.coalesce(excluded.company_id, table.company_id),
+            "status": lambda table, excluded: excluded.status,
+            "status_company_id": lambda table, excluded: excluded.status_company_id,
+        })
+        return len(rows) - len(matched), len(matched), unkeyed, errors
+
+    @staticmethod
+    def _import_objects(db: Session, job: BackgroundJob, chunk: list) -> tuple[int, int, int, list]:
+        workspace_id = job.workspace_id
+        refs = {ref for _, data in chunk if (ref := _company_ref(data, "company"))}
+        resolved = RegistryImportService._resolve_companies(db, workspace_id, refs) if refs else {}
+        client_emails = set()
+        for _, data in chunk:
+            try:
+                email = _email(data.get("client_email"))
+            except RowError:
+                continue
+            if email:
+                client_emails.add(email.lower())
+        clients_by_email = {}
+        if client_emails:
+            rows = db.query(Client.id, func.lower(Client.email)).filter(
+                Client.workspace_id == workspace_id,
+                func.lower(Client.email).in_(client_emails)
+            ).order_by(Client.created_at.desc()).all()
+            clients_by_email = {email: client_id for client_id, email in rows}
+
+        errors = []
+        parsed = []
+        for row_number, data in chunk:
+            try:
+                name = _cell(data.get("name"))
+                if not name:
+                    raise RowError("name is required")
+                client_email = _email(data.get("client_email"))
+                client_id = None
+                if client_email:
+                    client_id = clients_by_email.get(client_email.lower())
+                    if not client_id:
+                        raise RowError(f"Client '{client_email}' not found")
+                company_id = RegistryImportService._company_id(resolved, _company_ref(data, "company"))
+                if client_id and company_id:
+                    raise RowError("Object can be assigned either to a client or to a company, not both.")
+                attributes = data.get("attributes")
+                if attributes is not None and not isinstance(attributes, dict):
+                    raise RowError("attributes must be an object")
+                extra = {key: value for key, value in data.items() if key not in OBJECT_COLUMNS and value is not None}
+                try:
+                    normalized_attributes = RegistryService._normalize_attributes(
+                        {**extra, **(attributes or {})}
+                    )
+                except HTTPException as exc:
+                    raise RowError(exc.detail)
+                parsed.append((row_number, {
+                    "name": name,
+                    "client_id": client_id,
+                    "company_id": company_id,
+                    "attributes": {key: value for key, value in normalized_attributes.items() if value},
+                }))
+            except RowError as exc:
+                errors.append((row_number, str(exc), data))
+
+        names = {values["name"] for _, values in parsed}
+        existing = {}
+        existing_attributes = {}
+        if names:
+            rows = db.query(
+                ClientObject.id, ClientObject.name, ClientObject.client_id, ClientObject.company_id, ClientObject.attributes
+            ).filter(
+                ClientObject.workspace_id == workspace_id,
+                ClientObject.name.in_(names)
+            ).order_by(ClientObject.created_at.desc()).all()
+            for object_id, name, client_id, company_id, attributes in rows:
+                existing[(name, client_id, company_id)] = object_id
+                existing_attributes[object_id] = attributes or {}
+
+        now = get_utc_now()
+        audit = RegistryImportService._audit_columns(job, now)
+        rows: dict = {}
+        matched = set()
+        new_keys: dict = {}
+        for _, values in parsed:
+            # Objects have no natural key: the same name under the same owner is the same object
+            key = (values["name"], values["client_id"], values["company_id"])
+            if key in existing:
+                row_id = existing[key]
+                matched.add(row_id)
+            elif key in new_keys:
+                row_id = new_keys[key]
+            else:
+                row_id = new_keys[key] = uuid.uuid4()
+            if row_id in rows:
+                values["attributes"] = {**rows[row_id]["attributes"], **values["attributes"]}
+            RegistryImportService._collapse(rows, row_id, {"id": row_id, **values, **audit, "meta_data": {}})
+
+        RegistryImportService._upsert(db, ClientObject, list(rows.values()), {
+            "name": lambda table, excluded: excluded.name,
+            # Imported attributes are merged over the stored ones
+            "attributes": lambda table, excluded: table.attributes.op("||")(excluded.attributes),
+        })
+        before = [existing_attributes.get(row_id, {}) for row_id in rows]
+        after = [{**existing_attributes.get(row_id, {}), **values["attributes"]} for row_id, values in rows.items()]
+        ObjectAttributeCatalog.apply_changes(db, workspace_id, before, after)
+        # Objects always have a key (name + owner)
+        return len(rows) - len(matched), len(matched), 0, errors
+
+    @staticmethod
+    def _execute(db: Session, job: BackgroundJob) -> dict:
+        params = job.params or {}
+        source_path = params.get("_source_path")
+        entity_type = params["entity_type"]
+        handler = {
+            "companies": RegistryImportService._import_companies,
+            "clients": RegistryImportService._import_clients,
+            "objects": RegistryImportService._import_objects,
+        }[entity_type]
+        known_columns = ENTITY_COLUMNS[entity_type]
+        chunk_rows = max(1, settings.REGISTRY_IMPORT_CHUNK_ROWS)
+
+        error_dir = os.path.join(settings.FILE_STORAGE_ROOT, str(job.workspace_id), "imports")
+        os.makedirs(error_dir, exist_ok=True)
+        error_path = os.path.join(error_dir, f"{job.id}_errors.csv")
+
+        started = time.monotonic()
+        processed = inserted = updated = unmatched = failed = 0
+        chunk: list = []
+        try:
+            with open(error_path, "w", newline="", encoding="utf-8") as error_handle:
+                error_writer = csv.writer(error_handle)
+                error_writer.writerow(["row_number", "error", "data"])
+
+                def flush():
+                    nonlocal inserted, updated, unmatched, failed
+                    chunk_inserted, chunk_updated, chunk_unmatched, errors = handler(db, job, chunk)
+                    # Each chunk commits on its own. Re-running the file updates every row that has a
+                    # match key; rows without one (counted in `unmatched_inserted`) are inserted again
+                    db.commit()
+                    inserted += chunk_inserted
+                    updated += chunk_updated
+                    unmatched += chunk_unmatched
+                    failed += len(errors)
+                    for row_number, error, data in errors:
+                        error_writer.writerow([row_number, error, json.dumps(data, ensure_ascii=False, default=str)])
+                    chunk.clear()
+                    JobService.report_progress(job.id, processed, failed)
+
+                for row_number, data in iter_records(source_path, params.get("format") or "csv"):
+                    processed += 1
+                    if data is None:
+                        failed += 1
+                        error_writer.writerow([row_number, "Line is not a JSON object", ""])
+                        continue
+                    chunk.append((row_number, _normalize_keys(data, known_columns)))
+                    if len(chunk) >= chunk_rows:
+                        flush()
+                if chunk:
+                    flush()
+        finally:
+            if source_path:
+                try:
+                    os.remove(source_path)
+                except OSError:
+                    pass
+
+        if not failed:
+            try:
+                os.remove(error_path)
+            except OSError:
+                pass
+        elapsed = time.monotonic() - started
+        JobService.report_progress(job.id, processed, failed)
+        return {
+            "entity_type": entity_type,
+            "inserted": inserted,
+            "updated": updated,
+            "unmatched_inserted": unmatched,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(processed / elapsed, 1) if elapsed > 0 else None,
+            "has_error_file": bool(failed),
+            "_error_file": error_path if failed else None,
+        }
@@ -1,8 +1,28 @@
-from sqlalchemy import Column, ForeignKey, Index, String, Text
+import uuid
+
+from sqlalchemy import DDL, BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, event, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
-from core.base_models import CRMBasedModel
+from core.base_models import CRMBasedModel, get_utc_now
+from core.database_connector import Base
+
+# Id of the writing transaction; /registry/changes orders by it and only reads
+# ids below the oldest running transaction, so late commits are never skipped
+CURRENT_XID = text("(pg_current_xact_id()::text)::bigint")
+
+# Inserts take CURRENT_XID as the column default; updates (ORM, bulk upserts, raw SQL) go through this trigger
+CHANGE_XID_TRIGGER = """
+CREATE OR REPLACE FUNCTION registry_touch_change_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := (pg_current_xact_id()::text)::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS trg_{table}_change_xid ON {table};
+CREATE TRIGGER trg_{table}_change_xid BEFORE UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION registry_touch_change_xid();
+"""
 
 
 class Company(CRMBasedModel):
@@ -10,6 +30,19 @@ class Company(CRMBasedModel):
     __table_args__ = (
         Index("ix_registry_companies_workspace_id", "workspace_id"),
         Index("ix_registry_companies_workspace_name", "workspace_id", "name"),
+        Index("ix_registry_companies_workspace_created_at_id", "workspace_id", "created_at", "id"),
+        # /registry/changes feed
+        Index("ix_registry_companies_workspace_change_xid_id", "workspace_id", "change_xid", "id"),
+        # Match keys of the bulk import
+        Index("ix_registry_companies_workspace_registration_number", "workspace_id", "registration_number"),
+        Index("ix_registry_companies_workspace_email_lower", "workspace_id", text("lower(email)")),
+        # Trigram indexes (pg_trgm) for /registry/search
+        Index(
+            "ix_registry_companies_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
     )
 
     name = Column(String, nullable=False)
@@ -19,8 +52,10 @@ class Company(CRMBasedModel):
     address = Column(Text, nullable=True)
 
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+    created_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
+    change_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
 
-    clients = relationship("Client", back_populates="company")
+    clients = relationship("Client", back_populates="company", foreign_keys="Client.company_id")
     objects = relationship("ClientObject", back_populates="company")
 
 
@@ -30,6 +65,34 @@ class Client(CRMBasedModel):
         Index("ix_registry_clients_workspace_id", "workspace_id"),
         Index("ix_registry_clients_workspace_company", "workspace_id", "company_id"),
         Index("ix_registry_clients_workspace_email", "workspace_id", "email"),
+        Index("ix_registry_clients_workspace_email_lower", "workspace_id", text("lower(email)")),
+        Index("ix_registry_clients_workspace_status", "workspace_id", "status"),
+        Index("ix_registry_clients_status_company_id", "status_company_id"),
+        Index("ix_registry_clients_workspace_change_xid_id", "workspace_id", "change_xid", "id"),
+        Index(
+            "ix_registry_clients_first_name_trgm",
+            "first_name",
+            postgresql_using="gin",
+            postgresql_ops={"first_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_registry_clients_last_name_trgm",
+            "last_name",
+            postgresql_using="gin",
+            postgresql_ops={"last_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_registry_clients_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_registry_clients_phone_trgm",
+            "phone",
+            postgresql_using="gin",
+            postgresql_ops={"phone": "gin_trgm_ops"},
+        ),
     )
 
     first_name = Column(String, nullable=False)
@@ -37,11 +100,21 @@ class Client(CRMBasedModel):
     email = Column(String, nullable=True)
     phone = Column(String, nullable=True)
     notes = Column(Text, nullable=True)
+    status = Column(String, nullable=False, default="new", server_default="new")
 
     company_id = Column(UUID(as_uuid=True), ForeignKey("registry_companies.id"), nullable=True)
+    # Company a changed_from / changed_to status refers to
+    status_company_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("registry_companies.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+    created_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
+    change_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
 
-    company = relationship("Company", back_populates="clients")
+    company = relationship("Company", back_populates="clients", foreign_keys=[company_id])
+    status_company = relationship("Company", foreign_keys=[status_company_id])
     objects = relationship("ClientObject", back_populates="client")
 
 
@@ -52,6 +125,17 @@ class ClientObject(CRMBasedModel):
         Index("ix_registry_client_objects_workspace_client", "workspace_id", "client_id"),
         Index("ix_registry_client_objects_workspace_company", "workspace_id", "company_id"),
         Index("ix_registry_client_objects_workspace_name", "workspace_id", "name"),
+        # Keyset pagination of the object list (newest first)
+        Index("ix_registry_client_objects_workspace_created_at_id", "workspace_id", "created_at", "id"),
+        Index("ix_registry_client_objects_workspace_change_xid_id", "workspace_id", "change_xid", "id"),
+        # attr[...] filters: containment (@>) and key existence (?)
+        Index("ix_registry_client_objects_attributes", "attributes", postgresql_using="gin"),
+        Index(
+            "ix_registry_client_objects_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
     )
 
     name = Column(String, nullable=False)
@@ -60,6 +144,61 @@ class ClientObject(CRMBasedModel):
     client_id = Column(UUID(as_uuid=True), ForeignKey("registry_clients.id"), nullable=True)
     company_id = Column(UUID(as_uuid=True), ForeignKey("registry_companies.id"), nullable=True)
     workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+    created_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
+    change_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
 
     client = relationship("Client", back_populates="objects")
     company = relationship("Company", back_populates="objects")
+
+
+class ObjectAttributeKey(Base):
+    """
+    Attribute keys used by a workspace's objects and how many objects carry each.
+    Adjusted by deltas whenever objects are written, so filter UIs never scan objects.
+    Not a CRMBasedModel: rows are derived data and carry no audit columns.
+    """
+    __tablename__ = "registry_object_attribute_keys"
+
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    object_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=get_utc_now, onupdate=get_utc_now, nullable=False)
+
+
+class RegistryTombstone(Base):
+    """
+    Marker left behind when a company, client or object is deleted, so the
+    /registry/changes feed can report deletions. Pruned after the retention window.
+    """
+    __tablename__ = "registry_tombstones"
+    __table_args__ = (
+        Index("ix_registry_tombstones_workspace_deleted_at_id", "workspace_id", "deleted_at", "id"),
+        Index("ix_registry_tombstones_workspace_change_xid_id", "workspace_id", "change_xid", "id"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entity_type = Column(String, nullable=False)  # company | client | object
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=get_utc_now, nullable=False)
+    change_xid = Column(BigInteger, server_default=CURRENT_XID, nullable=False)
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
+
+
+for _table in (Company.__table__, Client.__table__, ClientObject.__table__):
+    event.listen(_table, "after_create", DDL(CHANGE_XID_TRIGGER.format(table=_table.name)))
+
+
+class ClientDuplicateCluster(CRMBasedModel):
+    """ Clients a dedup scan considers the same person; replaced by the next scan """
+    __tablename__ = "registry_client_duplicate_clusters"
+    __table_args__ = (
+        Index("ix_registry_client_duplicate_clusters_job_score", "job_id", "score"),
+        Index("ix_registry_client_duplicate_clusters_workspace_id", "workspace_id"),
+    )
+
+    client_ids = Column(JSONB, nullable=False, default=list)  # ["<uuid>", ...]
+    size = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)  # best pair score in the cluster
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("system_jobs.id", ondelete="CASCADE"), nullable=False)
+    workspace_id = Column(UUID(as_uuid=True), ForeignKey("access_workspaces.id"), nullable=False)
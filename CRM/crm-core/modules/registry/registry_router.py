@@ -1,36 +1,190 @@
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
+from core.config import settings
 from core.database_connector import get_db
 from core.workspace_resolver import resolve_workspace_id
 from modules.access_control.access_permissions import PermissionService
 from modules.access_control.access_security import get_current_user
+from modules.jobs.job_service import JobService
+from modules.registry.registry_attributes import ObjectAttributeCatalog, parse_attribute_filters
+from modules.registry.registry_dedup import DEDUP_JOB_TYPE, RegistryDedupService
+from modules.registry.registry_import import REGISTRY_IMPORT_JOB_TYPE, RegistryImportService
 from modules.registry.registry_schemas import (
     ClientObjectCreateSchema,
     ClientObjectUpdateSchema,
     ClientCreateSchema,
+    ClientMergeSchema,
     ClientStatus,
     ClientUpdateSchema,
     CompanyCreateSchema,
     CompanyUpdateSchema,
 )
+from modules.registry.registry_search import SEARCH_PERMISSIONS, RegistrySearchService
 from modules.registry.registry_service import RegistryService
+from modules.registry.registry_sync import RegistrySyncService
 
 router = APIRouter(prefix="/registry", tags=["Company Client Registry"])
 
 
+@router.get("/search")
+def search_registry(
+    q: str = "",
+    type: Optional[str] = None,
+    limit: int = 10,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Ranked autocomplete over companies, clients and objects (`type` narrows to one) """
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    if type in SEARCH_PERMISSIONS:
+        PermissionService.require_permission(current_user, SEARCH_PERMISSIONS[type])
+        types = [type]
+    else:
+        # Without `type`, search whatever the role is allowed to list
+        types = [
+            item_type
+            for item_type, permission in SEARCH_PERMISSIONS.items()
+            if PermissionService.has_permission(current_user.role, permission)
+        ]
+        if type is None and not types:
+            PermissionService.require_permission(current_user, "view_companies")
+    return RegistrySearchService.search(db, target_workspace, q, type, limit, types)
+
+
+@router.get("/changes")
+def list_registry_changes(
+    since: Optional[str] = None,
+    limit: int = settings.DEFAULT_PAGE_SIZE,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Created, updated and deleted companies/clients/objects after the `since` cursor.
+    Pass the returned `cursor` back as `since`; repeat while `has_more` is true.
+    """
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    types = [
+        item_type
+        for item_type, permission in SEARCH_PERMISSIONS.items()
+        if PermissionService.has_permission(current_user.role, permission)
+    ]
+    if not types:
+        PermissionService.require_permission(current_user, "view_companies")
+    return RegistrySyncService.list_changes(db, target_workspace, since, types, limit)
+
+
+@router.post("/import")
+def import_registry(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    entity_type: str = Form(...),  # companies | clients | objects
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Upsert companies, clients or objects from a CSV/XLSX/NDJSON file as a background job """
+    PermissionService.require_permission(current_user, "import_registry")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    job = RegistryImportService.start_import(db, entity_type, target_workspace, file, current_user)
+    background_tasks.add_task(RegistryImportService.run_import, job.id)
+    return JobService.serialize_job(job)
+
+
+@router.get("/import/{job_id}")
+def get_registry_import(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    PermissionService.require_permission(current_user, "import_registry")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    return JobService.serialize_job(
+        JobService.get_job(db, job_id, target_workspace, REGISTRY_IMPORT_JOB_TYPE, current_user)
+    )
+
+
+@router.get("/import/{job_id}/errors")
+def download_registry_import_errors(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Rejected rows with the reason, as CSV """
+    PermissionService.require_permission(current_user, "import_registry")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    path = RegistryImportService.get_error_file(db, job_id, target_workspace, current_user)
+    return FileResponse(path=path, media_type="text/csv", filename=f"registry_import_{job_id}_errors.csv")
+
+
+@router.post("/duplicates/scan")
+def scan_client_duplicates(
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Queue a duplicate client scan (a running scan of the workspace is returned instead) """
+    PermissionService.require_permission(current_user, "edit_client")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    job = RegistryDedupService.start_scan(db, target_workspace, current_user)
+    background_tasks.add_task(RegistryDedupService.run_scan, job.id)
+    return JobService.serialize_job(job)
+
+
+@router.get("/duplicates/scan/{job_id}")
+def get_client_duplicate_scan(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    PermissionService.require_permission(current_user, "edit_client")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    return JobService.serialize_job(JobService.get_job(db, job_id, target_workspace, DEDUP_JOB_TYPE))
+
+
+@router.get("/duplicates")
+def list_client_duplicates(
+    response: Response,
+    min_score: float = 0.0,
+    skip: int = 0,
+    limit: int = 50,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Candidate clusters of the latest scan; the total is in `X-Total-Count` """
+    PermissionService.require_permission(current_user, "view_clients")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    clusters, total = RegistryDedupService.list_clusters(db, target_workspace, skip, limit, min_score)
+    response.headers["X-Total-Count"] = str(total)
+    return clusters
+
+
 @router.get("/companies")
 def list_companies(
+    response: Response,
     workspace_id: Optional[UUID] = None,
+    skip: int = 0,
+    limit: int = settings.DEFAULT_PAGE_SIZE,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    """ Paginated (newest first); the workspace total is in `X-Total-Count` """
     PermissionService.require_permission(current_user, "view_companies")
     target_workspace = resolve_workspace_id(current_user, workspace_id)
-    return RegistryService.list_companies(db, target_workspace)
+    companies, total = RegistryService.list_companies(db, target_workspace, skip, limit)
+    response.headers["X-Total-Count"] = str(total)
+    return companies
 
 
 @router.post("/companies")
@@ -53,6 +207,29 @@ def create_company(
     )
 
 
+@router.get("/companies/{company_id}/graph")
+def get_company_graph(
+    company_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    The company with its clients and every object assigned to it or to its clients,
+    streamed as one JSON document. Lists the role may not view come back empty.
+    """
+    PermissionService.require_permission(current_user, "view_companies")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    graph_stream = RegistryService.stream_company_graph(
+        db,
+        company_id,
+        target_workspace,
+        include_clients=PermissionService.has_permission(current_user.role, "view_clients"),
+        include_objects=PermissionService.has_permission(current_user.role, "view_client_objects"),
+    )
+    return StreamingResponse(graph_stream, media_type="application/json")
+
+
 @router.put("/companies/{company_id}")
 def update_company(
     company_id: UUID,
@@ -90,13 +267,19 @@ def delete_company(
 @router.get("/clients")
 def list_clients(
     company_id: Optional[UUID] = None,
+    status: Optional[ClientStatus] = None,
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     PermissionService.require_permission(current_user, "view_clients")
     target_workspace = resolve_workspace_id(current_user, workspace_id)
-    return RegistryService.list_clients(db, target_workspace, company_id)
+    return RegistryService.list_clients(
+        db,
+        target_workspace,
+        company_id,
+        status.value if status else None,
+    )
 
 
 @router.post("/clients")
@@ -122,6 +305,20 @@ def create_client(
     )
 
 
+@router.post("/clients/merge")
+def merge_clients(
+    data: ClientMergeSchema,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """ Merge duplicates into `target_id`: objects are moved over, the sources deleted """
+    PermissionService.require_permission(current_user, "edit_client")
+    PermissionService.require_permission(current_user, "delete_client")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    return RegistryDedupService.merge_clients(db, target_workspace, data.target_id, data.source_ids)
+
+
 @router.put("/clients/{client_id}")
 def update_client(
     client_id: UUID,
@@ -162,15 +359,46 @@ def delete_client(
 
 @router.get("/objects")
 def list_client_objects(
+    request: Request,
+    response: Response,
     client_id: Optional[UUID] = None,
     company_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    limit: int = settings.DEFAULT_PAGE_SIZE,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Supports `attr[key]=op:value` (eq, in, prefix, contains, exists).
+    Newest first; pass the `X-Next-Cursor` header back as `cursor` for the next page.
+    """
+    PermissionService.require_permission(current_user, "view_client_objects")
+    target_workspace = resolve_workspace_id(current_user, workspace_id)
+    objects, next_cursor = RegistryService.list_client_objects(
+        db,
+        target_workspace,
+        client_id,
+        company_id,
+        parse_attribute_filters(request.query_params),
+        cursor,
+        limit,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return objects
+
+
+@router.get("/objects/attribute-keys")
+def list_object_attribute_keys(
     workspace_id: Optional[UUID] = None,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    """ Attribute keys in use with their object counts, for building filters """
     PermissionService.require_permission(current_user, "view_client_objects")
     target_workspace = resolve_workspace_id(current_user, workspace_id)
-    return RegistryService.list_client_objects(db, target_workspace, client_id, company_id)
+    return ObjectAttributeCatalog.list_keys(db, target_workspace)
 
 
 @router.post("/objects")
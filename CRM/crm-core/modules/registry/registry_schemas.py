@@ -112,3 +112,8 @@ class ClientObjectResponseSchema(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class ClientMergeSchema(BaseModel):
+    target_id: UUID
+    source_ids: list[UUID] = Field(..., min_length=1, max_length=100)
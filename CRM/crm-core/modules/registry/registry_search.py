@@ -0,0 +1,169 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func, literal, or_
+from sqlalchemy.orm import Session
+
+from modules.registry.registry_models import Client, ClientObject, Company
+
+SEARCH_TYPES = ("company", "client", "object")
+# Same permissions as the list endpoints of each type
+SEARCH_PERMISSIONS = {
+    "company": "view_companies",
+    "client": "view_clients",
+    "object": "view_client_objects",
+}
+# Trigram indexes need at least a couple of characters to be selective
+MIN_QUERY_CHARS = 2
+MAX_SEARCH_LIMIT = 50
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _contains(column, token: str):
+    # ILIKE '%token%' is answered by the gin_trgm_ops index on the column
+    return column.ilike(f"%{_escape_like(token)}%", escape="\\")
+
+
+def _starts_with(column, term: str):
+    return case((column.ilike(f"{_escape_like(term)}%", escape="\\"), 1), else_=0)
+
+
+class RegistrySearchService:
+    """
+    Ranked top-N lookup over companies, clients and objects for autocomplete.
+    Every word of the query must appear in one of the searched columns; rows are
+    ranked by prefix match first, then by trigram similarity.
+    """
+
+    @staticmethod
+    def _tokens(term: str) -> list[str]:
+        return [token for token in term.split() if token]
+
+    @staticmethod
+    def _search_companies(db: Session, workspace_id: UUID, term: str, limit: int) -> list[dict]:
+        score = func.similarity(Company.name, term)
+        prefix = _starts_with(Company.name, term)
+        rows = (
+            db.query(Company.id, Company.name, Company.registration_number, score.label("score"))
+            .filter(
+                Company.workspace_id == workspace_id,
+                *[_contains(Company.name, token) for token in RegistrySearchService._tokens(term)],
+            )
+            .order_by(prefix.desc(), score.desc(), Company.name)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "type": "company",
+                "id": str(row.id),
+                "label": row.name,
+                "detail": row.registration_number,
+                "score": round(float(row.score or 0), 4),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _search_clients(db: Session, workspace_id: UUID, term: str, limit: int) -> list[dict]:
+        columns = (Client.first_name, Client.last_name, Client.email, Client.phone)
+        full_name = Client.first_name + literal(" ") + Client.last_name
+        score = func.greatest(
+            func.similarity(full_name, term),
+            func.similarity(func.coalesce(Client.email, ""), term),
+            func.similarity(func.coalesce(Client.phone, ""), term),
+        )
+        prefix = func.greatest(
+            _starts_with(Client.first_name, term),
+            _starts_with(Client.last_name, term),
+            _starts_with(full_name, term),
+        )
+        token_filters = [
+            or_(*[_contains(column, token) for column in columns])
+            for token in RegistrySearchService._tokens(term)
+        ]
+        rows = (
+            db.query(
+                Client.id,
+                Client.first_name,
+                Client.last_name,
+                Client.email,
+                Client.phone,
+                Company.name.label("company_name"),
+                score.label("score"),
+            )
+            .outerjoin(Company, Company.id == Client.company_id)
+            .filter(Client.workspace_id == workspace_id, and_(*token_filters))
+            .order_by(prefix.desc(), score.desc(), Client.last_name, Client.first_name)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "type": "client",
+                "id": str(row.id),
+                "label": f"{row.first_name} {row.last_name}".strip(),
+                "detail": row.company_name or row.email or row.phone,
+                "score": round(float(row.score or 0), 4),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _search_objects(db: Session, workspace_id: UUID, term: str, limit: int) -> list[dict]:
+        score = func.similarity(ClientObject.name, term)
+        prefix = _starts_with(ClientObject.name, term)
+        rows = (
+            db.query(ClientObject.id, ClientObject.name, score.label("score"))
+            .filter(
+                ClientObject.workspace_id == workspace_id,
+                *[_contains(ClientObject.name, token) for token in RegistrySearchService._tokens(term)],
+            )
+            .order_by(prefix.desc(), score.desc(), ClientObject.name)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "type": "object",
+                "id": str(row.id),
+                "label": row.name,
+                "detail": None,
+                "score": round(float(row.score or 0), 4),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def search(
+        db: Session,
+        workspace_id: UUID,
+        q: str,
+        search_type: Optional[str] = None,
+        limit: int = 10,
+        allowed_types: Optional[list[str]] = None,
+    ) -> dict:
+        term = " ".join((q or "").split())
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        if search_type is not None and search_type not in SEARCH_TYPES:
+            raise HTTPException(status_code=400, detail=f"type must be one of: {', '.join(SEARCH_TYPES)}")
+        if len(term) < MIN_QUERY_CHARS:
+            return {"query": term, "results": []}
+
+        searchers = {
+            "company": RegistrySearchService._search_companies,
+            "client": RegistrySearchService._search_clients,
+            "object": RegistrySearchService._search_objects,
+        }
+        types = [search_type] if search_type else list(allowed_types or SEARCH_TYPES)
+        results = []
+        for item_type in types:
+            results.extend(searchers[item_type](db, workspace_id, term, limit))
+        if len(types) > 1:
+            results.sort(key=lambda item: item["score"], reverse=True)
+            results = results[:limit]
+        return {"query": term, "results": results}
@@ -1,38 +1,34 @@
-from typing import Optional
+import itertools
+import json
+from datetime import timedelta
+from typing import Iterator, Optional
 from uuid import UUID
 
 from fastapi import HTTPException
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session, joinedload
 
-from modules.registry.registry_models import Client, ClientObject, Company
+from core.base_models import get_utc_now
+from core.config import settings
+from core.export_stream import stream_query
+from modules.registry.registry_attributes import ObjectAttributeCatalog, after_cursor, build_attribute_filters, encode_cursor
+from modules.registry.registry_models import Client, ClientObject, Company, RegistryTombstone
+
+# Streamed graph output is flushed in chunks of about this size
+GRAPH_CHUNK_BYTES = 64 * 1024
 
 
 class RegistryService:
     CHANGED_STATUS_VALUES = {"changed_from", "changed_to"}
+    STATUS_VALUES = {"new", "active", "reactivated", "deactivated", "changed_from", "changed_to"}
 
     @staticmethod
     def _normalize_status(status: Optional[str]) -> str:
         normalized = (status or "new").strip().lower()
-        allowed = {"new", "active", "reactivated", "deactivated", "changed_from", "changed_to"}
-        if normalized not in allowed:
+        if normalized not in RegistryService.STATUS_VALUES:
             raise HTTPException(status_code=400, detail="Invalid client status")
         return normalized
 
-    @staticmethod
-    def _extract_status_company_id(client: Client) -> Optional[str]:
-        meta = client.meta_data if isinstance(client.meta_data, dict) else {}
-        status_company_id = meta.get("status_company_id")
-        if not status_company_id:
-            return None
-        return str(status_company_id)
-
-    @staticmethod
-    def _extract_status(client: Client) -> str:
-        meta = client.meta_data if isinstance(client.meta_data, dict) else {}
-        raw_status = str(meta.get("status") or "new").strip().lower()
-        allowed = {"new", "active", "reactivated", "deactivated", "changed_from", "changed_to"}
-        return raw_status if raw_status in allowed else "new"
-
     @staticmethod
     def _build_status_label(status: str, status_company_name: Optional[str]) -> str:
         if status == "changed_from":
@@ -48,22 +44,27 @@ class RegistryService:
         return labels.get(status, "New")
 
     @staticmethod
-    def _resolve_status_company_name(db: Session, workspace_id: UUID, status_company_id: Optional[str]) -> Optional[str]:
-        if not status_company_id:
-            return None
-        try:
-            company_uuid = UUID(str(status_company_id))
-        except (TypeError, ValueError):
-            return None
-        company = (
-            db.query(Company)
-            .filter(Company.id == company_uuid, Company.workspace_id == workspace_id)
-            .first()
+    def _client_count_column(workspace_id: UUID):
+        """ Per-company client count as a correlated subquery (index-only on workspace_id, company_id) """
+        return (
+            select(func.count(Client.id))
+            .where(Client.workspace_id == workspace_id, Client.company_id == Company.id)
+            .correlate(Company)
+            .scalar_subquery()
+            .label("client_count")
+        )
+
+    @staticmethod
+    def _count_clients(db: Session, workspace_id: UUID, company_id: UUID) -> int:
+        return (
+            db.query(func.count(Client.id))
+            .filter(Client.workspace_id == workspace_id, Client.company_id == company_id)
+            .scalar()
+            or 0
         )
-        return company.name if company else None
 
     @staticmethod
-    def _serialize_company(company: Company) -> dict:
+    def _serialize_company(company: Company, client_count: int = 0) -> dict:
         return {
             "id": str(company.id),
             "name": company.name,
@@ -72,18 +73,16 @@ class RegistryService:
             "phone": company.phone,
             "address": company.address,
             "workspace_id": str(company.workspace_id),
-            "client_count": len(company.clients or []),
+            "client_count": client_count,
             "created_at": company.created_at.isoformat() if company.created_at else None,
             "updated_at": company.updated_at.isoformat() if company.updated_at else None,
         }
 
     @staticmethod
-    def _serialize_client(
-        client: Client,
-        status_company_name: Optional[str] = None,
-    ) -> dict:
-        status = RegistryService._extract_status(client)
-        status_company_id = RegistryService._extract_status_company_id(client)
+    def _serialize_client(client: Client) -> dict:
+        """ Expects `company` and `status_company` to be loaded (joinedload or refresh) """
+        status = client.status or "new"
+        status_company_name = client.status_company.name if client.status_company else None
         return {
             "id": str(client.id),
             "first_name": client.first_name,
@@ -94,7 +93,7 @@ class RegistryService:
             "company_id": str(client.company_id) if client.company_id else None,
             "company_name": client.company.name if client.company else None,
             "status": status,
-            "status_company_id": status_company_id,
+            "status_company_id": str(client.status_company_id) if client.status_company_id else None,
             "status_company_name": status_company_name,
             "status_label": RegistryService._build_status_label(status, status_company_name),
             "workspace_id": str(client.workspace_id),
@@ -143,6 +142,22 @@ class RegistryService:
             normalized[key] = str(raw_value or "").strip()
         return normalized
 
+    @staticmethod
+    def _record_deletions(db: Session, workspace_id: UUID, entity_type: str, entity_ids: list) -> None:
+        """ Tombstones for the /registry/changes feed; written in the deleting transaction """
+        if not entity_ids:
+            return
+        db.add_all([
+            RegistryTombstone(workspace_id=workspace_id, entity_type=entity_type, entity_id=entity_id)
+            for entity_id in entity_ids
+        ])
+        # Expired tombstones go with the next deletion (range delete on the workspace index)
+        cutoff = get_utc_now() - timedelta(days=settings.REGISTRY_TOMBSTONE_RETENTION_DAYS)
+        db.query(RegistryTombstone).filter(
+            RegistryTombstone.workspace_id == workspace_id,
+            RegistryTombstone.deleted_at < cutoff
+        ).delete(synchronize_session=False)
+
     @staticmethod
     def _resolve_client(db: Session, workspace_id: UUID, client_id: Optional[UUID]) -> Optional[Client]:
         if not client_id:
@@ -209,15 +224,98 @@ class RegistryService:
         return RegistryService._serialize_company(company)
 
     @staticmethod
-    def list_companies(db: Session, workspace_id: UUID) -> list[dict]:
-        companies = (
-            db.query(Company)
-            .options(joinedload(Company.clients))
-            .filter(Company.workspace_id == workspace_id)
-            .order_by(Company.created_at.desc())
+    def list_companies(
+        db: Session,
+        workspace_id: UUID,
+        skip: int = 0,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+    ) -> tuple[list[dict], int]:
+        """ One page of companies (newest first) and the workspace total """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        skip = max(skip, 0)
+        base = db.query(Company).filter(Company.workspace_id == workspace_id)
+        total = base.order_by(None).count()
+        rows = (
+            base.add_columns(RegistryService._client_count_column(workspace_id))
+            # id breaks created_at ties (imports stamp a whole chunk at once) so pages never overlap
+            .order_by(Company.created_at.desc(), Company.id.desc())
+            .offset(skip)
+            .limit(limit)
             .all()
         )
-        return [RegistryService._serialize_company(company) for company in companies]
+        return [RegistryService._serialize_company(company, client_count) for company, client_count in rows], total
+
+    @staticmethod
+    def stream_company_graph(
+        db: Session,
+        company_id: UUID,
+        workspace_id: UUID,
+        include_clients: bool = True,
+        include_objects: bool = True,
+    ) -> Iterator[bytes]:
+        """
+        `{"company": {...}, "clients": [...], "objects": [...]}` as a byte stream.
+        The company is checked up front (404 before the first byte); clients and
+        the objects assigned to the company or any of its clients are then read
+        through server-side cursors, so memory stays flat for very large companies.
+        """
+        row = (
+            db.query(Company, RegistryService._client_count_column(workspace_id))
+            .filter(Company.id == company_id, Company.workspace_id == workspace_id)
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Company not found")
+        company = RegistryService._serialize_company(*row)
+
+        def build_clients(session: Session):
+            return (
+                session.query(Client)
+                .options(joinedload(Client.company), joinedload(Client.status_company))
+                .filter(Client.workspace_id == workspace_id, Client.company_id == company_id)
+                .order_by(Client.created_at.desc())
+            )
+
+        def build_objects(session: Session):
+            company_clients = select(Client.id).where(
+                Client.workspace_id == workspace_id, Client.company_id == company_id
+            )
+            return (
+                session.query(ClientObject)
+                .options(joinedload(ClientObject.client), joinedload(ClientObject.company))
+                .filter(
+                    ClientObject.workspace_id == workspace_id,
+                    or_(ClientObject.company_id == company_id, ClientObject.client_id.in_(company_clients)),
+                )
+                .order_by(ClientObject.created_at.desc(), ClientObject.id.desc())
+            )
+
+        def write_array(name: str, build_query, serialize, enabled: bool) -> Iterator[str]:
+            yield f', "{name}": ['
+            if enabled:
+                separator = ""
+                for item in stream_query(build_query):
+                    yield separator + json.dumps(serialize(item))
+                    separator = ","
+            yield "]"
+
+        def generate() -> Iterator[bytes]:
+            buffer: list[str] = ['{"company": ' + json.dumps(company)]
+            size = 0
+            parts = itertools.chain(
+                write_array("clients", build_clients, RegistryService._serialize_client, include_clients),
+                write_array("objects", build_objects, RegistryService._serialize_client_object, include_objects),
+                ["}"],
+            )
+            for part in parts:
+                buffer.append(part)
+                size += len(part)
+                if size >= GRAPH_CHUNK_BYTES:
+                    yield "".join(buffer).encode()
+                    buffer, size = [], 0
+            yield "".join(buffer).encode()
+
+        return generate()
 
     @staticmethod
     def update_company(
@@ -232,7 +330,6 @@ class RegistryService:
     ) -> dict:
         company = (
             db.query(Company)
-            .options(joinedload(Company.clients))
             .filter(Company.id == company_id, Company.workspace_id == workspace_id)
             .first()
         )
@@ -255,20 +352,27 @@ class RegistryService:
 
         db.commit()
         db.refresh(company)
-        return RegistryService._serialize_company(company)
+        return RegistryService._serialize_company(
+            company, RegistryService._count_clients(db, workspace_id, company.id)
+        )
 
     @staticmethod
     def delete_company(db: Session, company_id: UUID, workspace_id: UUID) -> dict:
         company = (
             db.query(Company)
-            .options(joinedload(Company.clients))
             .filter(Company.id == company_id, Company.workspace_id == workspace_id)
             .first()
         )
         if not company:
             raise HTTPException(status_code=404, detail="Company not found")
 
-        if company.clients:
+        has_clients = (
+            db.query(Client.id)
+            .filter(Client.workspace_id == workspace_id, Client.company_id == company_id)
+            .first()
+            is not None
+        )
+        if has_clients:
             raise HTTPException(
                 status_code=400,
                 detail="Cannot delete company with linked clients. Reassign or remove clients first.",
@@ -286,6 +390,7 @@ class RegistryService:
                 detail="Cannot delete company with assigned objects. Reassign or remove objects first.",
             )
 
+        RegistryService._record_deletions(db, workspace_id, "company", [company.id])
         db.delete(company)
         db.commit()
         return {"message": "Company deleted"}
@@ -319,6 +424,7 @@ class RegistryService:
             workspace_id=workspace_id,
         )
         db.add(client_object)
+        ObjectAttributeCatalog.apply_changes(db, workspace_id, [], [normalized_attributes])
         db.commit()
         db.refresh(client_object)
         db.refresh(client_object, attribute_names=["client", "company"])
@@ -330,7 +436,15 @@ class RegistryService:
         workspace_id: UUID,
         client_id: Optional[UUID] = None,
         company_id: Optional[UUID] = None,
-    ) -> list[dict]:
+        attribute_filters: Optional[dict[str, str]] = None,
+        cursor: Optional[str] = None,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        One page of objects (newest first) and the cursor of the next page.
+        Keyset pagination on (created_at, id), so deep pages cost the same as the first.
+        """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
         query = (
             db.query(ClientObject)
             .options(joinedload(ClientObject.client), joinedload(ClientObject.company))
@@ -340,9 +454,17 @@ class RegistryService:
             query = query.filter(ClientObject.client_id == client_id)
         if company_id:
             query = query.filter(ClientObject.company_id == company_id)
-
-        objects = query.order_by(ClientObject.created_at.desc()).all()
-        return [RegistryService._serialize_client_object(item) for item in objects]
+        if attribute_filters:
+            query = query.filter(*build_attribute_filters(attribute_filters))
+        if cursor:
+            query = query.filter(after_cursor(cursor))
+
+        objects = query.order_by(ClientObject.created_at.desc(), ClientObject.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(objects) > limit:
+            objects = objects[:limit]
+            next_cursor = encode_cursor(objects[-1].created_at, objects[-1].id)
+        return [RegistryService._serialize_client_object(item) for item in objects], next_cursor
 
     @staticmethod
     def update_client_object(
@@ -397,7 +519,9 @@ class RegistryService:
             client_object.company_id = company.id if company else None
 
         if "attributes" in changed_fields:
+            previous_attributes = dict(client_object.attributes or {})
             client_object.attributes = RegistryService._normalize_attributes(attributes)
+            ObjectAttributeCatalog.apply_changes(db, workspace_id, [previous_attributes], [client_object.attributes])
 
         db.commit()
         db.refresh(client_object)
@@ -414,6 +538,8 @@ class RegistryService:
         if not client_object:
             raise HTTPException(status_code=404, detail="Client object not found")
 
+        ObjectAttributeCatalog.apply_changes(db, workspace_id, [client_object.attributes or {}], [])
+        RegistryService._record_deletions(db, workspace_id, "object", [client_object.id])
         db.delete(client_object)
         db.commit()
         return {"message": "Client object deleted"}
@@ -457,12 +583,6 @@ class RegistryService:
         if normalized_status not in RegistryService.CHANGED_STATUS_VALUES and status_company:
             raise HTTPException(status_code=400, detail="Status company is only allowed for changed statuses")
 
-        meta_data = {
-            "status": normalized_status,
-        }
-        if status_company:
-            meta_data["status_company_id"] = str(status_company.id)
-
         client = Client(
             first_name=first_name.strip(),
             last_name=last_name.strip(),
@@ -470,56 +590,37 @@ class RegistryService:
             phone=(phone or "").strip() or None,
             company_id=company.id if company else None,
             notes=(notes or "").strip() or None,
+            status=normalized_status,
+            status_company_id=status_company.id if status_company else None,
             workspace_id=workspace_id,
-            meta_data=meta_data,
         )
         db.add(client)
         db.commit()
         db.refresh(client)
-        db.refresh(client, attribute_names=["company"])
-        return RegistryService._serialize_client(client, status_company.name if status_company else None)
+        db.refresh(client, attribute_names=["company", "status_company"])
+        return RegistryService._serialize_client(client)
 
     @staticmethod
-    def list_clients(db: Session, workspace_id: UUID, company_id: Optional[UUID] = None) -> list[dict]:
+    def list_clients(
+        db: Session,
+        workspace_id: UUID,
+        company_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+    ) -> list[dict]:
+        """ Company and status company names come from the same query (two joins) """
         query = (
             db.query(Client)
-            .options(joinedload(Client.company))
+            .options(joinedload(Client.company), joinedload(Client.status_company))
             .filter(Client.workspace_id == workspace_id)
         )
         if company_id:
             query = query.filter(Client.company_id == company_id)
+        if status:
+            # Served by ix_registry_clients_workspace_status
+            query = query.filter(Client.status == RegistryService._normalize_status(status))
 
         clients = query.order_by(Client.created_at.desc()).all()
-        status_company_ids: set[str] = set()
-        for client in clients:
-            status_company_id = RegistryService._extract_status_company_id(client)
-            if status_company_id:
-                status_company_ids.add(status_company_id)
-
-        status_company_name_map: dict[str, str] = {}
-        if status_company_ids:
-            valid_company_ids: list[UUID] = []
-            for raw_company_id in status_company_ids:
-                try:
-                    valid_company_ids.append(UUID(raw_company_id))
-                except (TypeError, ValueError):
-                    continue
-
-            if valid_company_ids:
-                companies = (
-                    db.query(Company)
-                    .filter(Company.workspace_id == workspace_id, Company.id.in_(valid_company_ids))
-                    .all()
-                )
-                status_company_name_map = {str(company.id): company.name for company in companies}
-
-        return [
-            RegistryService._serialize_client(
-                client,
-                status_company_name_map.get(RegistryService._extract_status_company_id(client) or ""),
-            )
-            for client in clients
-        ]
+        return [RegistryService._serialize_client(client) for client in clients]
 
     @staticmethod
     def update_client(
@@ -538,7 +639,6 @@ class RegistryService:
     ) -> dict:
         client = (
             db.query(Client)
-            .options(joinedload(Client.company))
             .filter(Client.id == client_id, Client.workspace_id == workspace_id)
             .first()
         )
@@ -577,14 +677,11 @@ class RegistryService:
         if "notes" in changed_fields and notes is not None:
             client.notes = notes.strip() or None
 
-        current_status = RegistryService._extract_status(client)
-        next_status = current_status
+        next_status = client.status or "new"
         if "status" in changed_fields:
             next_status = RegistryService._normalize_status(status)
 
-        meta_data = dict(client.meta_data or {})
-        status_company = None
-        next_status_company_id = RegistryService._extract_status_company_id(client)
+        next_status_company_id = client.status_company_id
         if "status_company_id" in changed_fields:
             if status_company_id:
                 status_company = (
@@ -594,7 +691,7 @@ class RegistryService:
                 )
                 if not status_company:
                     raise HTTPException(status_code=404, detail="Status company not found")
-                next_status_company_id = str(status_company.id)
+                next_status_company_id = status_company.id
             else:
                 next_status_company_id = None
 
@@ -603,21 +700,13 @@ class RegistryService:
         if next_status not in RegistryService.CHANGED_STATUS_VALUES:
             next_status_company_id = None
 
-        meta_data["status"] = next_status
-        if next_status_company_id:
-            meta_data["status_company_id"] = next_status_company_id
-        else:
-            meta_data.pop("status_company_id", None)
-        client.meta_data = meta_data
+        client.status = next_status
+        client.status_company_id = next_status_company_id
 
         db.commit()
         db.refresh(client)
-        db.refresh(client, attribute_names=["company"])
-        if not status_company and next_status_company_id:
-            status_company_name = RegistryService._resolve_status_company_name(db, workspace_id, next_status_company_id)
-        else:
-            status_company_name = status_company.name if status_company else None
-        return RegistryService._serialize_client(client, status_company_name)
+        db.refresh(client, attribute_names=["company", "status_company"])
+        return RegistryService._serialize_client(client)
 
     @staticmethod
     def delete_client(db: Session, client_id: UUID, workspace_id: UUID) -> dict:
@@ -641,6 +730,7 @@ class RegistryService:
                 detail="Cannot delete client with assigned objects. Reassign or remove objects first.",
             )
 
+        RegistryService._record_deletions(db, workspace_id, "client", [client.id])
         db.delete(client)
         db.commit()
         return {"message": "Client deleted"}
@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+from core.base_models import get_utc_now
+from core.config import settings
+from modules.registry.registry_models import Client, ClientObject, Company, RegistryTombstone
+from modules.registry.registry_service import RegistryService
+
+# Feed order is (change_xid, rank, id): the id of the transaction that last wrote
+# the row, then a rank that breaks ties between sources
+SOURCE_RANKS = {"company": 0, "client": 1, "object": 2, "tombstone": 3}
+_MAX_ID = UUID(int=(1 << 128) - 1)
+
+
+def encode_sync_cursor(change_xid: int, rank: int, entity_id, issued_at: datetime) -> str:
+    raw = json.dumps([change_xid, rank, str(entity_id), issued_at.isoformat()]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_cursor(cursor: str) -> tuple[int, int, UUID, datetime]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(400, detail="Invalid sync cursor")
+    if isinstance(values, list) and len(values) == 3:
+        # Timestamp cursors from before the feed was ordered by transaction id
+        raise HTTPException(410, detail="Sync cursor expired; reload the registry and start a new sync")
+    try:
+        change_xid, rank, entity_id, issued_at = values
+        return int(change_xid), int(rank), UUID(entity_id), datetime.fromisoformat(issued_at)
+    except (ValueError, TypeError):
+        raise HTTPException(400, detail="Invalid sync cursor")
+
+
+def _after(change_xid_column, id_column, rank: int, cursor: tuple[int, int, UUID, datetime]):
+    """ Rows of one source that sort after the cursor; the rank is constant per source """
+    change_xid, cursor_rank, entity_id, _ = cursor
+    if rank > cursor_rank:
+        return change_xid_column >= change_xid
+    if rank < cursor_rank:
+        return change_xid_column > change_xid
+    return tuple_(change_xid_column, id_column) > tuple_(change_xid, entity_id)
+
+
+class RegistrySyncService:
+    @staticmethod
+    def list_changes(
+        db: Session,
+        workspace_id,
+        since: str | None,
+        entity_types: list[str],
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+    ) -> dict:
+        """
+        Companies, clients and objects written after `since`, plus tombstones of
+        deleted ones, in transaction id order. Each source is read with a keyset
+        range on its (workspace_id, change_xid, id) index and the pages are merged here.
+        Without `since` the feed starts from the beginning (no deletions).
+        """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        now = get_utc_now()
+        cursor = decode_sync_cursor(since) if since else None
+        if cursor and cursor[3] < now - timedelta(days=settings.REGISTRY_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(410, detail="Sync cursor expired; reload the registry and start a new sync")
+        # Every transaction below the snapshot xmin has finished, and anything that commits
+        # later gets a higher id, so rows below it can never appear behind the cursor
+        watermark = db.execute(text("SELECT (pg_snapshot_xmin(pg_current_snapshot())::text)::bigint")).scalar()
+
+        sources = []
+        if "company" in entity_types:
+            sources.append(("company", Company, db.query(Company)))
+        if "client" in entity_types:
+            sources.append(("client", Client, db.query(Client).options(
+                joinedload(Client.company), joinedload(Client.status_company)
+            )))
+        if "object" in entity_types:
+            sources.append(("object", ClientObject, db.query(ClientObject).options(
+                joinedload(ClientObject.client), joinedload(ClientObject.company)
+            )))
+        if cursor and entity_types:
+            sources.append(("tombstone", RegistryTombstone, db.query(RegistryTombstone).filter(
+                RegistryTombstone.entity_type.in_(entity_types)
+            )))
+
+        candidates = []
+        for source, model, query in sources:
+            rank = SOURCE_RANKS[source]
+            query = query.filter(model.workspace_id == workspace_id, model.change_xid < watermark)
+            if cursor:
+                query = query.filter(_after(model.change_xid, model.id, rank, cursor))
+            for row in query.order_by(model.change_xid, model.id).limit(limit + 1).all():
+                candidates.append(((row.change_xid, rank, row.id), source, row))
+
+        candidates.sort(key=lambda candidate: candidate[0])
+        page = candidates[:limit]
+        changes = [RegistrySyncService._serialize_change(source, row, cursor) for _, source, row in page]
+        if page:
+            next_cursor = encode_sync_cursor(*page[-1][0], now)
+        else:
+            # Nothing pending below the watermark: move the cursor there so it does not age out
+            next_cursor = encode_sync_cursor(watermark - 1, SOURCE_RANKS["tombstone"], _MAX_ID, now)
+        return {"changes": changes, "cursor": next_cursor, "has_more": len(candidates) > limit}
+
+    @staticmethod
+    def _serialize_change(source: str, row, cursor) -> dict:
+        if source == "tombstone":
+            return {
+                "type": row.entity_type,
+                "op": "deleted",
+                "id": str(row.entity_id),
+                "changed_at": row.deleted_at.isoformat(),
+                "data": None,
+            }
+        if source == "company":
+            data = RegistryService._serialize_company(row)
+            # Derived from the clients, so the company's change_xid does not track it
+            data.pop("client_count")
+        elif source == "client":
+            data = RegistryService._serialize_client(row)
+        else:
+            data = RegistryService._serialize_client_object(row)
+        created = cursor is None or (row.created_xid, SOURCE_RANKS[source], row.id) > cursor[:3]
+        return {
+            "type": source,
+            "op": "created" if created else "updated",
+            "id": str(row.id),
+            "changed_at": row.updated_at.isoformat(),
+            "data": data,
+        }
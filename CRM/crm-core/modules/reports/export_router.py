@@ -0,0 +1,57 @@
+from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from uuid import UUID
+from typing import Optional
+
+from core.database_connector import get_db
+from core.workspace_resolver import resolve_workspace_id
+from modules.access_control.access_security import get_current_user
+from modules.access_control.access_permissions import PermissionService
+from modules.jobs.job_service import JobService
+from modules.reports.export_schemas import ExportJobRequest
+from modules.reports.export_service import ExportService
+
+router = APIRouter(prefix="/exports", tags=["Reporting Engine"])
+
+@router.post("")
+def request_export(
+    payload: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ Queue an export; an identical export already in progress is returned instead of a new one """
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    job, created = ExportService.request_export(db, payload, workspace_id, current_user)
+    if created:
+        background_tasks.add_task(ExportService.run_export, job.id)
+    return JobService.serialize_job(job)
+
+@router.get("/{job_id}")
+def get_export(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    return JobService.serialize_job(ExportService.get_export(db, job_id, workspace_id, current_user))
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: UUID,
+    workspace_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """ The finished file; 409 while the job is still pending/running """
+    PermissionService.require_permission(current_user, "download_files")
+    workspace_id = resolve_workspace_id(current_user, workspace_id)
+    file_record = ExportService.get_export_file(db, job_id, workspace_id, current_user)
+    return FileResponse(
+        path=file_record.physical_path,
+        media_type=file_record.content_type,
+        filename=file_record.filename
+    )
@@ -0,0 +1,15 @@
+from datetime import date
+from typing import Dict, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class ExportJobRequest(BaseModel):
+    report_type: str  # requests | users | form_records
+    format: str = "xlsx"  # xlsx | csv | ndjson | parquet
+    template_id: Optional[UUID] = None  # required for form_records
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    filters: Optional[Dict[str, str]] = None  # form_records: {"field_key": "op:value"}
+    sort: Optional[str] = None  # form_records
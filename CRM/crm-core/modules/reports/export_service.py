@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.export_formats import export_filename, export_media_type, resolve_export_format
+from modules.access_control.access_enums import UserRole
+from modules.access_control.access_permissions import PermissionService
+from modules.file_storage.file_models import FileAttachment
+from modules.file_storage.file_service import FileStorageService
+from modules.jobs.job_models import BackgroundJob
+from modules.jobs.job_service import ADMIN_ROLES, JobService
+from modules.reports.export_schemas import ExportJobRequest
+from modules.reports.report_service import ReportService
+
+EXPORT_JOB_TYPE = "report_export"
+REPORT_TYPES = {"requests", "users", "form_records"}
+# Progress rows are written through their own session; keep that to about once a second
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class ExportService:
+    """
+    Exports generated as background jobs. The finished file is stored as a
+    `report` attachment and downloaded through the job, so a browser retry or a
+    second identical request never regenerates it while a job is in flight.
+    """
+
+    @staticmethod
+    def _require_access(current_user, report_type: str) -> str | None:
+        """ Permission check per report type; returns the owner scope for own-records users """
+        if report_type in ("requests", "users"):
+            PermissionService.require_permission(current_user, "view_reports")
+            return None
+        if current_user.role in (UserRole.USER, UserRole.VIEWER):
+            PermissionService.require_permission(current_user, "view_own_form_records")
+            return str(current_user.id)
+        PermissionService.require_permission(current_user, "view_form_records")
+        return None
+
+    @staticmethod
+    def _dedupe_key(params: dict, current_user) -> str:
+        scope = dict(params)
+        if current_user.role not in ADMIN_ROLES:
+            # Non-admins can only poll their own jobs, so never share one across users
+            scope["requested_by"] = str(current_user.id)
+        canonical = json.dumps(scope, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def request_export(
+        db: Session,
+        payload: ExportJobRequest,
+        workspace_id,
+        current_user,
+    ) -> tuple[BackgroundJob, bool]:
+        """
+        Returns (job, created). created is False when an identical export is
+        already pending/running; the caller then polls that job instead.
+        """
+        report_type = (payload.report_type or "").strip().lower()
+        if report_type not in REPORT_TYPES:
+            raise HTTPException(400, detail=f"Unsupported report_type (allowed: {', '.join(sorted(REPORT_TYPES))})")
+        owner_id = ExportService._require_access(current_user, report_type)
+        export_format = resolve_export_format(payload.format)
+        if payload.date_from and payload.date_to and payload.date_from > payload.date_to:
+            raise HTTPException(status_code=400, detail="date_from must be before or equal to date_to")
+
+        params = {
+            "report_type": report_type,
+            "format": export_format,
+            "date_from": payload.date_from.isoformat() if payload.date_from else None,
+            "date_to": payload.date_to.isoformat() if payload.date_to else None,
+        }
+        if report_type == "form_records":
+            if not payload.template_id:
+                raise HTTPException(400, detail="template_id is required for form_records exports")
+            from modules.dynamic_records.dynamic_service import DynamicRecordService
+
+            # Reject unknown templates, filter fields and sort keys now rather than in the job
+            template = DynamicRecordService.get_template_snapshot(db, payload.template_id, workspace_id)
+            DynamicRecordService._export_query(db, template, workspace_id, owner_id, payload.filters, payload.sort)
+            params.update({
+                "template_id": str(payload.template_id),
+                "filters": payload.filters or {},
+                "sort": payload.sort,
+                "owner_id": owner_id,
+            })
+
+        dedupe_key = ExportService._dedupe_key(params, current_user)
+        existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+        if existing:
+            return existing, False
+        try:
+            job = JobService.create_job(
+                db,
+                workspace_id,
+                EXPORT_JOB_TYPE,
+                requested_by_id=current_user.id,
+                params=params,
+                dedupe_key=dedupe_key,
+            )
+        except IntegrityError:
+            # Lost the race against an identical request; join its job
+            db.rollback()
+            existing = JobService.find_active_job(db, workspace_id, dedupe_key)
+            if not existing:
+                raise HTTPException(409, detail="Export could not be queued, retry")
+            return existing, False
+        return job, True
+
+    @staticmethod
+    def get_export(db: Session, job_id, workspace_id, current_user) -> BackgroundJob:
+        job = JobService.get_job(db, job_id, workspace_id, EXPORT_JOB_TYPE, current_user)
+        ExportService._require_access(current_user, (job.params or {}).get("report_type"))
+        return job
+
+    @staticmethod
+    def get_export_file(db: Session, job_id, workspace_id, current_user) -> FileAttachment:
+        job = ExportService.get_export(db, job_id, workspace_id, current_user)
+        file_id = (job.result or {}).get("file_id")
+        if not file_id:
+            raise HTTPException(409, detail=f"Export is not ready (status: {job.status})")
+        file_record = db.query(FileAttachment).filter(
+            FileAttachment.id == uuid.UUID(file_id),
+            FileAttachment.workspace_id == workspace_id
+        ).first()
+        if not file_record or not os.path.exists(file_record.physical_path):
+            raise HTTPException(404, detail="Export file no longer exists")
+        return file_record
+
+    @staticmethod
+    def run_export(job_id):
+        JobService.run_job(job_id, ExportService._execute)
+
+    @staticmethod
+    def _open_stream(db: Session, job: BackgroundJob, progress):
+        params = job.params or {}
+        export_format = params["format"]
+        date_from = date.fromisoformat(params["date_from"]) if params.get("date_from") else None
+        date_to = date.fromisoformat(params["date_to"]) if params.get("date_to") else None
+        report_type = params["report_type"]
+
+        if report_type == "requests":
+            stream = ReportService.generate_requests_export(
+                db, job.workspace_id, date_from, date_to, export_format, progress=progress
+            )
+            return stream, export_filename("requests_report", export_format)
+        if report_type == "users":
+            stream = ReportService.generate_users_export(
+                db, job.workspace_id, date_from, date_to, export_format, progress=progress
+            )
+            return stream, export_filename("employees", export_format)
+
+        from modules.dynamic_records.dynamic_service import DynamicRecordService
+
+        start_dt, end_dt = ReportService._resolve_period(date_from, date_to)
+        stream, safe_name = DynamicRecordService.export_records(
+            db,
+            uuid.UUID(params["template_id"]),
+            job.workspace_id,
+            params.get("owner_id"),
+            params.get("filters") or None,
+            params.get("sort"),
+            export_format,
+            progress=progress,
+            start_dt=start_dt,
+            end_dt=end_dt,
+        )
+        return stream, export_filename(f"{safe_name}_records", export_format)
+
+    @staticmethod
+    def _execute(db: Session, job: BackgroundJob) -> dict:
+        rows_written = 0
+        last_report = 0.0
+
+        def progress(rows: int):
+            nonlocal rows_written, last_report
+            rows_written = rows
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                JobService.report_progress(job.id, rows)
+
+        stream, filename = ExportService._open_stream(db, job, progress)
+        export_format = (job.params or {})["format"]
+
+        # Write next to the final location so storing the file is a rename
+        work_dir = os.path.join(settings.FILE_STORAGE_ROOT, str(job.workspace_id))
+        os.makedirs(work_dir, exist_ok=True)
+        fd, part_path = tempfile.mkstemp(prefix=f"export-{job.id}-", suffix=".part", dir=work_dir)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for chunk in stream:
+                    handle.write(chunk)
+            file_record = FileStorageService.store_generated_file(
+                db,
+                part_path,
+                filename,
+                export_media_type(export_format),
+                job.requested_by_id,
+                job.workspace_id,
+                entity_type="report",
+                entity_id=job.id,
+            )
+        except Exception:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            raise
+
+        JobService.report_progress(job.id, rows_written, total=rows_written)
+        return {
+            "file_id": str(file_record.id),
+            "filename": file_record.filename,
+            "file_size": file_record.file_size,
+            "rows": rows_written,
+        }
@@ -7,6 +7,7 @@ from typing import Optional
 
 from core.database_connector import get_db
 from core.workspace_resolver import resolve_workspace_id
+from core.export_formats import export_filename, export_media_type, resolve_export_format
 from modules.access_control.access_security import get_current_user
 from modules.access_control.access_permissions import PermissionService
 from modules.reports.report_service import ReportService
@@ -18,32 +19,35 @@ def download_requests_report(
     workspace_id: Optional[UUID] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
+    format: str = "xlsx",
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """ Download all requests as .xlsx """
+    """ Download all requests as .xlsx (or `format=csv|ndjson|parquet`) """
     PermissionService.require_permission(current_user, "view_reports")
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     if date_from and date_to and date_from > date_to:
         raise HTTPException(status_code=400, detail="date_from must be before or equal to date_to")
-    
-    # 1. Generate the Excel binary data
-    file_stream = ReportService.generate_requests_excel(
+    export_format = resolve_export_format(format)
+
+    # 1. Prepare the export stream (row limit is checked before the first byte)
+    file_stream = ReportService.generate_requests_export(
         db,
         workspace_id,
         date_from=date_from,
         date_to=date_to,
+        export_format=export_format,
     )
     
     # 2. Return as a Stream
     # Headers tell the browser this is an attachment to download
     headers = {
-        "Content-Disposition": 'attachment; filename="requests_report.xlsx"'
+        "Content-Disposition": f'attachment; filename="{export_filename("requests_report", export_format)}"'
     }
     
     return StreamingResponse(
         file_stream, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=export_media_type(export_format),
         headers=headers
     )
 
@@ -52,6 +56,7 @@ def download_users_report(
     workspace_id: Optional[UUID] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
+    format: str = "xlsx",
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -60,16 +65,18 @@ def download_users_report(
     workspace_id = resolve_workspace_id(current_user, workspace_id)
     if date_from and date_to and date_from > date_to:
         raise HTTPException(status_code=400, detail="date_from must be before or equal to date_to")
-    file_stream = ReportService.generate_users_excel(
+    export_format = resolve_export_format(format)
+    file_stream = ReportService.generate_users_export(
         db,
         workspace_id,
         date_from=date_from,
         date_to=date_to,
+        export_format=export_format,
     )
     
     return StreamingResponse(
         file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": 'attachment; filename="employees.xlsx"'}
+        media_type=export_media_type(export_format),
+        headers={"Content-Disposition": f'attachment; filename="{export_filename("employees", export_format)}"'}
     )
     
@@ -1,11 +1,9 @@
 from datetime import date, datetime, time, timedelta, timezone
-from tempfile import SpooledTemporaryFile
 
-from fastapi import HTTPException
-from openpyxl import Workbook
 from sqlalchemy.orm import Session
 
-from core.config import settings
+from core.export_stream import ensure_export_limit, stream_query
+from core.export_formats import stream_export
 
 # Import the models we want to report on
 from modules.workflow.workflow_models import Request
@@ -25,17 +23,7 @@ class ReportService:
         return start_dt, end_dt
 
     @staticmethod
-    def generate_requests_excel(
-        db: Session,
-        workspace_id,
-        date_from: date | None = None,
-        date_to: date | None = None,
-    ):
-        """
-        Generates an Excel file containing all Requests for this company.
-        """
-        start_dt, end_dt = ReportService._resolve_period(date_from, date_to)
-        # 1. Fetch Data (SQLAlchemy)
+    def _requests_query(db: Session, workspace_id, start_dt=None, end_dt=None):
         # We join with User to get the actual name of the assignee
         query = db.query(
             Request.title,
@@ -49,69 +37,84 @@ class ReportService:
             query = query.filter(Request.created_at >= start_dt)
         if end_dt:
             query = query.filter(Request.created_at < end_dt)
+        return query
 
-        total = query.count()
-        if total > settings.MAX_EXPORT_ROWS:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Export exceeds max row limit ({settings.MAX_EXPORT_ROWS})"
-            )
-        # 2. Stream rows into a write-only workbook to avoid large memory spikes
-        workbook = Workbook(write_only=True)
-        sheet = workbook.create_sheet(title="Requests_Export")
-        sheet.append(["Title", "Status", "Priority", "Created Date", "Assigned To"])
+    @staticmethod
+    def _users_query(db: Session, workspace_id, start_dt=None, end_dt=None):
+        user_query = db.query(User).filter(User.workspace_id == workspace_id)
+        if start_dt:
+            user_query = user_query.filter(User.created_at >= start_dt)
+        if end_dt:
+            user_query = user_query.filter(User.created_at < end_dt)
+        return user_query
 
-        for row in query.yield_per(1000):
-            sheet.append([
-                row.title,
-                row.status.value,
-                row.priority.value,
-                row.created_at.strftime("%Y-%m-%d %H:%M") if row.created_at else "",
-                row.assignee_name if row.assignee_name else "Unassigned",
-            ])
+    @staticmethod
+    def generate_requests_export(
+        db: Session,
+        workspace_id,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        export_format: str = "xlsx",
+        progress=None,
+    ):
+        """
+        Generates an export containing all Requests for this company.
+        Returns an iterator of file bytes; rows are written as they come off the cursor.
+        """
+        start_dt, end_dt = ReportService._resolve_period(date_from, date_to)
+        # Fail fast (before any byte is sent) when the export is too large
+        ensure_export_limit(ReportService._requests_query(db, workspace_id, start_dt, end_dt), export_format=export_format)
+
+        def rows():
+            for row in stream_query(
+                lambda session: ReportService._requests_query(session, workspace_id, start_dt, end_dt),
+                progress=progress,
+            ):
+                yield [
+                    row.title,
+                    row.status.value,
+                    row.priority.value,
+                    row.created_at.strftime("%Y-%m-%d %H:%M") if row.created_at else "",
+                    row.assignee_name if row.assignee_name else "Unassigned",
+                ]
 
-        output = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_MB * 1024 * 1024)
-        workbook.save(output)
-        output.seek(0)
-        return output
+        columns = [
+            ("Title", "text"),
+            ("Status", "text"),
+            ("Priority", "text"),
+            ("Created Date", "text"),
+            ("Assigned To", "text"),
+        ]
+        return stream_export(export_format, "Requests_Export", columns, rows())
 
     @staticmethod
-    def generate_users_excel(
+    def generate_users_export(
         db: Session,
         workspace_id,
         date_from: date | None = None,
         date_to: date | None = None,
+        export_format: str = "xlsx",
+        progress=None,
     ):
         """
         Another example: Export List of Employees
         """
         start_dt, end_dt = ReportService._resolve_period(date_from, date_to)
-        user_query = db.query(User).filter(User.workspace_id == workspace_id)
-        if start_dt:
-            user_query = user_query.filter(User.created_at >= start_dt)
-        if end_dt:
-            user_query = user_query.filter(User.created_at < end_dt)
-        total = user_query.count()
-        if total > settings.MAX_EXPORT_ROWS:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Export exceeds max row limit ({settings.MAX_EXPORT_ROWS})"
-            )
+        ensure_export_limit(ReportService._users_query(db, workspace_id, start_dt, end_dt), export_format=export_format)
         admin_roles = {UserRole.SUPERADMIN, UserRole.SYSTEM_ADMIN, UserRole.ADMIN}
 
-        workbook = Workbook(write_only=True)
-        sheet = workbook.create_sheet(title="Employees")
-        sheet.append(["Name", "Email", "Role", "Admin"])
-        for user in user_query.yield_per(1000):
-            role_value = user.role.value if hasattr(user.role, "value") else str(user.role)
-            is_admin = (
-                user.role in admin_roles
-                if hasattr(user.role, "value")
-                else str(user.role).upper() in {r.value for r in admin_roles}
-            )
-            sheet.append([user.full_name, user.email, role_value, is_admin])
+        def rows():
+            for user in stream_query(
+                lambda session: ReportService._users_query(session, workspace_id, start_dt, end_dt),
+                progress=progress,
+            ):
+                role_value = user.role.value if hasattr(user.role, "value") else str(user.role)
+                is_admin = (
+                    user.role in admin_roles
+                    if hasattr(user.role, "value")
+                    else str(user.role).upper() in {r.value for r in admin_roles}
+                )
+                yield [user.full_name, user.email, role_value, is_admin]
 
-        output = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_MB * 1024 * 1024)
-        workbook.save(output)
-        output.seek(0)
-        return output
+        columns = [("Name", "text"), ("Email", "text"), ("Role", "text"), ("Admin", "boolean")]
+        return stream_export(export_format, "Employees", columns, rows())
@@ -0,0 +1,110 @@
+"""
+Rows per second for each export format.
+
+Synthetic rows (no database needed):
+    python scripts/benchmark_exports.py --rows 200000
+
+Real form records streamed from the database (uses DATABASE_URL):
+    python scripts/benchmark_exports.py --template-id <uuid>
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.export_formats import EXPORT_FORMATS, column_type, stream_export  # noqa: E402
+
+SYNTHETIC_COLUMNS = [
+    ("Title", "text"),
+    ("Status", "text"),
+    ("Amount", "number"),
+    ("Approved", "boolean"),
+    ("Created Date", "text"),
+]
+
+
+def synthetic_source(row_count: int):
+    def rows():
+        created = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+        for index in range(row_count):
+            yield [f"Request #{index}", "in_progress" if index % 3 else "new", index * 1.25, index % 2 == 0, created]
+    return SYNTHETIC_COLUMNS, rows
+
+
+def database_source(template_id: uuid.UUID):
+    from core.database_connector import SessionLocal
+    from core.export_stream import stream_query
+    from modules.dynamic_records.dynamic_models import FormRecord, FormTemplate
+
+    db = SessionLocal()
+    try:
+        template = db.query(FormTemplate).filter(FormTemplate.id == template_id).first()
+        if not template:
+            raise SystemExit(f"Template {template_id} not found")
+        fields = [field for field in template.schema_structure or [] if field.get("key")]
+    finally:
+        db.close()
+    columns = [(field["key"], column_type(field.get("type"))) for field in fields]
+    keys = [field["key"] for field in fields]
+
+    def rows():
+        records = stream_query(
+            lambda session: session.query(FormRecord.entry_data).filter(FormRecord.template_id == template_id)
+        )
+        for record in records:
+            entry_data = record.entry_data or {}
+            yield [entry_data.get(key) for key in keys]
+    return columns, rows
+
+
+def run(export_format: str, columns, rows) -> tuple[int, int, float, float]:
+    counted = 0
+
+    def counting_rows():
+        nonlocal counted
+        for values in rows():
+            counted += 1
+            yield values
+
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in stream_export(export_format, "Benchmark", columns, counting_rows()):
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    return counted, size, elapsed, first_byte or elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="synthetic row count")
+    parser.add_argument("--template-id", type=uuid.UUID, help="stream this template's records instead")
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS), help="comma separated formats")
+    args = parser.parse_args()
+
+    if args.template_id:
+        columns, rows = database_source(args.template_id)
+    else:
+        columns, rows = synthetic_source(args.rows)
+
+    print(f"{'format':<8} {'rows':>10} {'MB':>9} {'seconds':>9} {'first byte':>11} {'rows/s':>11}")
+    for export_format in [item.strip() for item in args.formats.split(",") if item.strip()]:
+        if export_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print(f"{export_format:<8} skipped (pyarrow not installed)")
+                continue
+        count, size, elapsed, first_byte = run(export_format, columns, rows)
+        rate = count / elapsed if elapsed else 0
+        print(f"{export_format:<8} {count:>10} {size / 1048576:>9.2f} {elapsed:>9.2f} {first_byte:>10.3f}s {rate:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,7 +51,7 @@ function FormFillPage() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const isMobile = useIsMobile()
-  const { companyNames, clientNames } = useRegistryAutocomplete(currentUser)
+  const { companyNames, clientNames, searchRegistry } = useRegistryAutocomplete(currentUser)
 
   const token = localStorage.getItem('crm_token')
 
@@ -404,7 +404,10 @@ function FormFillPage() {
                     <input
                       type={field.type === 'number' ? 'number' : field.type === 'date' ? 'date' : 'text'}
                       value={row[field.key] ?? ''}
-                      onChange={e => updateValue(rowIndex, field.key, e.target.value)}
+                      onChange={e => {
+                        updateValue(rowIndex, field.key, e.target.value)
+                        searchRegistry(field, e.target.value)
+                      }}
                       list={
                         isCompanyField(field)
                           ? 'form-fill-registry-company-options'
@@ -58,6 +58,7 @@ function TemplateBuilderPage() {
   const [requestPriority, setRequestPriority] = useState('medium')
   const [requestTitleTemplate, setRequestTitleTemplate] = useState('')
   const [requestDescriptionTemplate, setRequestDescriptionTemplate] = useState('')
+  const [requestMissingPlaceholder, setRequestMissingPlaceholder] = useState<'keep' | 'empty'>('keep')
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
   const [error, setError] = useState<string | null>(null)
@@ -136,6 +137,7 @@ function TemplateBuilderPage() {
     setRequestPriority(settings?.priority || 'medium')
     setRequestTitleTemplate(settings?.title_template || '')
     setRequestDescriptionTemplate(settings?.description_template || '')
+    setRequestMissingPlaceholder(settings?.missing_placeholder || 'keep')
   }
 
   useEffect(() => {
@@ -265,7 +267,8 @@ function TemplateBuilderPage() {
       department_field_key: departmentField ? departmentField.key : null,
       priority: requestPriority,
       title_template: requestTitleTemplate.trim() || null,
-      description_template: requestDescriptionTemplate.trim() || null
+      description_template: requestDescriptionTemplate.trim() || null,
+      missing_placeholder: requestMissingPlaceholder
     }
     setSaving(true)
     try {
@@ -633,6 +636,14 @@ function TemplateBuilderPage() {
                 />
                 Required
               </label>
+              <label style={{ display: 'flex', alignItems: 'center', gap: '8px', fontSize: '12px' }}>
+                <input
+                  type="checkbox"
+                  checked={selectedField.indexed || false}
+                  onChange={e => updateColumn(selectedColumn, { indexed: e.target.checked })}
+                />
+                Indexed (fast sort and range filters)
+              </label>
             </div>
           </div>
 
@@ -713,8 +724,26 @@ function TemplateBuilderPage() {
                   }}
                 />
               </div>
+              <div>
+                <label style={{ fontSize: '12px', fontWeight: 600 }}>Empty Placeholders</label>
+                <select
+                  value={requestMissingPlaceholder}
+                  onChange={e => setRequestMissingPlaceholder(e.target.value as 'keep' | 'empty')}
+                  style={{
+                    marginTop: theme.spacing.xs,
+                    width: '100%',
+                    padding: '8px 10px',
+                    borderRadius: theme.borderRadius.sm,
+                    border: `1px solid ${theme.colors.gray.border}`
+                  }}
+                >
+                  <option value="keep">Keep placeholder text</option>
+                  <option value="empty">Leave blank</option>
+                </select>
+              </div>
               <div style={{ fontSize: '11px', color: theme.colors.gray.text }}>
-                Placeholders like {`{amount}`} or {`{client_name}`} will be replaced with row values.
+                Placeholders like {`{amount}`} or {`{client_name}`} will be replaced with row values;
+                add a format after a colon, e.g. {`{amount:,.2f}`}.
                 If Department column is included, its selected value is used for routing.
               </div>
             </div>
@@ -3,6 +3,7 @@ export type FormField = {
   label: string
   type: string
   required?: boolean
+  indexed?: boolean
 }
 
 export type FormTemplate = {
@@ -10,6 +11,7 @@ export type FormTemplate = {
   name: string
   schema_structure: FormField[]
   meta_data?: Record<string, any> | null
+  version?: number
 }
 
 export type RequestSettings = {
@@ -19,12 +21,14 @@ export type RequestSettings = {
   priority?: string
   title_template?: string | null
   description_template?: string | null
+  missing_placeholder?: 'keep' | 'empty'
 }
 
 export type FormRecord = {
   id: string
   template_id: string
   entry_data: Record<string, any>
+  request_id?: string | null
   created_at?: string
   updated_at?: string
 }
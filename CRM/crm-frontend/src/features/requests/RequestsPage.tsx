@@ -75,7 +75,7 @@ function RequestsPage() {
   const [rowErrors, setRowErrors] = useState<Record<number, string>>({})
   const [submitting, setSubmitting] = useState(false)
   const isMobile = useIsMobile()
-  const { companyNames, clientNames } = useRegistryAutocomplete(currentUser)
+  const { companyNames, clientNames, searchRegistry } = useRegistryAutocomplete(currentUser)
 
   const templateFromQuery = useMemo(() => {
     const params = new URLSearchParams(location.search)
@@ -653,7 +653,10 @@ function RequestsPage() {
                           <input
                             type={field.type === 'number' ? 'number' : field.type === 'date' ? 'date' : 'text'}
                             value={row[field.key] ?? ''}
-                            onChange={e => updateValue(rowIndex, field.key, e.target.value)}
+                            onChange={e => {
+                              updateValue(rowIndex, field.key, e.target.value)
+                              searchRegistry(field, e.target.value)
+                            }}
                             list={
                               isCompanyField(field)
                                 ? 'registry-company-options'
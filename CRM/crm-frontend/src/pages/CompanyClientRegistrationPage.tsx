@@ -63,6 +63,10 @@ type ObjectFormState = {
   attributes: ObjectAttributeInput[]
 }
 
+// Companies are paginated server-side; this is the largest page the API returns
+const COMPANY_PAGE_SIZE = 500
+const OBJECT_PAGE_SIZE = 500
+
 const CLIENT_STATUS_OPTIONS = [
   { value: 'new', label: 'New' },
   { value: 'active', label: 'Active' },
@@ -99,6 +103,7 @@ function CompanyClientRegistrationPage() {
 
   const [currentUser, setCurrentUser] = useState<any>(null)
   const [companies, setCompanies] = useState<CompanyItem[]>([])
+  const [companyTotal, setCompanyTotal] = useState(0)
   const [clients, setClients] = useState<ClientItem[]>([])
   const [clientObjects, setClientObjects] = useState<ClientObjectItem[]>([])
 
@@ -174,23 +179,49 @@ function CompanyClientRegistrationPage() {
     const token = localStorage.getItem('crm_token')
     if (!token) return
     const params = getWorkspaceParams(user)
-    const [companyRes, clientRes, objectRes] = await Promise.all([
-      axios.get('/registry/companies', {
-        headers: { Authorization: `Bearer ${token}` },
-        params,
-      }),
+    // Objects come in keyset pages; follow X-Next-Cursor until the last one
+    const fetchAllObjects = async () => {
+      const items: any[] = []
+      let cursor: string | undefined
+      do {
+        const res = await axios.get('/registry/objects', {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { ...params, limit: OBJECT_PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+        })
+        if (Array.isArray(res.data)) items.push(...res.data)
+        cursor = res.headers['x-next-cursor'] || undefined
+      } while (cursor)
+      return items
+    }
+    // Companies come in offset pages; every one must be selectable, so read up to X-Total-Count
+    const fetchAllCompanies = async () => {
+      const items: CompanyItem[] = []
+      let total = 0
+      do {
+        const res = await axios.get('/registry/companies', {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { ...params, skip: items.length, limit: COMPANY_PAGE_SIZE },
+        })
+        const page = Array.isArray(res.data) ? res.data : []
+        items.push(...page)
+        total = Number(res.headers['x-total-count']) || items.length
+        // The server may cap the page below COMPANY_PAGE_SIZE; only an empty page ends early
+        if (page.length === 0) break
+      } while (items.length < total)
+      return { items, total }
+    }
+    const [companyPage, clientRes, objectItems] = await Promise.all([
+      fetchAllCompanies(),
       axios.get('/registry/clients', {
         headers: { Authorization: `Bearer ${token}` },
         params,
       }),
-      axios.get('/registry/objects', {
-        headers: { Authorization: `Bearer ${token}` },
-        params,
-      }),
+      fetchAllObjects(),
     ])
-    setCompanies(Array.isArray(companyRes.data) ? companyRes.data : [])
+    setCompanies(companyPage.items)
+    setCompanyTotal(companyPage.total)
     setClients(Array.isArray(clientRes.data) ? clientRes.data : [])
-    setClientObjects(Array.isArray(objectRes.data) ? objectRes.data : [])
+    setClientObjects(objectItems)
   }
 
   useEffect(() => {
@@ -998,7 +1029,9 @@ function CompanyClientRegistrationPage() {
             minWidth: 0,
           }}
         >
-          <h3 style={{ marginTop: 0 }}>Companies ({companies.length})</h3>
+          <h3 style={{ marginTop: 0 }}>
+            Companies ({companyTotal > companies.length ? `${companies.length} of ${companyTotal}` : companies.length})
+          </h3>
           {companies.length === 0 ? (
             <div style={{ color: theme.colors.gray.text }}>No companies registered yet.</div>
           ) : (
@@ -52,7 +52,7 @@ function Dashboard() {
   const [loading, setLoading] = useState(true)
   const navigate = useNavigate()
   const isMobile = useIsMobile()
-  const { companyNames, clientNames } = useRegistryAutocomplete(currentUser)
+  const { companyNames, clientNames, searchRegistry } = useRegistryAutocomplete(currentUser)
 
   const canQuickCreate = useMemo(() => {
     return roleMatches(currentUser?.role, ['SUPERADMIN', 'SYSTEM_ADMIN', 'ADMIN', 'MANAGER', 'USER'])
@@ -425,7 +425,10 @@ function Dashboard() {
                     <input
                       type={field.type === 'number' ? 'number' : field.type === 'date' ? 'date' : 'text'}
                       value={quickPayload[field.key] ?? ''}
-                      onChange={e => updateQuickValue(field, e.target.value)}
+                      onChange={e => {
+                        updateQuickValue(field, e.target.value)
+                        searchRegistry(field, e.target.value)
+                      }}
                       list={
                         isCompanyField(field)
                           ? 'dashboard-registry-company-options'
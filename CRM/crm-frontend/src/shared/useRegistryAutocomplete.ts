@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react'
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react'
 import axios from 'axios'
 import { getWorkspaceParams } from './workspace'
 
@@ -8,6 +8,11 @@ type RegistryField = {
   type?: string
 }
 
+// /registry/search returns the best matches only; nothing is fetched below MIN_QUERY_CHARS
+const SEARCH_LIMIT = 10
+const MIN_QUERY_CHARS = 2
+const SEARCH_DEBOUNCE_MS = 250
+
 const normalizeText = (value?: string) => (value || '').trim().toLowerCase()
 
 export const REQUEST_STATUS_OPTIONS = [
@@ -76,59 +81,61 @@ export const isDepartmentField = (field: RegistryField) => {
   )
 }
 
-const toClientName = (client: any) => {
-  const first = (client?.first_name || '').trim()
-  const last = (client?.last_name || '').trim()
-  return `${first} ${last}`.trim()
-}
-
 const dedupe = (values: string[]) => Array.from(new Set(values.filter(Boolean)))
 
 function useRegistryAutocomplete(currentUser: any) {
   const [companyNames, setCompanyNames] = useState<string[]>([])
   const [clientNames, setClientNames] = useState<string[]>([])
+  const timerRef = useRef<ReturnType<typeof setTimeout> | null>(null)
+  const requestRef = useRef(0)
 
   useEffect(() => {
-    const token = localStorage.getItem('crm_token')
-    if (!token || !currentUser) {
-      setCompanyNames([])
-      setClientNames([])
-      return
+    setCompanyNames([])
+    setClientNames([])
+    return () => {
+      if (timerRef.current) clearTimeout(timerRef.current)
     }
+  }, [currentUser?.id, currentUser?.workspace_id])
 
-    ;(async () => {
-      try {
-        const params = getWorkspaceParams(currentUser)
-        const [companyRes, clientRes] = await Promise.all([
-          axios.get('/registry/companies', {
+  // Call from the input's onChange; suggestions refresh once typing pauses
+  const searchRegistry = useCallback(
+    (field: RegistryField, value: string) => {
+      const type = isCompanyField(field) ? 'company' : isClientField(field) ? 'client' : null
+      const token = localStorage.getItem('crm_token')
+      if (!type || !token || !currentUser) return
+      if (timerRef.current) clearTimeout(timerRef.current)
+
+      const query = (value || '').trim()
+      if (query.length < MIN_QUERY_CHARS) return
+
+      timerRef.current = setTimeout(async () => {
+        const requestId = ++requestRef.current
+        try {
+          const res = await axios.get('/registry/search', {
             headers: { Authorization: `Bearer ${token}` },
-            params,
-          }),
-          axios.get('/registry/clients', {
-            headers: { Authorization: `Bearer ${token}` },
-            params,
-          }),
-        ])
-
-        const companies = Array.isArray(companyRes.data) ? companyRes.data : []
-        const clients = Array.isArray(clientRes.data) ? clientRes.data : []
-
-        setCompanyNames(dedupe(companies.map((company: any) => String(company?.name || '').trim())))
-        setClientNames(dedupe(clients.map((client: any) => toClientName(client))))
-      } catch {
-        // Keep forms working even if registry endpoints are unavailable.
-        setCompanyNames([])
-        setClientNames([])
-      }
-    })()
-  }, [currentUser?.id, currentUser?.workspace_id])
+            params: { ...getWorkspaceParams(currentUser), q: query, type, limit: SEARCH_LIMIT },
+          })
+          // A slower response for an earlier keystroke must not replace newer results
+          if (requestId !== requestRef.current) return
+          const results = Array.isArray(res.data?.results) ? res.data.results : []
+          const names = dedupe(results.map((item: any) => String(item?.label || '').trim()))
+          if (type === 'company') setCompanyNames(names)
+          else setClientNames(names)
+        } catch {
+          // Keep forms working even if registry endpoints are unavailable.
+        }
+      }, SEARCH_DEBOUNCE_MS)
+    },
+    [currentUser?.id, currentUser?.workspace_id],
+  )
 
   return useMemo(
     () => ({
       companyNames,
       clientNames,
+      searchRegistry,
     }),
-    [companyNames, clientNames],
+    [companyNames, clientNames, searchRegistry],
   )
 }
 